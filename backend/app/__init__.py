@@ -1,8 +1,31 @@
 import os
-import time
 from flask import Flask
 from flask_cors import CORS
 from .models import db
+from .walk_access import walk_access
+from .geojson_import import import_geojson_command
+from .bus_stop_source import extract_bus_stops_command
+from .migrations import db_cluster_command, db_upgrade_command
+
+
+DEFAULT_DATABASE_URL = 'postgresql://postgres:postgres@db:5432/ubmap'
+
+
+def _engine_options() -> dict:
+    """SQLAlchemy pool settings; size the pool to the worker's thread count (see gunicorn.conf.py)."""
+    options = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        # Drop connections the server or a proxy closed instead of failing the request
+        "pool_pre_ping": True,
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+    statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    if statement_timeout_ms > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    return options
+
 
 def create_app():
     app = Flask(__name__)
@@ -13,31 +36,26 @@ def create_app():
         methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     )
 
-    database_url = os.getenv('DATABASE_URL', 'postgresql://postgres:postgres@db:5432/ubmap')
+    database_url = os.getenv('DATABASE_URL', DEFAULT_DATABASE_URL)
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _engine_options()
     db.init_app(app)
 
-    with app.app_context():
-        attempts = 0
-        while True:
-            try:
-                db.session.execute(db.text("SELECT 1"))
-                break
-            except Exception:
-                attempts += 1
-                if attempts > 20:
-                    raise
-                time.sleep(1)
-
-        db.create_all()
-        try:
-            db.session.execute(db.text("ALTER TABLE places ADD COLUMN IF NOT EXISTS image_url TEXT"))
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
+    # Schema changes live in app/migrations and are applied by a separate step
+    # (`python -m app.migrations`); the bus stop index loads on its first lookup.
+    # Nothing in create_app() waits on the DB: the walk access backfill queued
+    # below runs on a background thread.
 
     from .routes import register_blueprints
     register_blueprints(app)
 
+    app.cli.add_command(import_geojson_command)
+    app.cli.add_command(extract_bus_stops_command)
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(db_cluster_command)
+
+    # Background refresh of the precomputed place -> bus stop walking table
+    walk_access.init_app(app)
+
     return app
@@ -0,0 +1,69 @@
+"""ASGI entry point: the OSRM/Overpass-bound routing endpoints on asyncio, everything else on Flask.
+
+    GUNICORN_APP=app.asgi:app GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py
+    uvicorn app.asgi:app --host 0.0.0.0 --port 5001          # single process
+
+Requests for ASYNC_PATHS go to a Quart app running routes/routing_async.py.
+All other paths, and CORS preflights, go to the regular Flask app, which
+a2wsgi runs on a bounded thread pool, so URL paths and responses are the
+same as under the WSGI entry point (app/main.py).
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from quart import Quart
+
+from . import create_app
+from .osrm import async_osrm
+from .routes.routing_async import routing_async_bp
+
+
+ASYNC_PATHS = frozenset(
+    {"/route", "/route_bus", "/route_multi", "/matrix", "/route_optimize", "/import_bus_routes_overpass"}
+)
+# Threads for the Flask app (everything outside ASYNC_PATHS)
+WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "8"))
+# Threads for planner steps of the async endpoints (DB lookups, RAPTOR, TSP); steps are
+# short, so a few threads serve many in-flight requests
+PLAN_THREADS = int(os.getenv("ASGI_PLAN_THREADS", "8"))
+
+
+def create_asgi_app():
+    flask_app = create_app()
+
+    quart_app = Quart(__name__)
+    quart_app.config["FLASK_APP"] = flask_app
+    quart_app.register_blueprint(routing_async_bp)
+
+    @quart_app.before_serving
+    async def _startup():
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=PLAN_THREADS, thread_name_prefix="plan")
+        )
+
+    @quart_app.after_serving
+    async def _shutdown():
+        await async_osrm.aclose()
+
+    @quart_app.after_request
+    async def _cors(resp):
+        # Same policy as flask_cors in create_app; preflights are answered by Flask
+        resp.headers["Access-Control-Allow-Origin"] = "*"
+        return resp
+
+    wsgi = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan" or (
+            scope["type"] == "http" and scope["path"] in ASYNC_PATHS and scope["method"] != "OPTIONS"
+        ):
+            await quart_app(scope, receive, send)
+        else:
+            await wsgi(scope, receive, send)
+
+    return app
+
+
+app = create_asgi_app()
@@ -0,0 +1,177 @@
+"""Local bus stop source: a JSON snapshot extracted from the OSM PBF file.
+
+``prepare-osrm.sh`` already downloads ``mongolia-latest.osm.pbf`` for OSRM;
+the same file is scanned with pyosmium for the nodes and platform ways the
+Overpass query asks for, and the result is cached in BUS_STOP_SNAPSHOT. The
+snapshot is considered current while it is newer than the PBF file.
+
+Anything slow (PBF extraction, Overpass) runs in a ``BackgroundJob`` thread
+so the request path only ever reads the snapshot.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+import click
+
+
+OSM_PBF_PATH = os.getenv(
+    "OSM_PBF_PATH", os.path.join(os.getenv("OSM_DATA_DIR", "/data"), "mongolia-latest.osm.pbf")
+)
+BUS_STOP_SNAPSHOT = os.getenv(
+    "BUS_STOP_SNAPSHOT", os.path.join(os.getenv("SNAPSHOT_DIR", "/tmp"), "bus_stops.json")
+)
+
+
+def _stop_name(tags) -> str:
+    return tags.get("name") or tags.get("ref") or "Bus Stop"
+
+
+def _is_stop(tags) -> bool:
+    return tags.get("highway") == "bus_stop" or tags.get("public_transport") in ("platform", "stop_position")
+
+
+def extract_from_pbf(pbf_path: str = OSM_PBF_PATH) -> list[dict]:
+    """Scan a PBF file for bus stop nodes and platform ways (at their node centroid)."""
+    # Imported here: pyosmium is only needed by the extraction job
+    import osmium
+
+    class StopHandler(osmium.SimpleHandler):
+        def __init__(self):
+            super().__init__()
+            self.stops = []
+
+        def node(self, n):
+            if n.tags and _is_stop(n.tags):
+                self.stops.append(
+                    {"osm_id": n.id, "name": _stop_name(n.tags), "lon": n.location.lon, "lat": n.location.lat}
+                )
+
+        def way(self, w):
+            if w.tags.get("public_transport") != "platform":
+                return
+            locs = [(nd.lon, nd.lat) for nd in w.nodes if nd.location.valid()]
+            if locs:
+                self.stops.append(
+                    {
+                        "name": _stop_name(w.tags),
+                        "lon": sum(lon for lon, _ in locs) / len(locs),
+                        "lat": sum(lat for _, lat in locs) / len(locs),
+                    }
+                )
+
+    handler = StopHandler()
+    handler.apply_file(pbf_path, locations=True)
+    return handler.stops
+
+
+def read_snapshot() -> dict | None:
+    try:
+        with open(BUS_STOP_SNAPSHOT, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(stops: list[dict], source: str):
+    """Atomically replace the snapshot file."""
+    # A temp file per writer: workers refreshing at once must not share one
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=os.path.dirname(BUS_STOP_SNAPSHOT) or ".", suffix=".tmp", delete=False
+    ) as fh:
+        json.dump({"source": source, "created_at": time.time(), "stops": stops}, fh)
+    try:
+        os.replace(fh.name, BUS_STOP_SNAPSHOT)
+    except OSError:
+        os.unlink(fh.name)
+        raise
+
+
+def snapshot_is_current() -> bool:
+    try:
+        snap_mtime = os.path.getmtime(BUS_STOP_SNAPSHOT)
+    except OSError:
+        return False
+    try:
+        return snap_mtime >= os.path.getmtime(OSM_PBF_PATH)
+    except OSError:
+        # No PBF to compare against: the snapshot is the best local data there is
+        return True
+
+
+def filter_bbox(stops: list[dict], bbox: str | None) -> list[dict]:
+    """Keep stops inside an Overpass-style "south,west,north,east" bbox."""
+    if not bbox:
+        return stops
+    s, w, n, e = (float(v) for v in bbox.split(","))
+    return [st for st in stops if s <= st["lat"] <= n and w <= st["lon"] <= e]
+
+
+def local_stops(bbox: str | None = None, extract: bool = True) -> list[dict] | None:
+    """Stops from the snapshot, re-extracting from the PBF first if it is newer.
+
+    With ``extract=False`` a stale snapshot is returned as-is. Returns None
+    when there is no local data at all.
+    """
+    if extract and not snapshot_is_current() and os.path.exists(OSM_PBF_PATH):
+        write_snapshot(extract_from_pbf(), "pbf")
+    snap = read_snapshot()
+    if snap is None:
+        return None
+    return filter_bbox(snap.get("stops") or [], bbox)
+
+
+class BackgroundJob:
+    """Runs one function at a time in a daemon thread inside an app context."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._thread = None
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, app, fn, *args) -> bool:
+        """Start fn(*args) unless the job is already running. Returns True if started."""
+        with self._lock:
+            if self.running:
+                return False
+            self.started_at, self.finished_at = time.time(), None
+            self.result, self.error = None, None
+            self._thread = threading.Thread(target=self._run, args=(app, fn, args), name=self.name, daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, app, fn, args):
+        with app.app_context():
+            try:
+                self.result = fn(*args)
+            except Exception as e:
+                self.error = str(e)
+        self.finished_at = time.time()
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+@click.command("extract-bus-stops")
+@click.option("--pbf", default=OSM_PBF_PATH, show_default=True, type=click.Path(exists=True, dir_okay=False))
+def extract_bus_stops_command(pbf):
+    """Extract bus stops from an OSM PBF file into the snapshot."""
+    stops = extract_from_pbf(pbf)
+    write_snapshot(stops, "pbf")
+    click.echo(f"{len(stops)} stops written to {BUS_STOP_SNAPSHOT}")
@@ -0,0 +1,154 @@
+"""In-process nearest-neighbour index over bus stops.
+
+Bus stops change rarely (admin edits and Overpass imports), but nearest-stop
+lookups happen on every /route_bus call and for every imported stop. The
+index keeps all stops in memory, bucketed into a uniform grid of roughly
+CELL_M metres, and answers k-nearest queries by scanning rings of cells
+around the query point. It is rebuilt lazily after ``invalidate()`` or when
+older than BUS_STOP_INDEX_TTL seconds (so other workers' writes show up).
+"""
+import math
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from sqlalchemy import func
+
+from .models import db, Place
+
+
+EARTH_R = 6371000.0
+CELL_M = 250.0
+MAX_RINGS = 40  # ~10 km search radius before falling back to a linear scan
+INDEX_TTL_S = float(os.getenv("BUS_STOP_INDEX_TTL", "300"))
+
+
+class BusStop(NamedTuple):
+    id: int | None
+    name: str | None
+    lon: float
+    lat: float
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    # returns meters
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dl / 2) ** 2
+    return EARTH_R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _load_bus_stop_places() -> list[BusStop]:
+    rows = (
+        db.session.query(Place.id, Place.name, func.ST_X(Place.geom), func.ST_Y(Place.geom))
+        .filter(Place.place_type == "bus_stop", Place.geom.isnot(None), Place.deleted_at.is_(None))
+        .all()
+    )
+    return [BusStop(r[0], r[1], float(r[2]), float(r[3])) for r in rows]
+
+
+class BusStopIndex:
+    def __init__(self, loader=_load_bus_stop_places, db_fallback: bool = True):
+        """``loader`` returns the BusStop list to index; ``db_fallback`` enables the KNN query on load failure."""
+        self._loader = loader
+        self._db_fallback = db_fallback
+        self._lock = threading.Lock()
+        self._grid = None  # {(cx, cy): [BusStop, ...]}
+        self._loaded_at = 0.0
+        self._count = 0
+        # Degrees per grid cell; lon cell width is widened by 1/cos(lat) at load time
+        self._dlat = math.degrees(CELL_M / EARTH_R)
+        self._dlon = self._dlat
+
+    def __len__(self):
+        return self._count
+
+    def _cell(self, lon, lat):
+        return int(math.floor(lon / self._dlon)), int(math.floor(lat / self._dlat))
+
+    def load(self):
+        """(Re)build the grid from the loader (by default the places table; needs an app context)."""
+        stops = self._loader()
+        with self._lock:
+            if stops:
+                mean_lat = sum(s.lat for s in stops) / len(stops)
+                self._dlon = self._dlat / max(math.cos(math.radians(mean_lat)), 0.1)
+            grid = {}
+            for s in stops:
+                grid.setdefault(self._cell(s.lon, s.lat), []).append(s)
+            self._grid = grid
+            self._count = len(stops)
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Drop the in-memory grid; the next query reloads it from the database."""
+        with self._lock:
+            self._grid = None
+            self._count = 0
+
+    def _ensure_loaded(self):
+        if self._grid is None or time.monotonic() - self._loaded_at > INDEX_TTL_S:
+            self.load()
+        return self._grid
+
+    def nearest(self, lon: float, lat: float, k: int = 1) -> list[tuple[float, BusStop]]:
+        """Return up to k (distance_m, BusStop) pairs ordered by distance.
+
+        Falls back to a KNN (``<->``) query on the GIST index if the
+        in-memory grid cannot be loaded.
+        """
+        try:
+            grid = self._ensure_loaded()
+        except Exception:
+            if not self._db_fallback:
+                raise
+            db.session.rollback()
+            return _nearest_from_db(lon, lat, k)
+        if not grid:
+            return []
+
+        cx, cy = self._cell(lon, lat)
+        best = []
+        for ring in range(MAX_RINGS + 1):
+            for dx in range(-ring, ring + 1):
+                # Only the perimeter of the (2*ring+1)^2 square is new in this ring
+                step = 1 if abs(dx) == ring else 2 * ring
+                for dy in range(-ring, ring + 1, step or 1):
+                    for s in grid.get((cx + dx, cy + dy), ()):
+                        best.append((haversine(lon, lat, s.lon, s.lat), s))
+            if len(best) >= k:
+                best.sort(key=lambda t: t[0])
+                # Anything outside the scanned square is at least `ring` cells away
+                if best[k - 1][0] <= ring * CELL_M:
+                    return best[:k]
+            if len(best) >= self._count:
+                best.sort(key=lambda t: t[0])
+                return best[:k]
+
+        # Query point is far from every stop: a linear scan is cheaper than more rings
+        best = [(haversine(lon, lat, s.lon, s.lat), s) for cell in grid.values() for s in cell]
+        best.sort(key=lambda t: t[0])
+        return best[:k]
+
+
+def _nearest_from_db(lon: float, lat: float, k: int = 1) -> list[tuple[float, BusStop]]:
+    """KNN lookup via the ``<->`` operator, served by the partial index ix_places_bus_stop_geom."""
+    point = func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326)
+    rows = (
+        db.session.query(Place.id, Place.name, func.ST_X(Place.geom), func.ST_Y(Place.geom))
+        .filter(Place.place_type == "bus_stop", Place.deleted_at.is_(None))
+        .order_by(Place.geom.op("<->")(point))
+        .limit(k)
+        .all()
+    )
+    out = []
+    for r in rows:
+        s = BusStop(r[0], r[1], float(r[2]), float(r[3]))
+        out.append((haversine(lon, lat, s.lon, s.lat), s))
+    out.sort(key=lambda t: t[0])
+    return out
+
+
+bus_stop_index = BusStopIndex()
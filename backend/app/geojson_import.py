@@ -0,0 +1,140 @@
+"""Streaming GeoJSON importer for places.
+
+Features are parsed incrementally with ijson from a file-like object (the
+request stream, an uploaded file or a file on disk), so memory stays bounded
+by the batch size rather than the document size. Each batch is written with
+one multi-row INSERT (psycopg2 ``execute_values``) in its own transaction;
+a failing batch is rolled back and reported without stopping the import.
+
+``places.geom`` is a POINT column: Point features are stored as-is, other
+geometry types are rejected unless ``point_on_surface`` is set, in which
+case they are stored as ST_PointOnSurface of the shape.
+"""
+import json
+import os
+
+import click
+import ijson
+from psycopg2.extras import execute_values
+
+from .models import db
+from .walk_access import walk_access
+
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Per-feature validation errors beyond this many are only counted
+MAX_REPORTED_ERRORS = 50
+
+GEOMETRY_TYPES = {"Point", "MultiPoint", "LineString", "MultiLineString", "Polygon", "MultiPolygon", "GeometryCollection"}
+
+
+def iter_features(fp):
+    """Yield GeoJSON features one at a time from a FeatureCollection file object."""
+    return ijson.items(fp, "features.item", use_float=True)
+
+
+def _feature_row(f, point_on_surface: bool):
+    """Return (name, place_type, description, geometry_json) or raise ValueError."""
+    if not isinstance(f, dict):
+        raise ValueError("feature is not an object")
+    geom = f.get("geometry")
+    if not isinstance(geom, dict) or not geom.get("type"):
+        raise ValueError("missing geometry")
+    gtype = geom["type"]
+    if gtype not in GEOMETRY_TYPES:
+        raise ValueError(f"unknown geometry type {gtype!r}")
+    if gtype != "Point" and not point_on_surface:
+        raise ValueError(f"{gtype} not allowed; places are points (use point_on_surface)")
+    if gtype == "Point":
+        coords = geom.get("coordinates")
+        if not isinstance(coords, list) or len(coords) < 2 or not all(isinstance(c, (int, float)) for c in coords[:2]):
+            raise ValueError("invalid Point coordinates")
+    props = f.get("properties") or {}
+    return (
+        props.get("name"),
+        props.get("type") or props.get("place_type"),
+        props.get("description"),
+        json.dumps(geom),
+    )
+
+
+def _insert_batch(rows, point_on_surface: bool):
+    geom_sql = "ST_SetSRID(ST_GeomFromGeoJSON(%s), 4326)"
+    if point_on_surface:
+        geom_sql = f"ST_PointOnSurface({geom_sql})"
+    cur = db.session.connection().connection.cursor()
+    execute_values(
+        cur,
+        "INSERT INTO places (name, place_type, description, geom) VALUES %s",
+        rows,
+        template=f"(%s, %s, %s, {geom_sql})",
+        page_size=len(rows),
+    )
+
+
+def import_features(features, batch_size: int = IMPORT_BATCH_SIZE, point_on_surface: bool = False):
+    """Insert features in batches, yielding a progress dict after each batch.
+
+    The last dict yielded holds the final totals. Requires an app context.
+    """
+    progress = {
+        "batches": 0,
+        "inserted": 0,
+        "skipped": 0,
+        "bus_stops": 0,
+        "errors": [],
+    }
+    rows = []
+    bus_stops = 0
+
+    def flush():
+        nonlocal rows, bus_stops
+        progress["batches"] += 1
+        try:
+            _insert_batch(rows, point_on_surface)
+            db.session.commit()
+            progress["inserted"] += len(rows)
+            progress["bus_stops"] += bus_stops
+        except Exception as e:
+            db.session.rollback()
+            progress["skipped"] += len(rows)
+            progress["errors"].append({"batch": progress["batches"], "rows": len(rows), "error": str(e)})
+        rows, bus_stops = [], 0
+
+    for n, f in enumerate(features):
+        try:
+            row = _feature_row(f, point_on_surface)
+        except ValueError as e:
+            progress["skipped"] += 1
+            if len(progress["errors"]) < MAX_REPORTED_ERRORS:
+                progress["errors"].append({"feature": n, "error": str(e)})
+            continue
+        rows.append(row)
+        if row[1] == "bus_stop":
+            bus_stops += 1
+        if len(rows) >= batch_size:
+            flush()
+            yield dict(progress, errors=list(progress["errors"]))
+    if rows or not progress["batches"]:
+        if rows:
+            flush()
+        yield progress
+
+
+@click.command("import-geojson")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", default=IMPORT_BATCH_SIZE, show_default=True, help="Features per INSERT/transaction.")
+@click.option("--point-on-surface", is_flag=True, help="Store non-point geometries as a point on their surface.")
+@click.option("--skip-walk-access", is_flag=True, help="Do not precompute bus stop walking access for new places.")
+def import_geojson_command(path, batch_size, point_on_surface, skip_walk_access):
+    """Load a GeoJSON FeatureCollection file into places."""
+    result = None
+    with open(path, "rb") as fp:
+        for result in import_features(iter_features(fp), batch_size, point_on_surface):
+            click.echo(f"batch {result['batches']}: inserted {result['inserted']}, skipped {result['skipped']}")
+    for err in (result or {}).get("errors", []):
+        click.echo(f"error: {err}", err=True)
+    if result and result["inserted"] and not skip_walk_access:
+        # New stops can be nearer to existing places, so those are recomputed too
+        n = walk_access.refresh("all" if result["bus_stops"] else None)
+        click.echo(f"walk access computed for {n} places")
@@ -0,0 +1,166 @@
+"""Conditional GET and in-process response caching for the place read endpoints.
+
+A one-row ``data_version`` table is bumped by statement-level triggers on
+``places`` and ``place_images``, so every write (admin endpoints, GeoJSON and
+bus stop imports, raw SQL) advances it in the same transaction and all
+workers see the same value once it commits. ETags and Last-Modified are
+derived from it, and cached responses are only served while their version
+is current.
+
+Each written place row is also stamped with its transaction's version
+(``places.version``) and deletes are soft (``deleted_at`` tombstones), which
+lets /places/changes return only what changed since a client's last sync.
+The table and triggers are created by migration 0003_data_version.
+"""
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response, current_app, jsonify, request
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models import db
+from .single_flight import SingleFlight
+
+
+def current_version():
+    """Return (version, changed_at) of the place data. Requires an app context."""
+    return db.session.execute(db.text("SELECT version, changed_at FROM data_version WHERE id = 1")).one()
+
+
+class ResponseCache:
+    """LRU of rendered responses bounded by total body bytes, each tagged with the data version it was built from.
+
+    Bodies larger than max_entry_bytes (e.g. an unfiltered whole-city
+    FeatureCollection) are not cached, so one entry cannot evict the rest.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._data = OrderedDict()  # key -> (version, body, mimetype)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.skipped_large = 0
+
+    def get(self, key, version):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] == version:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item
+            if item is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def _drop(self, key):
+        self._bytes -= len(self._data.pop(key)[1])
+
+    def put(self, key, version, body: bytes, mimetype: str):
+        with self._lock:
+            if len(body) > self.max_entry_bytes:
+                self.skipped_large += 1
+                return
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (version, body, mimetype)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entry_bytes": self.max_entry_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "skipped_large": self.skipped_large,
+            }
+
+
+# Per worker process: multiply by the gunicorn worker count for the host total
+response_cache = ResponseCache(
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    max_entry_bytes=int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_MB", "4")) * 1024 * 1024,
+)
+render_flight = SingleFlight()
+
+
+def _render(view, kwargs, key, version):
+    """Run the view; cache 200s. Returns (status, body, mimetype) so waiters can rebuild the response."""
+    resp = current_app.make_response(view(**kwargs))
+    body = resp.get_data()
+    if resp.status_code == 200:
+        response_cache.put(key, version, body, resp.mimetype)
+    return resp.status_code, body, resp.mimetype
+
+
+def _validators(resp, changed_at, etag):
+    resp.set_etag(etag)
+    resp.last_modified = changed_at
+    # Clients may store the response but must revalidate; unchanged data costs a 304
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+def versioned_cache(normalize=None):
+    """Decorate a GET view with ETag/Last-Modified validators, 304s and the response cache.
+
+    ``normalize(request.args)`` returns the canonical params dict (raising
+    ValueError for bad input); it is part of the cache key and passed to the
+    view as ``args``. Only 200 responses are cached; concurrent misses for
+    the same key are coalesced into one view call.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            key = (request.endpoint, tuple(sorted(kwargs.items())))
+            if normalize is not None:
+                try:
+                    kwargs["args"] = normalize(request.args)
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+                key += (tuple(sorted(kwargs["args"].items())),)
+
+            try:
+                version, changed_at = current_version()
+            except SQLAlchemyError:
+                # Version unknown (DB unavailable or not migrated): serve uncached, but say so
+                current_app.logger.exception("data version lookup failed; serving %s uncached", request.path)
+                db.session.rollback()
+                return view(**kwargs)
+            etag = f"{version}-{hashlib.sha1(repr(key).encode()).hexdigest()[:12]}"
+
+            if request.if_none_match.contains(etag):
+                return _validators(Response(status=304), changed_at, etag)
+
+            cached = response_cache.get(key, version)
+            if cached is not None:
+                resp = Response(cached[1], mimetype=cached[2])
+                resp.headers["X-Cache"] = "HIT"
+            else:
+                # Concurrent misses for the same key and version share one render
+                status, body, mimetype = render_flight.do((key, version), _render, view, kwargs, key, version)
+                resp = Response(body, status=status, mimetype=mimetype)
+                if status != 200:
+                    return resp
+                resp.headers["X-Cache"] = "MISS"
+            return _validators(resp, changed_at, etag).make_conditional(request)
+
+        return wrapper
+
+    return decorator
@@ -3,4 +3,5 @@ from app import create_app
 app = create_app()
 
 if __name__ == "__main__":
+    # Development server only; the container runs gunicorn (gunicorn.conf.py)
     app.run(host="0.0.0.0", port=5001)
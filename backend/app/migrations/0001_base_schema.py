@@ -0,0 +1,63 @@
+"""Tables and indexes of the original initdb script and models (idempotent for existing databases)."""
+
+STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS postgis",
+    """
+    CREATE TABLE IF NOT EXISTS places (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR(100),
+        place_type VARCHAR(50),
+        description TEXT,
+        image_url TEXT,
+        geom geometry(POINT, 4326)
+    )
+    """,
+    "ALTER TABLE places ADD COLUMN IF NOT EXISTS image_url TEXT",
+    "ALTER TABLE places ADD COLUMN IF NOT EXISTS facebook_url TEXT",
+    "ALTER TABLE places ADD COLUMN IF NOT EXISTS instagram_url TEXT",
+    "ALTER TABLE places ADD COLUMN IF NOT EXISTS website_url TEXT",
+    "ALTER TABLE places ADD COLUMN IF NOT EXISTS phone VARCHAR(20)",
+    "CREATE INDEX IF NOT EXISTS idx_places_geom ON places USING GIST (geom)",
+    """
+    CREATE TABLE IF NOT EXISTS place_images (
+        id SERIAL PRIMARY KEY,
+        place_id INTEGER NOT NULL REFERENCES places(id) ON DELETE CASCADE,
+        image_url TEXT NOT NULL,
+        display_order INTEGER DEFAULT 0,
+        uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_place_images_place_id ON place_images(place_id)",
+    "CREATE INDEX IF NOT EXISTS idx_place_images_order ON place_images(place_id, display_order)",
+    """
+    CREATE TABLE IF NOT EXISTS transit_routes (
+        id SERIAL PRIMARY KEY,
+        osm_id BIGINT UNIQUE,
+        ref VARCHAR(50),
+        name VARCHAR(200),
+        headway_s INTEGER NOT NULL DEFAULT 600
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transit_route_stops (
+        id SERIAL PRIMARY KEY,
+        route_id INTEGER NOT NULL REFERENCES transit_routes(id) ON DELETE CASCADE,
+        seq INTEGER NOT NULL,
+        osm_node_id BIGINT,
+        name VARCHAR(100),
+        geom geometry(POINT, 4326)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_transit_route_stops_route_id ON transit_route_stops(route_id)",
+    """
+    CREATE TABLE IF NOT EXISTS place_stop_access (
+        place_id INTEGER NOT NULL REFERENCES places(id) ON DELETE CASCADE,
+        stop_id INTEGER NOT NULL REFERENCES places(id) ON DELETE CASCADE,
+        distance_m DOUBLE PRECISION,
+        duration_s DOUBLE PRECISION NOT NULL,
+        computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (place_id, stop_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_place_stop_access_stop_id ON place_stop_access(stop_id)",
+]
@@ -0,0 +1,24 @@
+"""Place search: pg_trgm, the trigger-maintained search_tsv column and their GIN indexes (see search.py)."""
+
+STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE places ADD COLUMN IF NOT EXISTS search_tsv tsvector",
+    """
+    CREATE OR REPLACE FUNCTION places_search_tsv_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_tsv := setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A')
+                       || setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER places_search_tsv_trg
+    BEFORE INSERT OR UPDATE OF name, description ON places
+    FOR EACH ROW EXECUTE FUNCTION places_search_tsv_update()
+    """,
+    # Backfill rows written before the trigger existed (fires the trigger)
+    "UPDATE places SET name = name WHERE search_tsv IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_places_search_tsv ON places USING gin (search_tsv)",
+    "CREATE INDEX IF NOT EXISTS ix_places_name_trgm ON places USING gin (name gin_trgm_ops)",
+]
@@ -0,0 +1,91 @@
+"""Data version counter, per-row versions and soft-delete tombstones (see http_cache.py)."""
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version BIGINT NOT NULL DEFAULT 0,
+        changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    "INSERT INTO data_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING",
+    # One version per writing transaction, memoized in a transaction-local setting.
+    # The data_version row stays locked until commit, so versions become visible in order.
+    """
+    CREATE OR REPLACE FUNCTION tx_data_version() RETURNS bigint AS $$
+    DECLARE
+        v bigint := NULLIF(current_setting('ubmap.tx_version', true), '')::bigint;
+    BEGIN
+        IF v IS NULL THEN
+            UPDATE data_version SET version = version + 1, changed_at = now() WHERE id = 1
+            RETURNING version INTO v;
+            PERFORM set_config('ubmap.tx_version', v::text, true);
+        END IF;
+        RETURN v;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+    BEGIN
+        PERFORM tx_data_version();
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER places_data_version_trg
+    AFTER INSERT OR UPDATE OR DELETE ON places
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER place_images_data_version_trg
+    AFTER INSERT OR UPDATE OR DELETE ON place_images
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version()
+    """,
+    # Per-row change tracking for /places/changes: version + updated_at, soft-delete tombstones
+    "ALTER TABLE places ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0",
+    "ALTER TABLE places ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+    "ALTER TABLE places ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ",
+    "ALTER TABLE place_images ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+    "ALTER TABLE place_images ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ",
+    """
+    CREATE OR REPLACE FUNCTION stamp_place_version() RETURNS trigger AS $$
+    BEGIN
+        NEW.version := tx_data_version();
+        NEW.updated_at := now();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER places_version_trg
+    BEFORE INSERT OR UPDATE ON places
+    FOR EACH ROW EXECUTE FUNCTION stamp_place_version()
+    """,
+    # A gallery change is a change of its place
+    """
+    CREATE OR REPLACE FUNCTION touch_image_place() RETURNS trigger AS $$
+    DECLARE
+        pid integer;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            pid := OLD.place_id;
+        ELSE
+            NEW.updated_at := now();
+            pid := NEW.place_id;
+        END IF;
+        UPDATE places SET updated_at = now() WHERE id = pid;
+        RETURN COALESCE(NEW, OLD);
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER place_images_touch_trg
+    BEFORE INSERT OR UPDATE OR DELETE ON place_images
+    FOR EACH ROW EXECUTE FUNCTION touch_image_place()
+    """,
+    # Stamp rows that predate the version column
+    "UPDATE places SET version = version WHERE version = 0",
+    "CREATE INDEX IF NOT EXISTS ix_places_version ON places(version, id)",
+]
@@ -0,0 +1,41 @@
+"""Indexes for the hot place queries, plus physical layout of places.
+
+- ix_places_bus_stop_geom: partial GIST over live bus stops, for the nearest-stop
+  KNN (bus_stops._nearest_from_db) and the bbox prefilter of the stop import dedup.
+- ix_places_bus_stop_geog: the same rows indexed as geography, matching the
+  ``ST_DWithin(p.geom::geography, ...)`` of the route_bus intermediate stops
+  and the dedup; without it those casts are computed per row.
+- ix_places_type: live rows by place_type, for /bus_stop_count, type/types
+  filters and the loose index scan behind /categories.
+
+places keeps 10% free space per page so updated rows stay next to their
+neighbours, and idx_places_geom is recorded as its cluster index. The
+rewrite itself (CLUSTER takes an ACCESS EXCLUSIVE lock) is not part of a
+deploy: run ``flask --app app.main db-cluster`` in a quiet period, e.g.
+after large imports, so a bbox or tile touches few heap pages.
+tests/test_query_plans.py verifies the plans on a seeded dataset.
+"""
+
+# CREATE INDEX CONCURRENTLY cannot run in a transaction block; building the
+# indexes this way does not block writes to places while they build
+TRANSACTIONAL = False
+
+# A failed concurrent build leaves an INVALID index that IF NOT EXISTS would
+# keep, so each index is dropped (a no-op on the first run) and rebuilt
+STATEMENTS = [
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_places_bus_stop_geom",
+    """
+    CREATE INDEX CONCURRENTLY ix_places_bus_stop_geom ON places USING GIST (geom)
+    WHERE place_type = 'bus_stop' AND deleted_at IS NULL
+    """,
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_places_bus_stop_geog",
+    """
+    CREATE INDEX CONCURRENTLY ix_places_bus_stop_geog ON places USING GIST ((geom::geography))
+    WHERE place_type = 'bus_stop' AND deleted_at IS NULL
+    """,
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_places_type",
+    "CREATE INDEX CONCURRENTLY ix_places_type ON places(place_type) WHERE deleted_at IS NULL",
+    # Catalog-only changes: no table rewrite
+    "ALTER TABLE places SET (fillfactor = 90)",
+    "ALTER TABLE places CLUSTER ON idx_places_geom",
+]
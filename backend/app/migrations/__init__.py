@@ -0,0 +1,178 @@
+"""Versioned schema migrations, applied by a separate command, never by the web workers.
+
+Each module here named ``NNNN_<name>.py`` defines ``STATEMENTS``, a list of
+SQL strings applied in order in one transaction. Applied versions are
+recorded in ``schema_migrations``; ``upgrade`` runs the missing ones while
+holding an advisory lock, so several containers starting together apply
+each migration once.
+
+A module that sets ``TRANSACTIONAL = False`` has each statement run on its
+own in autocommit mode instead, which ``CREATE INDEX CONCURRENTLY`` needs.
+It is recorded as applied only after its last statement succeeds, so its
+statements must be safe to re-run after a partial failure.
+
+    python -m app.migrations --wait 60      # docker-compose "migrate" service
+    flask --app app.main db-upgrade [--status]
+    flask --app app.main db-cluster         # maintenance, not run on deploy
+
+The first three migrations are idempotent (IF NOT EXISTS / CREATE OR
+REPLACE), so databases created by the old initdb script and create_app()
+upgrade cleanly.
+"""
+import importlib
+import pkgutil
+import re
+import time
+
+import click
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+
+_MODULE_RE = re.compile(r"^(\d{4})_(\w+)$")
+
+_SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(4) PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+
+def migrations():
+    """[(version, name, module)] of every migration in this package, oldest first."""
+    out = []
+    for info in pkgutil.iter_modules(__path__):
+        m = _MODULE_RE.match(info.name)
+        if m:
+            out.append((m.group(1), m.group(2), importlib.import_module(f"{__name__}.{info.name}")))
+    return sorted(out, key=lambda t: t[0])
+
+
+def wait_for_db(engine, timeout_s: float):
+    """Retry connecting until the database accepts connections or timeout_s passes."""
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return
+        except OperationalError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(1)
+
+
+def _applied(conn) -> set:
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def status(engine) -> list[tuple[str, str, bool]]:
+    """[(version, name, applied)] for every known migration."""
+    with engine.connect() as conn:
+        conn.execute(text(_SCHEMA_MIGRATIONS_DDL))
+        applied = _applied(conn)
+        conn.commit()
+    return [(version, name, version in applied) for version, name, _ in migrations()]
+
+
+def _run_autocommit(engine, statements):
+    """Run statements one by one outside any transaction (the caller keeps holding the advisory lock)."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SET statement_timeout = 0"))
+        try:
+            for stmt in statements:
+                conn.execute(text(stmt))
+        finally:
+            # The connection goes back to the engine's pool
+            conn.execute(text("RESET statement_timeout"))
+
+
+def upgrade(engine) -> list[str]:
+    """Apply pending migrations in order, each in its own transaction unless TRANSACTIONAL = False.
+
+    Returns the applied names.
+    """
+    done = []
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(hashtext('schema_migrations'))"))
+        try:
+            conn.execute(text(_SCHEMA_MIGRATIONS_DDL))
+            applied = _applied(conn)
+            conn.commit()
+            for version, name, module in migrations():
+                if version in applied:
+                    continue
+                if getattr(module, "TRANSACTIONAL", True):
+                    # Index builds on large tables must not hit the app's statement_timeout
+                    conn.execute(text("SET LOCAL statement_timeout = 0"))
+                    for stmt in module.STATEMENTS:
+                        conn.execute(text(stmt))
+                else:
+                    _run_autocommit(engine, module.STATEMENTS)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                    {"version": version, "name": name},
+                )
+                conn.commit()
+                done.append(f"{version}_{name}")
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(hashtext('schema_migrations'))"))
+            conn.commit()
+    return done
+
+
+def cluster_places(engine):
+    """Rewrite places in idx_places_geom order (see 0004_query_indexes) and refresh its statistics.
+
+    Holds an ACCESS EXCLUSIVE lock on places for the whole rewrite: reads
+    and writes of places wait until it finishes.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SET statement_timeout = 0"))
+        conn.execute(text("CLUSTER places"))
+        conn.execute(text("VACUUM ANALYZE places"))
+
+
+def run(engine, wait_s: float = 0, show_status: bool = False):
+    if wait_s:
+        wait_for_db(engine, wait_s)
+    if show_status:
+        for version, name, applied in status(engine):
+            click.echo(f"{version}_{name}: {'applied' if applied else 'pending'}")
+        return
+    done = upgrade(engine)
+    click.echo(f"applied {', '.join(done)}" if done else "schema is up to date")
+
+
+@click.command("db-upgrade")
+@click.option("--wait", "wait_s", default=0.0, show_default=True, help="Seconds to wait for the database to come up.")
+@click.option("--status", "show_status", is_flag=True, help="List migrations instead of applying them.")
+def db_upgrade_command(wait_s, show_status):
+    """Apply pending schema migrations."""
+    from ..models import db
+
+    run(db.engine, wait_s, show_status)
+
+
+@click.command("db-cluster")
+def db_cluster_command():
+    """Re-pack places by location (locks the table; run in a quiet period, e.g. after big imports)."""
+    from ..models import db
+
+    t0 = time.monotonic()
+    cluster_places(db.engine)
+    click.echo(f"places clustered in {time.monotonic() - t0:.1f}s")
+
+
+@click.command()
+@click.option("--database-url", envvar="DATABASE_URL", default=None)
+@click.option("--wait", "wait_s", default=0.0, show_default=True, help="Seconds to wait for the database to come up.")
+@click.option("--status", "show_status", is_flag=True, help="List migrations instead of applying them.")
+def main(database_url, wait_s, show_status):
+    """Apply pending schema migrations without building the Flask app."""
+    from .. import DEFAULT_DATABASE_URL
+
+    run(create_engine(database_url or DEFAULT_DATABASE_URL), wait_s, show_status)
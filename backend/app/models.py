@@ -15,6 +15,10 @@ class Place(db.Model):
     website_url = db.Column(db.Text, nullable=True)
     phone = db.Column(db.String(20), nullable=True)
     geom = db.Column(Geometry(geometry_type='POINT', srid=4326))
+    # Maintained by triggers (see migrations/0003_data_version.py); deleted_at marks a tombstone
+    version = db.Column(db.BigInteger, nullable=False, server_default='0')
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    deleted_at = db.Column(db.DateTime(timezone=True), nullable=True)
     
     images = db.relationship('PlaceImage', backref='place', lazy=True, cascade='all, delete-orphan', order_by='PlaceImage.display_order')
 
@@ -25,4 +29,36 @@ class PlaceImage(db.Model):
     image_url = db.Column(db.Text, nullable=False)
     display_order = db.Column(db.Integer, default=0)
     uploaded_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    deleted_at = db.Column(db.DateTime(timezone=True), nullable=True)
 
+
+class TransitRoute(db.Model):
+    """A bus line variant (one direction), imported from an OSM route=bus relation."""
+    __tablename__ = "transit_routes"
+    id = db.Column(db.Integer, primary_key=True)
+    osm_id = db.Column(db.BigInteger, unique=True, nullable=True)
+    ref = db.Column(db.String(50), nullable=True)
+    name = db.Column(db.String(200), nullable=True)
+    headway_s = db.Column(db.Integer, nullable=False, default=600)
+
+    stops = db.relationship('TransitRouteStop', backref='route', lazy=True, cascade='all, delete-orphan', order_by='TransitRouteStop.seq')
+
+class TransitRouteStop(db.Model):
+    __tablename__ = "transit_route_stops"
+    id = db.Column(db.Integer, primary_key=True)
+    route_id = db.Column(db.Integer, db.ForeignKey('transit_routes.id', ondelete='CASCADE'), nullable=False, index=True)
+    seq = db.Column(db.Integer, nullable=False)
+    osm_node_id = db.Column(db.BigInteger, nullable=True)
+    name = db.Column(db.String(100), nullable=True)
+    geom = db.Column(Geometry(geometry_type='POINT', srid=4326))
+
+
+class PlaceStopAccess(db.Model):
+    """Walking distance/time from a place to one of its nearest bus stops (see walk_access.py)."""
+    __tablename__ = "place_stop_access"
+    place_id = db.Column(db.Integer, db.ForeignKey('places.id', ondelete='CASCADE'), primary_key=True)
+    stop_id = db.Column(db.Integer, db.ForeignKey('places.id', ondelete='CASCADE'), primary_key=True, index=True)
+    distance_m = db.Column(db.Float, nullable=True)
+    duration_s = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
@@ -0,0 +1,254 @@
+"""Shared OSRM HTTP client.
+
+One pooled ``requests.Session`` is reused for every call so connections to
+the OSRM containers stay alive between requests. Each profile (car, foot)
+has its own base URL and circuit breaker: after OSRM_FAILURE_THRESHOLD
+consecutive connection errors/timeouts/5xx responses the profile is skipped
+for OSRM_COOLDOWN_S seconds, so callers fall back immediately instead of
+waiting out the timeout on every leg.
+"""
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_BASES = {
+    "car": "http://osrm:5002",
+    "foot": "http://osrm_foot:5003",
+}
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open after cooldown_s.
+
+    Half-open lets exactly one probe call through; everyone else is rejected
+    until it records a success (closed) or a failure (open again). A probe
+    that never reports back frees the slot after another cooldown_s.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_s: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self._failures = 0
+        self._open_until = 0.0
+        self._probe_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if not self._open_until:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if not self._open_until:
+                return True
+            if now < self._open_until or now < self._probe_until:
+                return False
+            self._probe_until = now + self.cooldown_s
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._open_until = 0.0
+            self._probe_until = 0.0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_until = 0.0
+            if self._failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.cooldown_s
+
+    def state(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            if not self._open_until:
+                state = "closed"
+            elif now < self._open_until:
+                state = "open"
+            else:
+                state = "half-open"
+            return {
+                "open": state == "open",
+                "state": state,
+                "consecutive_failures": self._failures,
+            }
+
+
+ROUTE_PARAMS = {"overview": "full", "geometries": "geojson"}
+
+
+def _ok_body(breaker: CircuitBreaker, status_code: int, json_fn):
+    """Record the outcome on the breaker and return the decoded body if OSRM answered "Ok"."""
+    if status_code >= 500:
+        breaker.record_failure()
+        return None
+    breaker.record_success()
+    try:
+        d = json_fn()
+    except ValueError:
+        return None
+    if d.get("code") != "Ok":
+        return None
+    return d
+
+
+def _route_result(d):
+    if d and d.get("routes"):
+        r0 = d["routes"][0]
+        return r0["geometry"], r0["distance"], r0["duration"]
+    return None
+
+
+def _table_params(sources, destinations) -> dict:
+    params = {"annotations": "duration,distance"}
+    if sources is not None:
+        params["sources"] = ";".join(str(i) for i in sources)
+    if destinations is not None:
+        params["destinations"] = ";".join(str(i) for i in destinations)
+    return params
+
+
+def _table_result(d):
+    if not d or "durations" not in d:
+        return None
+    return d["durations"], d.get("distances")
+
+
+class OsrmClient:
+    def __init__(self, bases: dict, connect_timeout: float, read_timeout: float,
+                 failure_threshold: int, cooldown_s: float, pool_size: int):
+        self.bases = bases
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(bases), pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breakers = {p: CircuitBreaker(failure_threshold, cooldown_s) for p in bases}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            bases={
+                "car": os.getenv("OSRM_CAR_URL", DEFAULT_BASES["car"]).rstrip("/"),
+                "foot": os.getenv("OSRM_FOOT_URL", DEFAULT_BASES["foot"]).rstrip("/"),
+            },
+            connect_timeout=float(os.getenv("OSRM_CONNECT_TIMEOUT", "1.0")),
+            read_timeout=float(os.getenv("OSRM_READ_TIMEOUT", "6.0")),
+            failure_threshold=int(os.getenv("OSRM_FAILURE_THRESHOLD", "3")),
+            cooldown_s=float(os.getenv("OSRM_COOLDOWN_S", "30")),
+            pool_size=int(os.getenv("OSRM_POOL_SIZE", "20")),
+        )
+
+    def _profile(self, profile: str) -> str:
+        p = (profile or "car").lower()
+        return p if p in self.bases else "car"
+
+    def base_for(self, profile: str) -> str:
+        """Return the base URL (scheme://host:port) of the OSRM instance for a given profile."""
+        return self.bases[self._profile(profile)]
+
+    def url(self, profile: str, service: str, coords) -> str:
+        p = self._profile(profile)
+        coord_str = ";".join(f"{lon},{lat}" for lon, lat in coords)
+        return f"{self.bases[p]}/{service}/v1/{p}/{coord_str}"
+
+    def request(self, profile: str, service: str, coords, params: dict | None = None):
+        """Call an OSRM service (route, table, trip, ...) and return the JSON body or None.
+
+        ``coords`` is a sequence of (lon, lat). Returns None when the profile's
+        breaker is open, on transport errors, or when OSRM's code is not "Ok".
+        """
+        breaker = self.breakers[self._profile(profile)]
+        if not breaker.allow():
+            return None
+        try:
+            r = self.session.get(self.url(profile, service, coords), params=params, timeout=self.timeout)
+        except requests.RequestException:
+            breaker.record_failure()
+            return None
+        return _ok_body(breaker, r.status_code, r.json)
+
+    def route(self, profile: str, slon: float, slat: float, elon: float, elat: float):
+        """Return (geometry, distance_m, duration_s) for a two-point route, or None on failure."""
+        return _route_result(self.request(profile, "route", [(slon, slat), (elon, elat)], ROUTE_PARAMS))
+
+    def table(self, profile: str, coords, sources=None, destinations=None):
+        """Return (durations, distances) matrices from the OSRM table service, or None on failure.
+
+        ``sources``/``destinations`` are optional index lists into ``coords``.
+        Unreachable pairs come back as None entries.
+        """
+        return _table_result(self.request(profile, "table", coords, _table_params(sources, destinations)))
+
+    def status(self) -> dict:
+        return {p: {"base": self.bases[p], **b.state()} for p, b in self.breakers.items()}
+
+
+class AsyncOsrmClient:
+    """asyncio twin of OsrmClient on an httpx.AsyncClient, for the ASGI routing service.
+
+    Shares the base URLs, timeouts and circuit breakers of the sync client, so
+    /osrm_status reflects both. Waiting calls cost a coroutine rather than a
+    thread; OSRM_ASYNC_MAX_CONNECTIONS bounds the sockets opened to OSRM and
+    further calls queue for a free connection.
+    """
+
+    def __init__(self, sync_client: OsrmClient, max_connections: int, pool_timeout: float):
+        self.sync = sync_client
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self._client = None
+
+    @classmethod
+    def from_env(cls, sync_client: OsrmClient):
+        return cls(
+            sync_client,
+            max_connections=int(os.getenv("OSRM_ASYNC_MAX_CONNECTIONS", "200")),
+            pool_timeout=float(os.getenv("OSRM_ASYNC_POOL_TIMEOUT", "30")),
+        )
+
+    @property
+    def client(self):
+        # Created on first use so it binds to the running event loop
+        if self._client is None:
+            import httpx
+
+            connect_timeout, read_timeout = self.sync.timeout
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout, pool=self.pool_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(self, profile: str, service: str, coords, params: dict | None = None):
+        """Async OsrmClient.request: the JSON body or None."""
+        import httpx
+
+        breaker = self.sync.breakers[self.sync._profile(profile)]
+        if not breaker.allow():
+            return None
+        try:
+            r = await self.client.get(self.sync.url(profile, service, coords), params=params)
+        except httpx.HTTPError:
+            breaker.record_failure()
+            return None
+        return _ok_body(breaker, r.status_code, r.json)
+
+    async def route(self, profile: str, slon: float, slat: float, elon: float, elat: float):
+        return _route_result(await self.request(profile, "route", [(slon, slat), (elon, elat)], ROUTE_PARAMS))
+
+    async def table(self, profile: str, coords, sources=None, destinations=None):
+        return _table_result(await self.request(profile, "table", coords, _table_params(sources, destinations)))
+
+
+osrm = OsrmClient.from_env()
+async_osrm = AsyncOsrmClient.from_env(osrm)
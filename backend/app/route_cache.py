@@ -0,0 +1,182 @@
+"""LRU + TTL cache for OSRM route results.
+
+Entries are keyed on profile, coordinates rounded to ROUTE_CACHE_PRECISION
+decimals (5 -> ~1 m) and the request options, so the frontend's repeated
+leg requests (mode badges, bucket routes) are answered without hitting OSRM.
+
+The in-process layer is a size-bounded OrderedDict. If ROUTE_CACHE_SQLITE
+points at a file, it is used as a second, shared layer so workers on the
+same host see each other's results. That file is capped at
+sqlite_max_rows: every SQLITE_PRUNE_EVERY writes, expired rows and the
+rows closest to expiry beyond the cap are deleted.
+"""
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+SQLITE_PRUNE_EVERY = 200
+
+
+class RouteCache:
+    def __init__(self, max_entries: int, ttl_s: float, precision: int, sqlite_path: str | None = None,
+                 sqlite_max_rows: int = 50000):
+        self.max_entries = max_entries
+        self.sqlite_max_rows = sqlite_max_rows
+        self.ttl_s = ttl_s
+        self.precision = precision
+        self.sqlite_path = sqlite_path
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._shared_puts = 0
+        if sqlite_path:
+            self._init_sqlite()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.getenv("ROUTE_CACHE_SIZE", "5000")),
+            ttl_s=float(os.getenv("ROUTE_CACHE_TTL_S", "3600")),
+            precision=int(os.getenv("ROUTE_CACHE_PRECISION", "5")),
+            sqlite_path=os.getenv("ROUTE_CACHE_SQLITE") or None,
+            sqlite_max_rows=int(os.getenv("ROUTE_CACHE_SQLITE_MAX_ROWS", "50000")),
+        )
+
+    def key(self, profile: str, coords, options: str = "") -> str:
+        """Build a cache key from profile, rounded (lon, lat) pairs and an options string."""
+        fmt = f"{{:.{self.precision}f}},{{:.{self.precision}f}}"
+        coord_str = ";".join(fmt.format(lon, lat) for lon, lat in coords)
+        return f"{(profile or 'car').lower()}|{coord_str}|{options}"
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """A SQLite connection that commits (or rolls back) and is closed on exit."""
+        with contextlib.closing(sqlite3.connect(self.sqlite_path, timeout=1.0)) as con, con:
+            yield con
+
+    def _init_sqlite(self):
+        try:
+            with self._connect() as con:
+                con.execute(
+                    "CREATE TABLE IF NOT EXISTS route_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                con.execute("CREATE INDEX IF NOT EXISTS ix_route_cache_expires_at ON route_cache(expires_at)")
+        except sqlite3.Error:
+            self.sqlite_path = None
+
+    def _prune_sqlite(self, con):
+        """Delete expired rows, then the ones expiring first beyond sqlite_max_rows (both use the index)."""
+        con.execute("DELETE FROM route_cache WHERE expires_at <= ?", (time.time(),))
+        row = con.execute(
+            "SELECT expires_at FROM route_cache ORDER BY expires_at DESC LIMIT 1 OFFSET ?",
+            (self.sqlite_max_rows,),
+        ).fetchone()
+        if row:
+            con.execute("DELETE FROM route_cache WHERE expires_at <= ?", (row[0],))
+
+    def get(self, key: str):
+        value = self.get_local(key)
+        return value if value is not None else self.get_shared(key)
+
+    def get_local(self, key: str):
+        """In-process layer only; never blocks on I/O. Returns None on a miss without counting it."""
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                if item[0] > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+                del self._data[key]
+        return None
+
+    def get_shared(self, key: str):
+        """Shared (SQLite) layer, after a get_local miss; blocking, so run it off the event loop."""
+        if self.sqlite_path:
+            try:
+                with self._connect() as con:
+                    row = con.execute(
+                        "SELECT value, expires_at FROM route_cache WHERE key = ? AND expires_at > ?",
+                        (key, time.time()),
+                    ).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row:
+                value = json.loads(row[0])
+                self._put_local(key, value, row[1])
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _put_local(self, key: str, value, expires_at: float):
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def put(self, key: str, value):
+        expires_at = self.put_local(key, value)
+        self.put_shared(key, value, expires_at)
+
+    def put_local(self, key: str, value) -> float:
+        """Store in the in-process layer only; returns the expiry to pass to put_shared."""
+        expires_at = time.time() + self.ttl_s
+        self._put_local(key, value, expires_at)
+        return expires_at
+
+    def put_shared(self, key: str, value, expires_at: float):
+        """Write through to the shared (SQLite) layer; blocking, so run it off the event loop."""
+        if self.sqlite_path:
+            try:
+                with self._connect() as con:
+                    con.execute(
+                        "INSERT OR REPLACE INTO route_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), expires_at),
+                    )
+                    with self._lock:
+                        self._shared_puts += 1
+                        prune = self._shared_puts % SQLITE_PRUNE_EVERY == 0
+                    if prune:
+                        self._prune_sqlite(con)
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        if self.sqlite_path:
+            try:
+                with self._connect() as con:
+                    con.execute("DELETE FROM route_cache")
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.shared_hits) / lookups, 3) if lookups else None,
+                "shared_backend": "sqlite" if self.sqlite_path else None,
+            }
+
+
+route_cache = RouteCache.from_env()
@@ -2,6 +2,7 @@ from .core import core_bp
 from .places import places_bp
 from .admin import admin_bp
 from .routing import routing_bp
+from .tiles import tiles_bp
 
 
 def register_blueprints(app):
@@ -10,3 +11,4 @@ def register_blueprints(app):
     app.register_blueprint(places_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(routing_bp)
+    app.register_blueprint(tiles_bp)
@@ -1,35 +1,207 @@
+import json
 import os
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 from geoalchemy2.shape import from_shape, to_shape
-from shapely.geometry import shape, mapping
+from shapely.geometry import Point, mapping
 from werkzeug.utils import secure_filename
 from ..models import db, Place, PlaceImage
-import cloudinary
-import cloudinary.uploader
+from ..bus_stops import bus_stop_index
+from ..walk_access import walk_access
+from ..search import search_condition, search_rank
+from ..http_cache import render_flight, response_cache, versioned_cache
+from ..geojson_import import IMPORT_BATCH_SIZE, import_features, iter_features
+import ijson
 
 
 
 places_bp = Blueprint("places", __name__)
 
 
+# cloudinary takes ~0.1 s to import and only the upload endpoints need it
+def _cloudinary_uploader(cloud_name: str, api_key: str, api_secret: str):
+    import cloudinary
+    import cloudinary.uploader
+
+    cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret)
+    return cloudinary.uploader
+
+def _place_feature(p, geometry=None):
+    """Serialize a Place (with its gallery) into a GeoJSON Feature dict.
+
+    Used by the single-place endpoints; GET /places builds the same shape in
+    SQL (see _PLACE_PROPERTY_SQL) so the two must be kept in sync.
+    """
+    if geometry is None:
+        geometry = mapping(to_shape(p.geom))
+    gallery_images = [{"id": img.id, "url": img.image_url, "order": img.display_order}
+                      for img in p.images if img.deleted_at is None]
+    return {
+        "type": "Feature",
+        "geometry": geometry,
+        "properties": {
+            "id": p.id,
+            "name": p.name,
+            "type": p.place_type,
+            "description": p.description,
+            "image_url": p.image_url,
+            "gallery": gallery_images,  # Gallery images array
+            "facebook_url": p.facebook_url,
+            "instagram_url": p.instagram_url,
+            "website_url": p.website_url,
+            "phone": p.phone,
+        },
+    }
+
+
+# Property name -> SQL expression for one place row p. Mirrors _place_feature.
+_PLACE_PROPERTY_SQL = {
+    "id": "p.id",
+    "name": "p.name",
+    "type": "p.place_type",
+    "description": "p.description",
+    "image_url": "p.image_url",
+    "gallery": """COALESCE((
+                SELECT json_agg(json_build_object('id', i.id, 'url', i.image_url, 'order', i.display_order)
+                                ORDER BY i.display_order)
+                FROM place_images i
+                WHERE i.place_id = p.id AND i.deleted_at IS NULL
+            ), '[]'::json)""",
+    "facebook_url": "p.facebook_url",
+    "instagram_url": "p.instagram_url",
+    "website_url": "p.website_url",
+    "phone": "p.phone",
+}
+# Fields for view=summary: enough to draw and label markers
+SUMMARY_FIELDS = ("id", "name", "type")
+
+
+def _place_feature_sql(fields=None, precision: int = 9) -> str:
+    """One GeoJSON Feature per row, built by PostGIS, with only the given properties."""
+    props = ", ".join(f"'{f}', {_PLACE_PROPERTY_SQL[f]}" for f in (fields or _PLACE_PROPERTY_SQL))
+    return f"""
+    json_build_object(
+        'type', 'Feature',
+        'geometry', ST_AsGeoJSON(p.geom, {precision})::json,
+        'properties', json_build_object({props})
+    )
+    """
+
+
+_PLACE_FEATURE_SQL = _place_feature_sql()
+
+
+def _csv_arg(args, name):
+    value = args.get(name) or ""
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _place_projection(args):
+    """Return (fields, coordinate precision) from ?fields= / ?view=summary; raises ValueError."""
+    if args.get("view") == "summary":
+        # ~10 cm is plenty for map markers
+        return SUMMARY_FIELDS, 6
+    fields = _csv_arg(args, "fields")
+    if not fields:
+        return None, 9
+    unknown = [f for f in fields if f not in _PLACE_PROPERTY_SQL]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    # id is always included so clients can fetch /places/<id> for the rest
+    return ["id"] + [f for f in fields if f != "id"], 9
+
+
+def _place_filters(args):
+    """Translate the /places query args (type, types, exclude_types, bbox, q) into SQL WHERE clauses + params."""
+    where = ["p.deleted_at IS NULL"]
+    params = {}
+    place_type = args.get("type")
+    types_csv = args.get("types")
+    exclude_types = _csv_arg(args, "exclude_types")
+    bbox_param = args.get("bbox")
+    q_text = args.get("q")
+
+    if types_csv:
+        types_list = _csv_arg(args, "types")
+        if types_list:
+            where.append("p.place_type = ANY(:types)")
+            params["types"] = types_list
+    elif place_type:
+        where.append("p.place_type = :place_type")
+        params["place_type"] = place_type
+    if exclude_types:
+        where.append("COALESCE(p.place_type, '') <> ALL(:exclude_types)")
+        params["exclude_types"] = exclude_types
+    if bbox_param:
+        try:
+            minx, miny, maxx, maxy = map(float, bbox_param.split(","))
+            where.append("ST_Intersects(p.geom, ST_MakeEnvelope(:minx, :miny, :maxx, :maxy, 4326))")
+            params.update(minx=minx, miny=miny, maxx=maxx, maxy=maxy)
+        except Exception:
+            pass
+    if q_text and q_text.strip():
+        # Trigram/full-text indexed match on name and description (see search.py)
+        where.append(search_condition(q_text, params))
+    return where, params
+
+
+def _live_place(place_id: int, *options):
+    """Return the place unless it is missing or soft-deleted."""
+    return Place.query.options(*options).filter(Place.id == place_id, Place.deleted_at.is_(None)).first()
+
+
+def _places_changed(place_ids, stops_changed: bool):
+    """Refresh derived spatial data after a committed change to these places."""
+    bus_stop_index.invalidate()
+    walk_access.places_changed(place_ids)
+    if stops_changed:
+        walk_access.stops_changed()
+
+
 @places_bp.route("/import_geojson", methods=["POST"])
 def import_geojson():
-    data = request.get_json()
-    features = data.get("features", [])
+    """Stream a FeatureCollection (JSON body or multipart ``file``) into places in batches.
 
-    for f in features:
-        geom = from_shape(shape(f["geometry"]), srid=4326)
-        place = Place(
-            name=f["properties"].get("name"),
-            place_type=f["properties"].get("type"),
-            description=f["properties"].get("description"),
-            geom=geom,
-        )
-        db.session.add(place)
-    db.session.commit()
+    Query params: batch_size, point_on_surface=1 (store non-point geometries as a
+    point on their surface), progress=1 (respond with one NDJSON line per batch).
+    """
+    try:
+        batch_size = max(1, min(int(request.args.get("batch_size", IMPORT_BATCH_SIZE)), 10000))
+    except ValueError:
+        return jsonify({"error": "invalid batch_size"}), 400
+    point_on_surface = request.args.get("point_on_surface") in ("1", "true")
+    upload = request.files.get("file")
+    fp = upload.stream if upload else request.stream
+    batches = import_features(iter_features(fp), batch_size, point_on_surface)
+
+    def finish(result):
+        if result["inserted"]:
+            _places_changed(None, result["bus_stops"] > 0)
+
+    if request.args.get("progress") in ("1", "true"):
+        def generate():
+            result = None
+            try:
+                for result in batches:
+                    yield json.dumps(result) + "\n"
+            except ijson.JSONError as e:
+                yield json.dumps({"error": f"invalid GeoJSON: {e}"}) + "\n"
+            if result:
+                finish(result)
+                yield json.dumps({"status": "success", "count": result["inserted"]}) + "\n"
 
-    return jsonify({"status": "success", "count": len(features)})
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    result = None
+    try:
+        for result in batches:
+            pass
+    except ijson.JSONError as e:
+        return jsonify({"error": f"invalid GeoJSON: {e}", "progress": result}), 400
+    result = result or {"inserted": 0, "skipped": 0, "bus_stops": 0, "batches": 0, "errors": []}
+    finish(result)
+    return jsonify({"status": "success", "count": result["inserted"], **result})
 
 
 @places_bp.route("/places", methods=["POST"])  
@@ -85,9 +257,9 @@ def create_place():
                 api_secret = os.getenv("CLOUDINARY_API_SECRET")
                 folder = os.getenv("CLOUDINARY_FOLDER", "ubmap")
                 if cloud_name and api_key and api_secret:
-                    cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret)
+                    uploader = _cloudinary_uploader(cloud_name, api_key, api_secret)
                     try:
-                        upload_res = cloudinary.uploader.upload(file, folder=folder, resource_type="image")
+                        upload_res = uploader.upload(file, folder=folder, resource_type="image")
                         image_url = upload_res.get("secure_url") or upload_res.get("url")
                     except Exception as e:
                         return jsonify({"error": f"image upload failed: {e}"}), 400
@@ -101,7 +273,7 @@ def create_place():
         except Exception:
             return jsonify({"error": "invalid lon/lat"}), 400
 
-        geom = from_shape(shape({"type": "Point", "coordinates": [lon, lat]}), srid=4326)
+        geom = from_shape(Point(lon, lat), srid=4326)
         place = Place(
             name=name,
             place_type=place_type,
@@ -115,125 +287,325 @@ def create_place():
         )
         db.session.add(place)
         db.session.commit()
+        _places_changed([place.id], place.place_type == "bus_stop")
 
         # Return created feature
-        return jsonify({
-            "type": "Feature",
-            "geometry": {"type": "Point", "coordinates": [lon, lat]},
-            "properties": {
-                "id": place.id,
-                "name": place.name,
-                "type": place.place_type,
-                "description": place.description,
-                "image_url": place.image_url,
-                "facebook_url": place.facebook_url,
-                "instagram_url": place.instagram_url,
-                "website_url": place.website_url,
-                "phone": place.phone,
-            },
-        }), 201
+        return jsonify(_place_feature(place, {"type": "Point", "coordinates": [lon, lat]})), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
 
-@places_bp.route("/places")
-def get_places():
-    # Optional filters: type or types (CSV), bbox (minx,miny,maxx,maxy in lon,lat), and q (search by name/description)
-    place_type = request.args.get("type")
-    types_csv = request.args.get("types")
-    bbox_param = request.args.get("bbox")
-    q_text = request.args.get("q")
-
-    # Return from DB
-    q = Place.query
-    if types_csv:
-        try:
-            types_list = [t.strip() for t in types_csv.split(",") if t.strip()]
-            if types_list:
-                q = q.filter(Place.place_type.in_(types_list))
-        except Exception:
-            pass
-    elif place_type:
-        q = q.filter(Place.place_type == place_type)
-    if bbox_param:
-        try:
-            minx, miny, maxx, maxy = map(float, bbox_param.split(","))
-            envelope = func.ST_MakeEnvelope(minx, miny, maxx, maxy, 4326)
-            q = q.filter(func.ST_Intersects(Place.geom, envelope))
-        except Exception:
-            pass
-    if q_text:
+# Below this zoom level /places?zoom= returns grid clusters instead of individual points.
+CLUSTER_MAX_ZOOM = int(os.getenv("CLUSTER_MAX_ZOOM", "15"))
+# Approximate on-screen size of one cluster cell, in 256px-tile pixels.
+CLUSTER_CELL_PX = 60
+
+
+def _cluster_cell_deg(zoom: int) -> float:
+    """Grid cell size in degrees that covers ~CLUSTER_CELL_PX pixels at the given zoom."""
+    return CLUSTER_CELL_PX * 360.0 / (256 * 2 ** zoom)
+
+
+def _clustered_places_sql(where, feature_sql=_PLACE_FEATURE_SQL):
+    """FeatureCollection SQL that snaps places to a grid and emits one feature per cell.
+
+    Cells holding a single place return that place's regular feature; others
+    return a cluster feature with ``count`` and a per-type ``types`` breakdown.
+    """
+    return f"""
+        WITH by_type AS (
+            SELECT ST_SnapToGrid(p.geom, :cell) AS cell,
+                   COALESCE(p.place_type, 'unknown') AS place_type,
+                   count(*) AS n,
+                   sum(ST_X(p.geom)) AS sx,
+                   sum(ST_Y(p.geom)) AS sy,
+                   min(p.id) AS first_id
+            FROM places p
+            WHERE {" AND ".join(where)}
+            GROUP BY 1, 2
+        ),
+        clusters AS (
+            SELECT sum(n) AS n,
+                   json_object_agg(place_type, n) AS types,
+                   ST_SetSRID(ST_MakePoint(sum(sx) / sum(n), sum(sy) / sum(n)), 4326) AS center,
+                   min(first_id) AS first_id
+            FROM by_type
+            GROUP BY cell
+        )
+        SELECT json_build_object(
+            'type', 'FeatureCollection',
+            'features', COALESCE(json_agg(
+                CASE WHEN p.id IS NOT NULL THEN {feature_sql}
+                ELSE json_build_object(
+                    'type', 'Feature',
+                    'geometry', ST_AsGeoJSON(c.center)::json,
+                    'properties', json_build_object('cluster', true, 'count', c.n, 'types', c.types)
+                ) END
+            ), '[]'::json)
+        )::text
+        FROM clusters c
+        LEFT JOIN places p ON c.n = 1 AND p.id = c.first_id
+        """
+
+
+# Upper bound for ?limit= on /places
+PLACES_MAX_LIMIT = int(os.getenv("PLACES_MAX_LIMIT", "5000"))
+
+def _normalize_place_args(args) -> dict:
+    """Canonical /places params: known keys only, sorted CSV lists, parsed numbers.
+
+    The bbox is kept exact (rows are filtered to it), only re-spelled; the
+    map frontend snaps its viewport to a grid so nearby views share entries.
+
+    Raises ValueError for malformed numbers.
+    """
+    out = {}
+    for name in ("types", "exclude_types", "fields"):
+        values = sorted(set(_csv_arg(args, name)))
+        if values:
+            out[name] = ",".join(values)
+    for name in ("type", "view"):
+        if args.get(name):
+            out[name] = args.get(name)
+    if args.get("q") and args.get("q").strip():
+        out["q"] = args.get("q").strip()
+    if args.get("bbox"):
         try:
-            like = f"%{q_text.strip()}%"
-            # ILIKE for case-insensitive match (works on PostgreSQL)
-            q = q.filter(
-                (Place.name.ilike(like)) | (Place.description.ilike(like))
+            minx, miny, maxx, maxy = map(float, args.get("bbox").split(","))
+        except ValueError:
+            raise ValueError("invalid bbox")
+        out["bbox"] = ",".join(repr(v) for v in (minx, miny, maxx, maxy))
+    for name in ("zoom", "cursor"):
+        if args.get(name):
+            out[name] = int(args.get(name))
+    if args.get("limit"):
+        out["limit"] = max(1, min(int(args.get("limit")), PLACES_MAX_LIMIT))
+    return out
+
+
+@places_bp.route("/places")
+@versioned_cache(normalize=_normalize_place_args)
+def get_places(args):
+    # Optional filters: type or types (CSV), exclude_types, bbox (minx,miny,maxx,maxy in lon,lat), and q
+    # Optional zoom: below CLUSTER_MAX_ZOOM nearby places are aggregated into cluster features
+    # Optional fields (CSV of property names) or view=summary (id, name, type) to trim the payload
+    # Optional limit + cursor: keyset pagination on id; the response carries next_cursor while more rows remain
+    # ``args`` are the normalized query params (see _normalize_place_args)
+    where, params = _place_filters(args)
+    zoom = args.get("zoom")
+    limit = args.get("limit")
+    cursor = args.get("cursor")
+    try:
+        fields, precision = _place_projection(args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    feature_sql = _place_feature_sql(fields, precision)
+
+    if zoom is not None and 0 <= zoom < CLUSTER_MAX_ZOOM:
+        params["cell"] = _cluster_cell_deg(zoom)
+        body = db.session.execute(db.text(_clustered_places_sql(where, feature_sql)), params).scalar()
+        return Response(body, mimetype="application/json")
+
+    if cursor is not None:
+        where.append("p.id > :cursor")
+        params["cursor"] = cursor
+
+    # PostGIS builds the whole FeatureCollection (geometry, properties and gallery)
+    # as JSON text, which is sent as-is without a Python round trip.
+    if limit is None:
+        sql = f"""
+            SELECT json_build_object(
+                'type', 'FeatureCollection',
+                'features', COALESCE(json_agg({feature_sql} ORDER BY p.id), '[]'::json)
+            )::text
+            FROM places p
+            WHERE {" AND ".join(where)}
+            """
+    else:
+        # One extra row tells whether another page exists
+        params["limit"] = limit
+        params["fetch"] = limit + 1
+        sql = f"""
+            WITH page AS (
+                SELECT p.*, row_number() OVER (ORDER BY p.id) AS rn
+                FROM places p
+                WHERE {" AND ".join(where)}
+                ORDER BY p.id
+                LIMIT :fetch
             )
-        except Exception:
-            pass
+            SELECT json_build_object(
+                'type', 'FeatureCollection',
+                'features', COALESCE(json_agg({feature_sql} ORDER BY p.id) FILTER (WHERE p.rn <= :limit), '[]'::json),
+                'next_cursor', CASE WHEN count(*) > :limit THEN max(p.id) FILTER (WHERE p.rn <= :limit) END
+            )::text
+            FROM page p
+            """
+    body = db.session.execute(db.text(sql), params).scalar()
+    return Response(body, mimetype="application/json")
+
+
+CHANGES_DEFAULT_LIMIT = 1000
+# Sorts after every real id, so a bare ``since`` means "versions after since"
+_AFTER_ALL_IDS = 2 ** 31 - 1
+
+
+def _normalize_changes_args(args) -> dict:
+    """since (version, default 0), cursor ("version:id" from a previous page), limit, fields/view."""
+    out = {"since": int(args.get("since") or 0)}
+    out["limit"] = max(1, min(int(args.get("limit") or CHANGES_DEFAULT_LIMIT), PLACES_MAX_LIMIT))
+    if args.get("cursor"):
+        version, _, place_id = args.get("cursor").partition(":")
+        out["cursor"] = f"{int(version)}:{int(place_id)}"
+    fields = sorted(set(_csv_arg(args, "fields")))
+    if fields:
+        out["fields"] = ",".join(fields)
+    if args.get("view"):
+        out["view"] = args.get("view")
+    return out
+
+
+@places_bp.route("/places/changes")
+@versioned_cache(normalize=_normalize_changes_args)
+def place_changes(args):
+    """Delta sync: places created/updated (``features``) and deleted (``deleted`` ids) after ``since``.
+
+    Store the returned ``version`` and pass it as ``since`` next time. While
+    ``next_cursor`` is set, more changes remain: repeat with ``cursor`` (and
+    the same ``since``) before storing the version.
+    """
+    try:
+        fields, precision = _place_projection(args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    feature_sql = _place_feature_sql(fields, precision)
+    if "cursor" in args:
+        start_version, start_id = map(int, args["cursor"].split(":"))
+    else:
+        start_version, start_id = args["since"], _AFTER_ALL_IDS
+    params = {
+        "since": args["since"],
+        "start_version": start_version,
+        "start_id": start_id,
+        "limit": args["limit"],
+        "fetch": args["limit"] + 1,
+    }
+    sql = db.text(
+        f"""
+        WITH changed AS (
+            SELECT p.*, row_number() OVER (ORDER BY p.version, p.id) AS rn
+            FROM places p
+            WHERE (p.version, p.id) > (:start_version, :start_id)
+            ORDER BY p.version, p.id
+            LIMIT :fetch
+        )
+        SELECT json_build_object(
+            'type', 'FeatureCollection',
+            'since', :since,
+            'version', (SELECT version FROM data_version WHERE id = 1),
+            'features', COALESCE(json_agg({feature_sql} ORDER BY p.version, p.id)
+                                 FILTER (WHERE p.rn <= :limit AND p.deleted_at IS NULL), '[]'::json),
+            'deleted', COALESCE(json_agg(p.id ORDER BY p.version, p.id)
+                                FILTER (WHERE p.rn <= :limit AND p.deleted_at IS NOT NULL), '[]'::json),
+            'next_cursor', CASE WHEN count(*) > :limit THEN
+                (array_agg(p.version || ':' || p.id ORDER BY p.version DESC, p.id DESC)
+                     FILTER (WHERE p.rn <= :limit))[1]
+            END
+        )::text
+        FROM changed p
+        """
+    )
+    body = db.session.execute(sql, params).scalar()
+    return Response(body, mimetype="application/json")
+
+
+SEARCH_MAX_LIMIT = 50
+
+
+@places_bp.route("/search")
+def search_places():
+    """Ranked autocomplete: /search?q=...&limit=10, plus the /places filters (types, exclude_types, bbox).
+
+    Returns a FeatureCollection of lightweight features (id, name, type, score).
+    """
+    q_text = (request.args.get("q") or "").strip()
+    if not q_text:
+        return jsonify({"type": "FeatureCollection", "features": []})
+    try:
+        limit = max(1, min(int(request.args.get("limit", 10)), SEARCH_MAX_LIMIT))
+    except ValueError:
+        return jsonify({"error": "invalid limit"}), 400
+
+    where, params = _place_filters(request.args)
+    params["limit"] = limit
+    sql = db.text(
+        f"""
+        WITH hits AS (
+            SELECT p.id, p.name, p.place_type, p.geom, {search_rank(params)} AS score
+            FROM places p
+            WHERE {" AND ".join(where)}
+            ORDER BY score DESC, length(p.name), p.id
+            LIMIT :limit
+        )
+        SELECT json_build_object(
+            'type', 'FeatureCollection',
+            'features', COALESCE(json_agg(json_build_object(
+                'type', 'Feature',
+                'geometry', ST_AsGeoJSON(h.geom)::json,
+                'properties', json_build_object(
+                    'id', h.id, 'name', h.name, 'type', h.place_type, 'score', round(h.score::numeric, 3)
+                )
+            ) ORDER BY h.score DESC, length(h.name), h.id), '[]'::json)
+        )::text
+        FROM hits h
+        """
+    )
+    try:
+        body = db.session.execute(sql, params).scalar()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    return Response(body, mimetype="application/json")
 
-    places = q.all()
-    features = []
-    for p in places:
-        geom = to_shape(p.geom)
-        # Get gallery images
-        gallery_images = [{"id": img.id, "url": img.image_url, "order": img.display_order} 
-                         for img in p.images] if hasattr(p, 'images') else []
-        
-        features.append({
-            "type": "Feature",
-            "geometry": mapping(geom),
-            "properties": {
-                "id": p.id,
-                "name": p.name,
-                "type": p.place_type,
-                "description": p.description,
-                "image_url": getattr(p, 'image_url', None),
-                "gallery": gallery_images,  # Gallery images array
-                "facebook_url": getattr(p, 'facebook_url', None),
-                "instagram_url": getattr(p, 'instagram_url', None),
-                "website_url": getattr(p, 'website_url', None),
-                "phone": getattr(p, 'phone', None),
-            },
-        })
-    return jsonify({"type": "FeatureCollection", "features": features})
+
+@places_bp.route("/places/cache_stats")
+def place_cache_stats():
+    """Response cache and request coalescing counters of the place read endpoints."""
+    return jsonify({"response_cache": response_cache.stats(), "single_flight": render_flight.stats()})
+
+
+# Distinct live place types by a loose index scan: one ix_places_type probe per type
+# instead of reading every row
+_CATEGORIES_SQL = """
+    WITH RECURSIVE t(place_type) AS (
+        (SELECT place_type FROM places
+         WHERE deleted_at IS NULL AND place_type IS NOT NULL
+         ORDER BY place_type LIMIT 1)
+        UNION ALL
+        SELECT (SELECT p.place_type FROM places p
+                WHERE p.deleted_at IS NULL AND p.place_type > t.place_type
+                ORDER BY p.place_type LIMIT 1)
+        FROM t
+        WHERE t.place_type IS NOT NULL
+    )
+    SELECT place_type FROM t WHERE place_type IS NOT NULL
+"""
 
 
 @places_bp.route("/categories")
+@versioned_cache()
 def categories():
-    rows = db.session.query(Place.place_type).distinct().all()
-    cats = [r[0] for r in rows if r[0] is not None]
-    return jsonify(sorted(cats))
+    rows = db.session.execute(db.text(_CATEGORIES_SQL)).fetchall()
+    return jsonify(sorted(r[0] for r in rows))
 
 
 @places_bp.route("/places/<int:place_id>", methods=["GET"])
+@versioned_cache()
 def get_place(place_id: int):
-    p = Place.query.get(place_id)
+    p = _live_place(place_id, selectinload(Place.images))
     if not p:
         return jsonify({"error": "not found"}), 404
-    geom = to_shape(p.geom)
-    
-    # Get gallery images
-    gallery_images = [{"id": img.id, "url": img.image_url, "order": img.display_order} 
-                     for img in p.images] if hasattr(p, 'images') else []
-    
-    return jsonify({
-        "type": "Feature",
-        "geometry": mapping(geom),
-        "properties": {
-            "id": p.id,
-            "name": p.name,
-            "type": p.place_type,
-            "description": p.description,
-            "image_url": getattr(p, 'image_url', None),
-            "gallery": gallery_images,  # Gallery images array
-            "facebook_url": getattr(p, 'facebook_url', None),
-            "instagram_url": getattr(p, 'instagram_url', None),
-            "website_url": getattr(p, 'website_url', None),
-            "phone": getattr(p, 'phone', None),
-        },
-    })
+    return jsonify(_place_feature(p))
 
 
 @places_bp.route("/places/<int:place_id>", methods=["PUT", "PATCH"])
@@ -244,9 +616,10 @@ def update_place(place_id: int):
         if not expected or secret != expected:
             return jsonify({"error": "unauthorized"}), 401
 
-        place = Place.query.get(place_id)
+        place = _live_place(place_id)
         if not place:
             return jsonify({"error": "not found"}), 404
+        was_stop = place.place_type == "bus_stop"
 
         name = None
         place_type = None
@@ -292,9 +665,9 @@ def update_place(place_id: int):
                 api_secret = os.getenv("CLOUDINARY_API_SECRET")
                 folder = os.getenv("CLOUDINARY_FOLDER", "ubmap")
                 if cloud_name and api_key and api_secret:
-                    cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret)
+                    uploader = _cloudinary_uploader(cloud_name, api_key, api_secret)
                     try:
-                        upload_res = cloudinary.uploader.upload(file, folder=folder, resource_type="image")
+                        upload_res = uploader.upload(file, folder=folder, resource_type="image")
                         image_url = upload_res.get("secure_url") or upload_res.get("url")
                         replace_image = True
                     except Exception as e:
@@ -322,24 +695,14 @@ def update_place(place_id: int):
                 flat = float(lat)
             except Exception:
                 return jsonify({"error": "invalid lon/lat"}), 400
-            geom = from_shape(shape({"type": "Point", "coordinates": [flon, flat]}), srid=4326)
+            geom = from_shape(Point(flon, flat), srid=4326)
             place.geom = geom
 
         db.session.commit()
+        _places_changed([place.id], was_stop or place.place_type == "bus_stop")
 
         # Return updated feature
-        geom_shp = to_shape(place.geom)
-        return jsonify({
-            "type": "Feature",
-            "geometry": mapping(geom_shp),
-            "properties": {
-                "id": place.id,
-                "name": place.name,
-                "type": place.place_type,
-                "description": place.description,
-                "image_url": getattr(place, 'image_url', None),
-            },
-        })
+        return jsonify(_place_feature(place))
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
@@ -354,7 +717,7 @@ def upload_place_images(place_id: int):
         if not expected or secret != expected:
             return jsonify({"error": "unauthorized"}), 401
 
-        place = Place.query.get(place_id)
+        place = _live_place(place_id)
         if not place:
             return jsonify({"error": "place not found"}), 404
 
@@ -372,7 +735,7 @@ def upload_place_images(place_id: int):
         if not (cloud_name and api_key and api_secret):
             return jsonify({"error": "cloudinary not configured"}), 500
         
-        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret)
+        uploader = _cloudinary_uploader(cloud_name, api_key, api_secret)
 
         uploaded_images = []
         # Get current max display_order
@@ -382,7 +745,7 @@ def upload_place_images(place_id: int):
             if file and file.filename:
                 try:
                     filename = secure_filename(file.filename)
-                    upload_res = cloudinary.uploader.upload(file, folder=folder, resource_type="image")
+                    upload_res = uploader.upload(file, folder=folder, resource_type="image")
                     image_url = upload_res.get("secure_url") or upload_res.get("url")
                     
                     # Create PlaceImage record
@@ -422,11 +785,12 @@ def delete_place_image(place_id: int, image_id: int):
         if not expected or secret != expected:
             return jsonify({"error": "unauthorized"}), 401
 
-        image = PlaceImage.query.filter_by(id=image_id, place_id=place_id).first()
+        image = PlaceImage.query.filter_by(id=image_id, place_id=place_id, deleted_at=None).first()
         if not image:
             return jsonify({"error": "image not found"}), 404
 
-        db.session.delete(image)
+        # Soft delete: the tombstone lets /places/changes report the gallery change
+        image.deleted_at = func.now()
         db.session.commit()
         return jsonify({"status": "deleted", "image_id": image_id})
     except Exception as e:
@@ -442,12 +806,18 @@ def delete_place(place_id: int):
         if not expected or secret != expected:
             return jsonify({"error": "unauthorized"}), 401
 
-        place = Place.query.get(place_id)
+        place = _live_place(place_id)
         if not place:
             return jsonify({"error": "not found"}), 404
 
-        db.session.delete(place)
+        was_stop = place.place_type == "bus_stop"
+        # Soft delete: the row stays as a tombstone for /places/changes, and so do its images
+        place.deleted_at = func.now()
+        PlaceImage.query.filter_by(place_id=place_id, deleted_at=None).update(
+            {"deleted_at": func.now()}, synchronize_session=False
+        )
         db.session.commit()
+        _places_changed([place_id], was_stop)
         return jsonify({"status": "deleted", "id": place_id})
     except Exception as e:
         db.session.rollback()
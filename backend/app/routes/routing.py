@@ -1,109 +1,288 @@
+import csv
+import io
 import json
 import math
 import os
-from flask import Blueprint, jsonify, request
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from flask import Blueprint, current_app, jsonify, request
 from sqlalchemy import func
-from shapely.geometry import LineString, Point, mapping
-from geoalchemy2.shape import from_shape, to_shape
 import requests
 
 from ..models import db, Place
+from ..bus_stops import bus_stop_index, haversine
+from ..bus_stop_source import BackgroundJob, local_stops, read_snapshot, write_snapshot
+from ..osrm import osrm
+from ..route_cache import route_cache
+from ..single_flight import AsyncSingleFlight, SingleFlight
+from ..tsp import path_cost, solve_open_path
+from ..transit import BUS_MPS, WALK_MPS, store_routes, transit_network
+from ..walk_access import walk_access
 
 
 routing_bp = Blueprint("routing", __name__)
 
+# Bounded pool for fanning out independent OSRM legs (pure HTTP, no DB access)
+_LEG_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ROUTE_LEG_WORKERS", "16")), thread_name_prefix="osrm-leg"
+)
+# Separate pool for whole bus legs in /route_multi; each of those submits to _LEG_POOL,
+# so sharing one pool could deadlock once it is saturated.
+_MULTI_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ROUTE_MULTI_WORKERS", "4")), thread_name_prefix="bus-plan"
+)
+# Coalesce identical in-flight OSRM route calls (the async twin is used by routing_async.py)
+route_flight = SingleFlight()
+async_route_flight = AsyncSingleFlight()
+# PBF extraction / Overpass fetches for bus stops run here, never in a request
+_bus_stop_job = BackgroundJob("bus-stop-import")
+MAX_MULTI_WAYPOINTS = 50
+MAX_MATRIX_POINTS = 100
+TRANSIT_ACCESS_K = int(os.getenv("TRANSIT_ACCESS_K", "5"))
+TRANSIT_MAX_WALK_M = float(os.getenv("TRANSIT_MAX_WALK_M", "1000"))
+OPTIMIZE_BUDGET_S = float(os.getenv("ROUTE_OPTIMIZE_BUDGET_MS", "300")) / 1000.0
+# After an automatic bus stop import that left the DB without stops, wait this long before retrying
+BUS_STOP_AUTO_RETRY_S = float(os.getenv("BUS_STOP_AUTO_RETRY_S", "300"))
 
-def haversine(lon1, lat1, lon2, lat2):
-    # returns meters
-    R = 6371000
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dl = math.radians(lon2 - lon1)
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dl / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+# Fixed speeds used for the bus/walk time estimates: walk 5km/h, bus 20km/h (see transit.py), car 30km/h
+CAR_MPS = 30000.0 / 3600.0
 
 
-def _osrm_base_for_profile(profile: str) -> str:
-    """Return the base URL (host:port) of the OSRM instance for a given profile."""
-    p = (profile or "car").lower()
-    if p == "foot":
-        return "http://osrm_foot:5003"
-    return "http://osrm:5002"
+def _route_cache_key(profile: str, slon: float, slat: float, elon: float, elat: float) -> str:
+    return route_cache.key(profile, [(slon, slat), (elon, elat)], "overview=full&geometries=geojson")
+
+
+def _line(coords) -> dict:
+    """GeoJSON LineString through (lon, lat) pairs."""
+    return {"type": "LineString", "coordinates": [[float(lon), float(lat)] for lon, lat in coords]}
+
+
+def _straight_leg(slon: float, slat: float, elon: float, elat: float):
+    """Last-resort leg: a straight line with its haversine length and no duration."""
+    return _line([(slon, slat), (elon, elat)]), haversine(slon, slat, elon, elat), None
 
 
 def _osrm_route(profile: str, slon: float, slat: float, elon: float, elat: float):
-    """Helper to call OSRM and return (geometry, distance_m, duration_s) or None on failure."""
-    try:
-        base = _osrm_base_for_profile(profile)
-        url = f"{base}/route/v1/{profile}/{slon},{slat};{elon},{elat}?overview=full&geometries=geojson"
-        r = requests.get(url, timeout=6)
-        if r.status_code == 200:
-            d = r.json()
-            if d.get("code") == "Ok" and d.get("routes"):
-                r0 = d["routes"][0]
-                return r0["geometry"], r0["distance"], r0["duration"]
-    except Exception:
-        pass
-    return None
+    """Helper to call OSRM and return (geometry, distance_m, duration_s) or None on failure.
 
+    Successful results are cached on (profile, rounded coordinates); failures are not.
+    """
+    key = _route_cache_key(profile, slon, slat, elon, elat)
+    cached = route_cache.get(key)
+    if cached is not None:
+        return tuple(cached)
+    # Identical routes requested at the same moment share one OSRM call
+    return route_flight.do(key, _fetch_route, key, profile, slon, slat, elon, elat)
 
-@routing_bp.route("/route")
-def simple_route():
+
+def _fetch_route(key: str, profile: str, slon: float, slat: float, elon: float, elat: float):
+    # A flight for this key may have finished between our cache miss and becoming leader
+    cached = route_cache.get_local(key)
+    if cached is not None:
+        return tuple(cached)
+    res = osrm.route(profile, slon, slat, elon, elat)
+    if res:
+        route_cache.put(key, list(res))
+    return res
+
+
+def _route_or_fallback(profile: str, slon: float, slat: float, elon: float, elat: float):
+    """Route one leg: OSRM for the profile, then car (for foot), then a straight line.
+
+    Always returns (geometry, distance_m, duration_s); duration is None for the straight line.
+    """
+    res = _osrm_route(profile, slon, slat, elon, elat)
+    if not res and profile == "foot":
+        res = _osrm_route("car", slon, slat, elon, elat)
+    return res or _straight_leg(slon, slat, elon, elat)
+
+
+def _timed(fn, *args):
+    """Run fn(*args) and return (result, elapsed_ms)."""
+    t0 = time.perf_counter()
+    res = fn(*args)
+    return res, (time.perf_counter() - t0) * 1000
+
+
+def _precomputed_leg(slon: float, slat: float, elon: float, elat: float, dist_m, dur_s):
+    """A finished leg in the ``_timed`` shape, drawn as a straight line."""
+    return (_line([(slon, slat), (elon, elat)]), dist_m, dur_s), 0.0
+
+
+def _round_or_none(v):
+    return round(v, 1) if isinstance(v, (int, float)) else None
+
+
+MULTI_ROUTE_PARAMS = {"overview": "false", "steps": "true", "geometries": "geojson"}
+
+
+def _multi_legs(d):
+    """Per-leg (geometry, distance_m, duration_s) of a multi-waypoint OSRM route body, or None."""
+    if not d or not d.get("routes"):
+        return None
+    legs = []
+    for leg in d["routes"][0].get("legs", []):
+        line = []
+        for step in leg.get("steps", []):
+            pts = step.get("geometry", {}).get("coordinates", [])
+            # Consecutive steps share their boundary point
+            line.extend(pts[1:] if line else pts)
+        legs.append(({"type": "LineString", "coordinates": line}, leg["distance"], leg["duration"]))
+    return legs
+
+
+def _osrm_route_multi(profile: str, coords):
+    """One OSRM route call through all coords; returns [(geometry, distance_m, duration_s)] per leg or None."""
+    return _multi_legs(osrm.request(profile, "route", coords, MULTI_ROUTE_PARAMS))
+
+
+# The planners below are generators, so the same planning code runs on a
+# request thread (_run_plan, OSRM calls on _LEG_POOL) and in the ASGI service
+# (routing_async._run_plan_async, OSRM calls as coroutines). A planner yields
+# StartCalls({name: (kind, *args)}) to start calls without waiting for them and
+# WaitCalls((name, ...)) to receive {name: (result, elapsed_ms)}. Code between
+# yields may use the database; it never does network I/O itself.
+
+class StartCalls(NamedTuple):
+    calls: dict
+
+
+class WaitCalls(NamedTuple):
+    names: tuple
+
+
+# kind -> sync implementation; routing_async._ASYNC_CALLS has the coroutine twins.
+# "bus_route" plans a whole /route_bus leg (a nested planner).
+_SYNC_CALLS = {
+    "route": _osrm_route,
+    "leg": _route_or_fallback,
+    "multi": _osrm_route_multi,
+    "table": osrm.table,
+}
+
+
+def _call(name: str, kind: str, *args):
+    """Start one call and wait for its result (use with ``yield from``)."""
+    yield StartCalls({name: (kind, *args)})
+    done = yield WaitCalls((name,))
+    return done[name][0]
+
+
+def _plan_step(plan, reply):
+    """Advance a planner: (False, next step) or (True, its return value)."""
     try:
-        start = request.args.get("start") 
-        end = request.args.get("end")
-        mode = request.args.get("mode", "car")
+        return False, plan.send(reply)
+    except StopIteration as stop:
+        return True, stop.value
+
+
+def _bus_route_in_app(app, *coords):
+    with app.app_context():
+        return _run_plan(_bus_plan(*coords))
+
 
-        if not start or not end:
-            return jsonify({"error": "start and end are required as 'lon,lat'"}), 400
+def _run_plan(plan):
+    """Run a planner on this thread with its OSRM calls on the thread pools; returns its result."""
+    pending = {}
+    reply = None
+    while True:
+        done, step = _plan_step(plan, reply)
+        if done:
+            return step
+        if isinstance(step, StartCalls):
+            for name, (kind, *args) in step.calls.items():
+                if kind == "bus_route":
+                    app = current_app._get_current_object()
+                    pending[name] = _MULTI_POOL.submit(_timed, _bus_route_in_app, app, *args)
+                else:
+                    pending[name] = _LEG_POOL.submit(_timed, _SYNC_CALLS[kind], *args)
+            reply = None
+        else:
+            reply = {name: pending.pop(name).result() for name in step.names}
+
+
+def _parse_endpoints(args):
+    """(slon, slat, elon, elat) from the ``start``/``end`` query params ("lon,lat")."""
+    start = args.get("start")
+    end = args.get("end")
+    if not start or not end:
+        raise ValueError("start and end are required as 'lon,lat'")
+    slon, slat = map(float, start.split(","))
+    elon, elat = map(float, end.split(","))
+    return slon, slat, elon, elat
+
+
+@routing_bp.route("/osrm_status")
+def osrm_status():
+    """Configured OSRM endpoints and their circuit-breaker state per profile."""
+    return jsonify(osrm.status())
 
-        slon, slat = map(float, start.split(","))
-        elon, elat = map(float, end.split(","))
 
-        osrm_profile = "car" if mode == "bus" else (mode or "car")
-        primary = _osrm_route(osrm_profile, slon, slat, elon, elat)
-        if primary:
-            geom, distance_m, duration_s = primary
+@routing_bp.route("/route_cache_stats")
+def route_cache_stats():
+    """Hit/miss counters of the OSRM route cache."""
+    return jsonify(
+        {
+            **route_cache.stats(),
+            "walk_access": walk_access.stats(),
+            "single_flight": {"sync": route_flight.stats(), "async": async_route_flight.stats()},
+        }
+    )
+
+
+def _simple_route_plan(slon: float, slat: float, elon: float, elat: float, mode: str):
+    """Planner for /route: OSRM for the mode, car for foot if foot OSRM is down, else a straight line."""
+    osrm_profile = "car" if mode == "bus" else (mode or "car")
+    primary = yield from _call("primary", "route", osrm_profile, slon, slat, elon, elat)
+    if primary:
+        geom, distance_m, duration_s = primary
+        feature = {
+            "type": "Feature",
+            "geometry": geom,
+            "properties": {
+                "distance_m": round(distance_m, 1),
+                "duration_s": round(duration_s, 1),
+                "mode": mode,
+            },
+        }
+        return {"type": "FeatureCollection", "features": [feature]}
+
+    if osrm_profile == "foot":
+        alt = yield from _call("alt", "route", "car", slon, slat, elon, elat)
+        if alt:
+            geom, distance_m, duration_s = alt
             feature = {
                 "type": "Feature",
                 "geometry": geom,
                 "properties": {
                     "distance_m": round(distance_m, 1),
                     "duration_s": round(duration_s, 1),
-                    "mode": mode,
+                    "mode": "foot-fallback-car",
+                    "note": "foot OSRM unavailable; used car routing as fallback",
                 },
             }
-            return jsonify({"type": "FeatureCollection", "features": [feature]})
+            return {"type": "FeatureCollection", "features": [feature]}
 
-        if osrm_profile == "foot":
-            alt = _osrm_route("car", slon, slat, elon, elat)
-            if alt:
-                geom, distance_m, duration_s = alt
-                feature = {
-                    "type": "Feature",
-                    "geometry": geom,
-                    "properties": {
-                        "distance_m": round(distance_m, 1),
-                        "duration_s": round(duration_s, 1),
-                        "mode": "foot-fallback-car",
-                        "note": "foot OSRM unavailable; used car routing as fallback",
-                    },
-                }
-                return jsonify({"type": "FeatureCollection", "features": [feature]})
+    distance_m = haversine(slon, slat, elon, elat)
 
-        line = LineString([(slon, slat), (elon, elat)])
-        distance_m = haversine(slon, slat, elon, elat)
+    feature = {
+        "type": "Feature",
+        "geometry": _line([(slon, slat), (elon, elat)]),
+        "properties": {
+            "distance_m": round(distance_m, 1),
+            "mode": "straight-line",
+        },
+    }
+    return {"type": "FeatureCollection", "features": [feature]}
 
-        feature = {
-            "type": "Feature",
-            "geometry": mapping(line),
-            "properties": {
-                "distance_m": round(distance_m, 1),
-                "mode": "straight-line",
-            },
-        }
-        return jsonify({"type": "FeatureCollection", "features": [feature]})
+
+@routing_bp.route("/route")
+def simple_route():
+    try:
+        coords = _parse_endpoints(request.args)
+        mode = request.args.get("mode", "car")
+        return jsonify(_run_plan(_simple_route_plan(*coords, mode)))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -116,45 +295,19 @@ OVERPASS_ENDPOINTS = [
 OVERPASS_ENDPOINTS = [e for e in OVERPASS_ENDPOINTS if e]
 
 
-def _overpass_fetch_bus_stops(bbox: str | None = None, timeout: int = 25):
-    """Fetch bus stop nodes from Overpass within bbox."""
-    if not bbox:
-        
-        bbox = "47.84,106.76,47.99,107.20"
+DEFAULT_OVERPASS_BBOX = "47.84,106.76,47.99,107.20"
+BUS_ROUTES_OVERPASS_TIMEOUT = 60
 
-    q = f"""
-    [out:json][timeout:{timeout}];
-    (
-      node["highway"="bus_stop"]({bbox});
-      node["public_transport"="platform"]({bbox});
-      node["public_transport"="stop_position"]({bbox});
-      way["public_transport"="platform"]({bbox});
-    );
-    out body center;
-    """
+
+def _overpass_fetch(q: str, timeout: int, parse):
+    """POST (then GET) the query to each Overpass endpoint in turn; first non-empty parse() result wins."""
     for endpoint in OVERPASS_ENDPOINTS:
         try:
             r = requests.post(endpoint, data={"data": q}, timeout=timeout + 5)
             if r.status_code >= 400:
                 r = requests.get(endpoint, params={"data": q}, timeout=timeout + 5)
             r.raise_for_status()
-            data = r.json()
-            elements = data.get("elements", [])
-            out = []
-            for el in elements:
-                t = el.get("type")
-                tags = el.get("tags", {})
-                name = tags.get("name") or tags.get("ref") or "Bus Stop"
-                if t == "node":
-                    lon = el.get("lon")
-                    lat = el.get("lat")
-                else:
-                    c = el.get("center") or {}
-                    lon = c.get("lon")
-                    lat = c.get("lat")
-                if lon is None or lat is None:
-                    continue
-                out.append({"name": name, "lon": float(lon), "lat": float(lat)})
+            out = parse(r.json().get("elements", []))
             if out:
                 return out
         except Exception:
@@ -162,69 +315,281 @@ def _overpass_fetch_bus_stops(bbox: str | None = None, timeout: int = 25):
     return []
 
 
+def _bus_stops_query(bbox: str | None, timeout: int) -> str:
+    bbox = bbox or DEFAULT_OVERPASS_BBOX
+    return f"""
+    [out:json][timeout:{timeout}];
+    (
+      node["highway"="bus_stop"]({bbox});
+      node["public_transport"="platform"]({bbox});
+      node["public_transport"="stop_position"]({bbox});
+      way["public_transport"="platform"]({bbox});
+    );
+    out body center;
+    """
+
+
+def _parse_bus_stops(elements) -> list[dict]:
+    out = []
+    for el in elements:
+        t = el.get("type")
+        tags = el.get("tags", {})
+        name = tags.get("name") or tags.get("ref") or "Bus Stop"
+        if t == "node":
+            lon = el.get("lon")
+            lat = el.get("lat")
+        else:
+            c = el.get("center") or {}
+            lon = c.get("lon")
+            lat = c.get("lat")
+        if lon is None or lat is None:
+            continue
+        out.append({"name": name, "lon": float(lon), "lat": float(lat)})
+    return out
+
+
+def _overpass_fetch_bus_stops(bbox: str | None = None, timeout: int = 25):
+    """Fetch bus stop nodes from Overpass within bbox."""
+    return _overpass_fetch(_bus_stops_query(bbox, timeout), timeout, _parse_bus_stops)
+
+
+def _parse_interval_s(value) -> int | None:
+    """Parse an OSM ``interval`` tag ("10", "00:10", "00:10:00", "10-15") into seconds."""
+    if not value:
+        return None
+    v = str(value).split(";")[0].split("-")[0].strip()
+    try:
+        parts = [int(x) for x in v.split(":")]
+    except ValueError:
+        return None
+    if len(parts) == 1:
+        return parts[0] * 60
+    if len(parts) == 2:
+        return parts[0] * 3600 + parts[1] * 60
+    return parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+def _bus_routes_query(bbox: str | None, timeout: int) -> str:
+    bbox = bbox or DEFAULT_OVERPASS_BBOX
+    return f"""
+    [out:json][timeout:{timeout}];
+    relation["type"="route"]["route"="bus"]({bbox})->.r;
+    .r out body;
+    node(r.r);
+    out body;
+    """
+
+
+def _parse_bus_routes(elements) -> list[dict]:
+    nodes = {el["id"]: el for el in elements if el.get("type") == "node"}
+    out = []
+    for el in elements:
+        if el.get("type") != "relation":
+            continue
+        tags = el.get("tags", {})
+        members = [m for m in el.get("members", []) if m.get("type") == "node"]
+        # Prefer stop positions; fall back to platforms when a relation has none
+        stop_members = [m for m in members if (m.get("role") or "").startswith("stop")]
+        if not stop_members:
+            stop_members = [m for m in members if (m.get("role") or "").startswith("platform")]
+        stops = []
+        for m in stop_members:
+            node = nodes.get(m.get("ref"))
+            if not node or node.get("lon") is None:
+                continue
+            ntags = node.get("tags", {})
+            stops.append(
+                {
+                    "osm_id": node["id"],
+                    "name": ntags.get("name") or ntags.get("ref") or "Bus Stop",
+                    "lon": float(node["lon"]),
+                    "lat": float(node["lat"]),
+                }
+            )
+        out.append(
+            {
+                "osm_id": el.get("id"),
+                "ref": tags.get("ref"),
+                "name": tags.get("name"),
+                "headway_s": _parse_interval_s(tags.get("interval")),
+                "stops": stops,
+            }
+        )
+    return out
+
+
+def _overpass_fetch_bus_routes(bbox: str | None = None, timeout: int = BUS_ROUTES_OVERPASS_TIMEOUT):
+    """Fetch route=bus relations (ordered stop members) from Overpass within bbox."""
+    return _overpass_fetch(_bus_routes_query(bbox, timeout), timeout, _parse_bus_routes)
+
+
+# Names compare equal after trimming, collapsing inner whitespace and lower-casing
+_NORM_NAME_SQL = "lower(regexp_replace(btrim({col}), '\\s+', ' ', 'g'))"
+
+# Staging table for one import; norm and geom are computed on COPY and indexed
+# afterwards, so the within-batch check below is an index probe, not a self-join scan
+_STAGE_TABLE_SQL = f"""
+    CREATE TEMP TABLE _bus_stop_import (
+        seq INTEGER,
+        name TEXT,
+        lon DOUBLE PRECISION,
+        lat DOUBLE PRECISION,
+        norm TEXT GENERATED ALWAYS AS ({_NORM_NAME_SQL.format(col="name")}) STORED,
+        geom geometry(Point, 4326) GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(lon, lat), 4326)) STORED
+    ) ON COMMIT DROP
+"""
+
+_STAGE_INDEX_SQL = [
+    "CREATE INDEX ON _bus_stop_import USING GIST (geom)",
+    "CREATE INDEX ON _bus_stop_import (norm, seq)",
+    "ANALYZE _bus_stop_import",
+]
+
+_DEDUP_INSERT_SQL = f"""
+    WITH survivors AS (
+        SELECT s.seq, s.name, s.geom
+        FROM _bus_stop_import s
+        WHERE NOT EXISTS (
+                  SELECT 1 FROM _bus_stop_import e
+                  WHERE e.norm = s.norm
+                    AND e.seq < s.seq
+                    AND e.geom && ST_Expand(s.geom, :tol_deg)
+                    AND ST_DWithin(e.geom::geography, s.geom::geography, :tol_m)
+              )
+          AND NOT EXISTS (
+                  SELECT 1 FROM places p
+                  WHERE p.place_type = 'bus_stop'
+                    AND p.deleted_at IS NULL
+                    AND p.geom && ST_Expand(s.geom, :tol_deg)
+                    AND ST_DWithin(p.geom::geography, s.geom::geography, :tol_m)
+                    AND {_NORM_NAME_SQL.format(col="COALESCE(p.name, '')")} = s.norm
+              )
+    ), ins AS (
+        INSERT INTO places (name, place_type, geom)
+        SELECT name, 'bus_stop', geom FROM survivors ORDER BY seq
+        RETURNING 1
+    )
+    SELECT count(*) FROM ins
+"""
+
+
 def _insert_bus_stops_dedup(stops: list[dict], max_distance_m: float = 20.0) -> tuple[int, int]:
-    """Insert bus stops with simple de-duplication by proximity+name."""
-    ins, skip = 0, 0
+    """Bulk-insert bus stops, skipping ones within max_distance_m of a same-named stop.
+
+    Stops are COPYed into an indexed temp table and deduplicated against
+    earlier stops of the same batch and live stops in places in one
+    statement, all in one transaction.
+    """
+    rows = []
     for st in stops:
-        name = st.get("name") or "Bus Stop"
-        lon = st.get("lon")
-        lat = st.get("lat")
+        lon, lat = st.get("lon"), st.get("lat")
         if lon is None or lat is None:
-            skip += 1
             continue
+        name = (st.get("name") or "").strip() or "Bus Stop"
+        rows.append((len(rows), name, float(lon), float(lat)))
+    if not rows:
+        return 0, len(stops)
 
-        point = func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326)
-        cand = (
-            db.session.query(Place)
-            .filter(Place.place_type == "bus_stop")
-            .order_by(func.ST_DistanceSphere(Place.geom, point))
-            .first()
-        )
-        if cand is not None:
-            try:
-                dist = db.session.execute(
-                    db.text("SELECT ST_DistanceSphere(:a, :b)"),
-                    {"a": point, "b": cand.geom},
-                ).scalar()
-            except Exception:
-                dist = None
-            same_name = (cand.name or "").strip().lower() == name.strip().lower()
-            if dist is not None and dist <= max_distance_m and same_name:
-                skip += 1
-                continue
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    # Degrees that cover max_distance_m in longitude at the batch's highest latitude (index prefilter)
+    max_lat = max(abs(r[3]) for r in rows)
+    tol_deg = max_distance_m / (111320.0 * max(math.cos(math.radians(max_lat)), 0.01))
 
-        pt = Point(lon, lat)
-        geom = from_shape(pt, srid=4326)
-        db.session.add(Place(name=name, place_type="bus_stop", description=None, geom=geom))
-        ins += 1
+    try:
+        db.session.execute(db.text(_STAGE_TABLE_SQL))
+        # Every gunicorn worker may import at once; the dedup below only sees committed
+        # stops, so serialize the imports until commit
+        db.session.execute(db.text("SELECT pg_advisory_xact_lock(hashtext('bus_stop_import'))"))
+        cur = db.session.connection().connection.cursor()
+        cur.copy_expert("COPY _bus_stop_import (seq, name, lon, lat) FROM STDIN WITH (FORMAT csv)", buf)
+        for stmt in _STAGE_INDEX_SQL:
+            db.session.execute(db.text(stmt))
+        ins = db.session.execute(
+            db.text(_DEDUP_INSERT_SQL), {"tol_m": max_distance_m, "tol_deg": tol_deg}
+        ).scalar()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
 
     if ins:
-        db.session.commit()
-    return ins, skip
+        bus_stop_index.invalidate()
+        walk_access.stops_changed()
+    return ins, len(stops) - ins
+
+
+def _import_bus_stops(source: str, bbox: str | None = None) -> dict:
+    """Fetch stops from "local" (snapshot/PBF), "overpass" or "auto" (local first) and insert new ones."""
+    stops = local_stops(bbox) if source in ("auto", "local") else None
+    used = "local"
+    if not stops and source in ("auto", "overpass"):
+        stops = _overpass_fetch_bus_stops(bbox=bbox)
+        used = "overpass"
+        # Never replace a whole-country PBF snapshot with one Overpass bbox
+        snap = read_snapshot()
+        if stops and not bbox and (snap is None or snap.get("source") == "overpass"):
+            write_snapshot(stops, "overpass")
+    stops = stops or []
+    inserted, skipped = _insert_bus_stops_dedup(stops)
+    return {
+        "status": "ok",
+        "source": used,
+        "bbox": bbox,
+        "inserted": inserted,
+        "skipped": skipped,
+        "total_fetched": len(stops),
+    }
+
+
+def _bus_stop_import_response(source: str):
+    """Run the import inline and return its counts; with ?async=1 start the background job instead (202)."""
+    payload = request.get_json(silent=True) or {}
+    bbox = request.args.get("bbox") or payload.get("bbox")
+    if request.args.get("async") not in ("1", "true"):
+        return jsonify(_import_bus_stops(source, bbox))
+    started = _bus_stop_job.start(current_app._get_current_object(), _import_bus_stops, source, bbox)
+    return jsonify({"status": "started" if started else "running", "job": _bus_stop_job.status()}), 202
 
 
 @routing_bp.route("/import_bus_stops_overpass", methods=["POST", "GET"])  # optional bbox query param
 def import_bus_stops_overpass():
     try:
-        payload = {}
-        try:
-            payload = request.get_json(silent=True) or {}
-        except Exception:
-            payload = {}
+        return _bus_stop_import_response("overpass")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@routing_bp.route("/import_bus_stops_local", methods=["POST", "GET"])  # optional bbox query param
+def import_bus_stops_local():
+    """Import from the PBF snapshot (re-extracted first if the PBF is newer)."""
+    try:
+        return _bus_stop_import_response("local")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def _store_bus_routes(bbox: str | None, routes: list[dict]) -> dict:
+    stored, skipped = store_routes(routes)
+    return {
+        "status": "ok",
+        "source": "overpass",
+        "bbox": bbox,
+        "stored": stored,
+        "skipped": skipped,
+        "total_fetched": len(routes),
+    }
+
+
+@routing_bp.route("/import_bus_routes_overpass", methods=["POST", "GET"])  # optional bbox query param
+def import_bus_routes_overpass():
+    try:
+        payload = request.get_json(silent=True) or {}
         bbox = request.args.get("bbox") or payload.get("bbox")
-        stops = _overpass_fetch_bus_stops(bbox=bbox)
-        inserted, skipped = _insert_bus_stops_dedup(stops)
-        return jsonify(
-            {
-                "status": "ok",
-                "source": "overpass",
-                "bbox": bbox,
-                "inserted": inserted,
-                "skipped": skipped,
-                "total_fetched": len(stops),
-            }
-        )
+        return jsonify(_store_bus_routes(bbox, _overpass_fetch_bus_routes(bbox=bbox)))
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
 
@@ -234,263 +599,667 @@ def bus_stop_count():
         c = (
             db.session.query(func.count())
             .select_from(Place)
-            .filter(Place.place_type == "bus_stop")
+            .filter(Place.place_type == "bus_stop", Place.deleted_at.is_(None))
             .scalar()
         )
-        return jsonify({"count": int(c)})
+        return jsonify({"count": int(c), "import_job": _bus_stop_job.status()})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@routing_bp.route("/route_bus")
-def route_bus():
+def _ensure_bus_stops():
+    """Start a background import (snapshot, PBF or Overpass) if the DB has no bus stops yet.
+
+    Never imports on the request path: this request plans without stops. If
+    the last import failed or found nothing, it is retried only after
+    BUS_STOP_AUTO_RETRY_S.
+    """
     try:
-        start = request.args.get("start")  
-        end = request.args.get("end")
-        if not start or not end:
-            return jsonify({"error": "start and end are required as 'lon,lat'"}), 400
+        count = (
+            db.session.query(func.count())
+            .select_from(Place)
+            .filter(Place.place_type == "bus_stop", Place.deleted_at.is_(None))
+            .scalar()
+        )
+    except Exception:
+        count = 0
+    if count:
+        return
+    finished_at = _bus_stop_job.finished_at
+    if finished_at and time.time() - finished_at < BUS_STOP_AUTO_RETRY_S:
+        return
+    _bus_stop_job.start(current_app._get_current_object(), _import_bus_stops, "auto")
 
-        slon, slat = map(float, start.split(","))
-        elon, elat = map(float, end.split(","))
 
-        try:
-            count = (
-                db.session.query(func.count())
-                .select_from(Place)
-                .filter(Place.place_type == "bus_stop")
-                .scalar()
+def _without_repeats(stops: list) -> list:
+    """Drop consecutive duplicates: a same-stop transfer ends one ride and starts the next."""
+    return [st for i, st in enumerate(stops) if i == 0 or st != stops[i - 1]]
+
+
+def _transit_plan(slon: float, slat: float, elon: float, elat: float):
+    """Planner over the imported bus lines with RAPTOR; returns None if no network or no connection.
+
+    Considers the TRANSIT_ACCESS_K nearest stops within TRANSIT_MAX_WALK_M at
+    both ends and returns the same segment-based FeatureCollection as
+    _bus_plan, with extra "walk-transfer" segments between lines.
+    """
+    net = transit_network.get()
+    if net is None:
+        return None
+    sources = net.access_stops(slon, slat, TRANSIT_ACCESS_K, TRANSIT_MAX_WALK_M)
+    targets = net.access_stops(elon, elat, TRANSIT_ACCESS_K, TRANSIT_MAX_WALK_M)
+    if not sources or not targets:
+        return None
+    found = net.raptor(sources, targets)
+    if found is None:
+        return None
+    _, legs = found
+    rides = [leg for leg in legs if leg.kind == "ride"]
+    if not rides:
+        return None
+
+    def coords(stop):
+        return net.stop_lon[stop], net.stop_lat[stop]
+
+    # Route every walking piece through OSRM concurrently, plus the car-only comparison
+    calls = {}
+    for i, leg in enumerate(legs):
+        if leg.kind == "access":
+            calls[i] = ("leg", "foot", slon, slat, *coords(leg.to_stop))
+        elif leg.kind == "egress":
+            calls[i] = ("leg", "foot", *coords(leg.from_stop), elon, elat)
+        elif leg.kind == "transfer":
+            calls[i] = ("leg", "foot", *coords(leg.from_stop), *coords(leg.to_stop))
+    calls["car_full"] = ("leg", "car", slon, slat, elon, elat)
+    yield StartCalls(calls)
+    walks = yield WaitCalls(tuple(calls))
+
+    features = []
+    ride_stops = []  # every stop passed, ride after ride
+    end_stops = []  # boarding and alighting stop of each ride
+    lines = []
+    walk_to_m = walk_from_m = transfer_m = bus_m = 0.0
+    bus_s = wait_s = 0.0
+    for i, leg in enumerate(legs):
+        if leg.kind == "ride":
+            seq = net.route_stop_seq(leg.route)[leg.board_pos:leg.alight_pos + 1]
+            pts = [coords(st) for st in seq]
+            dist_m = sum(haversine(*a, *b) for a, b in zip(pts, pts[1:]))
+            ride_s = net.ride_seconds(leg.route, leg.board_pos, leg.alight_pos)
+            bus_m += dist_m
+            bus_s += ride_s
+            wait_s += net.route_headway[leg.route] / 2.0
+            ride_stops.extend(seq)
+            end_stops += [leg.from_stop, leg.to_stop]
+            lines.append(
+                {
+                    "ref": net.route_ref[leg.route],
+                    "name": net.route_name[leg.route],
+                    "from_stop": net.stop_name[leg.from_stop],
+                    "to_stop": net.stop_name[leg.to_stop],
+                    "stops": len(seq),
+                }
             )
-        except Exception:
-            count = 0
-        if not count or count == 0:
-            fetched = _overpass_fetch_bus_stops()
-            if fetched:
-                _insert_bus_stops_dedup(fetched)
-
-        point_start = func.ST_SetSRID(func.ST_MakePoint(slon, slat), 4326)
-        point_end = func.ST_SetSRID(func.ST_MakePoint(elon, elat), 4326)
-
-        start_stop = (
-            db.session.query(Place)
-            .filter(Place.place_type == "bus_stop")
-            .order_by(func.ST_DistanceSphere(Place.geom, point_start))
-            .first()
-        )
-        end_stop = (
-            db.session.query(Place)
-            .filter(Place.place_type == "bus_stop")
-            .order_by(func.ST_DistanceSphere(Place.geom, point_end))
-            .first()
-        )
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": _line(pts),
+                    "properties": {
+                        "segment": "bus",
+                        "mode": "bus",
+                        "route_ref": net.route_ref[leg.route],
+                        "route_name": net.route_name[leg.route],
+                        "distance_m": round(dist_m, 1),
+                        "duration_s": round(ride_s, 1),
+                        "from_stop": net.stop_name[leg.from_stop],
+                        "to_stop": net.stop_name[leg.to_stop],
+                    },
+                }
+            )
+            continue
+
+        (geom, dist_m, dur_s), _ = walks[i]
+        props = {"mode": "foot", "distance_m": _round_or_none(dist_m), "duration_s": _round_or_none(dur_s)}
+        if leg.kind == "access":
+            walk_to_m += dist_m
+            props.update(segment="walk-to-stop", to_stop=net.stop_name[leg.to_stop])
+        elif leg.kind == "egress":
+            walk_from_m += dist_m
+            props.update(segment="walk-from-stop", from_stop=net.stop_name[leg.from_stop])
+        else:
+            transfer_m += dist_m
+            props.update(
+                segment="walk-transfer", from_stop=net.stop_name[leg.from_stop], to_stop=net.stop_name[leg.to_stop]
+            )
+        features.append({"type": "Feature", "geometry": geom, "properties": props})
+
+    first_stop = rides[0].from_stop
+    last_stop = rides[-1].to_stop
+    (_, car_dist_m, _), _ = walks["car_full"]
+    walk1_s = round(walk_to_m / WALK_MPS)
+    walk2_s = round(walk_from_m / WALK_MPS)
+    transfer_s = round(transfer_m / WALK_MPS)
+    summary = {
+        "start_stop": {"id": None, "name": net.stop_name[first_stop], "coords": list(coords(first_stop))},
+        "end_stop": {"id": None, "name": net.stop_name[last_stop], "coords": list(coords(last_stop))},
+        "bus_stops": [{"id": None, "name": net.stop_name[st]} for st in _without_repeats(end_stops)],
+        "intermediate_stops": [
+            {"id": None, "name": net.stop_name[st], "coords": list(coords(st))} for st in _without_repeats(ride_stops)
+        ],
+        "lines": lines,
+        "transfers": len(lines) - 1,
+        "note": "Planned over imported OSM bus lines; waits assume half the line headway.",
+        "times": {
+            "speeds_kmh": {"walk": 5, "bus": 20, "car": 30},
+            "distances_m": {
+                "walk_to_stop": round(walk_to_m, 1),
+                "bus": round(bus_m, 1),
+                "walk_transfer": round(transfer_m, 1),
+                "walk_from_stop": round(walk_from_m, 1),
+            },
+            "segments": {
+                "walk_to_stop_s": walk1_s,
+                "wait_s": round(wait_s),
+                "bus_s": round(bus_s),
+                "walk_transfer_s": transfer_s,
+                "walk_from_stop_s": walk2_s,
+            },
+            "total_time_s": walk1_s + round(wait_s) + round(bus_s) + transfer_s + walk2_s,
+            "car_only": {
+                "distance_m": round(float(car_dist_m or 0.0), 1),
+                "duration_s": round(float(car_dist_m or 0.0) / CAR_MPS) if car_dist_m else 0,
+            },
+        },
+    }
+    return {"type": "FeatureCollection", "features": features, "summary": summary}
+
+
+# Live bus stops within :tol metres of the GeoJSON line :g, in order along it. The
+# predicates match ix_places_bus_stop_geog (migrations/0004_query_indexes.py).
+_INTERMEDIATE_STOPS_SQL = """
+    WITH route AS (
+        SELECT ST_SetSRID(ST_GeomFromGeoJSON(:g), 4326) AS g
+    )
+    SELECT p.id, p.name,
+           ST_X(ST_Transform(p.geom, 4326)) AS lon,
+           ST_Y(ST_Transform(p.geom, 4326)) AS lat,
+           ST_LineLocatePoint(r.g, p.geom) AS loc
+    FROM places p, route r
+    WHERE p.place_type = 'bus_stop'
+          AND p.deleted_at IS NULL
+          AND ST_DWithin(p.geom::geography, r.g::geography, :tol)
+    ORDER BY loc
+"""
+
 
-        if not start_stop or not end_stop:
-            res = _osrm_route("car", slon, slat, elon, elat)
-            if res:
-                geom, dist_m, dur_s = res
-                return jsonify(
+def _bus_plan(slon: float, slat: float, elon: float, elat: float):
+    """Planner for walk → bus → walk between two points; returns the /route_bus FeatureCollection dict.
+
+    Uses the imported bus lines when available, otherwise the nearest boarding
+    and alighting stops with the car profile as a proxy for the bus.
+    """
+    transit = yield from _transit_plan(slon, slat, elon, elat)
+    if transit is not None:
+        return transit
+
+    # Saved places have their walk to the nearest stops precomputed; pick the quickest one
+    start_access = walk_access.lookup(slon, slat)
+    end_access = walk_access.lookup(elon, elat)
+    if start_access:
+        start_stop = start_access[0][0]
+    else:
+        start_hit = bus_stop_index.nearest(slon, slat, k=1)
+        start_stop = start_hit[0][1] if start_hit else None
+    if end_access:
+        end_stop = end_access[0][0]
+    else:
+        end_hit = bus_stop_index.nearest(elon, elat, k=1)
+        end_stop = end_hit[0][1] if end_hit else None
+
+    if not start_stop or not end_stop:
+        res = yield from _call("car", "route", "car", slon, slat, elon, elat)
+        if res:
+            geom, dist_m, dur_s = res
+            return {
+                "type": "FeatureCollection",
+                "features": [
                     {
-                        "type": "FeatureCollection",
-                        "features": [
-                            {
-                                "type": "Feature",
-                                "geometry": geom,
-                                "properties": {
-                                    "mode": "bus-proxy",
-                                    "distance_m": round(dist_m, 1),
-                                    "duration_s": round(dur_s, 1),
-                                },
-                            }
-                        ],
-                        "summary": {
-                            "message": "Bus stops not available in DB; showing approximated route",
-                            "bus_stops": [],
+                        "type": "Feature",
+                        "geometry": geom,
+                        "properties": {
+                            "mode": "bus-proxy",
+                            "distance_m": round(dist_m, 1),
+                            "duration_s": round(dur_s, 1),
                         },
                     }
-                )
-            line = LineString([(slon, slat), (elon, elat)])
-            feature = {
-                "type": "Feature",
-                "geometry": mapping(line),
-                "properties": {"mode": "straight-line"},
+                ],
+                "summary": {
+                    "message": "Bus stops not available in DB; showing approximated route",
+                    "bus_stops": [],
+                },
             }
-            return jsonify({"type": "FeatureCollection", "features": [feature], "summary": {"bus_stops": []}})
-
-        s_stop_geom = to_shape(start_stop.geom)
-        e_stop_geom = to_shape(end_stop.geom)
-        sst_lon, sst_lat = s_stop_geom.x, s_stop_geom.y
-        est_lon, est_lat = e_stop_geom.x, e_stop_geom.y
-
-        features = []
-        summary = {
-            "start_stop": {"id": start_stop.id, "name": start_stop.name, "coords": [sst_lon, sst_lat]},
-            "end_stop": {"id": end_stop.id, "name": end_stop.name, "coords": [est_lon, est_lat]},
-            "bus_stops": [
-                {"id": start_stop.id, "name": start_stop.name},
-                {"id": end_stop.id, "name": end_stop.name},
-            ],
-            "note": "Intermediate stops require route line data; currently showing nearest boarding and alighting stops only.",
+        feature = {
+            "type": "Feature",
+            "geometry": _line([(slon, slat), (elon, elat)]),
+            "properties": {"mode": "straight-line"},
         }
+        return {"type": "FeatureCollection", "features": [feature], "summary": {"bus_stops": []}}
 
-        # 1) Walk to start stop
-        walk1 = _osrm_route("foot", slon, slat, sst_lon, sst_lat)
-        walk1_dist = None
-        if walk1:
-            geom, dist_m, dur_s = walk1
-            walk1_dist = dist_m
-        else:
-            car_alt = _osrm_route("car", slon, slat, sst_lon, sst_lat)
-            if car_alt:
-                geom, dist_m, dur_s = car_alt
-                walk1_dist = dist_m
-            else:
-                line = LineString([(slon, slat), (sst_lon, sst_lat)])
-                geom = mapping(line)
-                dist_m = haversine(slon, slat, sst_lon, sst_lat)
-                dur_s = None
-                walk1_dist = dist_m
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": geom,
-                "properties": {
-                    "segment": "walk-to-stop",
-                    "mode": "foot",
-                    "distance_m": round(dist_m, 1) if dist_m is not None else None,
-                    "duration_s": round(dur_s, 1) if isinstance(dur_s, (int, float)) else None,
-                    "to_stop": start_stop.name,
-                },
-            }
-        )
+    sst_lon, sst_lat = start_stop.lon, start_stop.lat
+    est_lon, est_lat = end_stop.lon, end_stop.lat
 
-        # 2) Bus between stops (use car profile as proxy for path/length)
-        bus_leg = _osrm_route("car", sst_lon, sst_lat, est_lon, est_lat)
-        bus_dist = None
-        if bus_leg:
-            geom, dist_m, dur_s = bus_leg
-            bus_dist = dist_m
-        else:
-            line = LineString([(sst_lon, sst_lat), (est_lon, est_lat)])
-            geom = mapping(line)
-            dist_m = haversine(sst_lon, sst_lat, est_lon, est_lat)
-            dur_s = None
-            bus_dist = dist_m
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": geom,
-                "properties": {
-                    "segment": "bus",
-                    "mode": "bus",
-                    "distance_m": round(dist_m, 1) if dist_m is not None else None,
-                    "duration_s": round(dur_s, 1) if isinstance(dur_s, (int, float)) else None,
-                    "from_stop": start_stop.name,
-                    "to_stop": end_stop.name,
-                },
-            }
-        )
+    summary = {
+        "start_stop": {"id": start_stop.id, "name": start_stop.name, "coords": [sst_lon, sst_lat]},
+        "end_stop": {"id": end_stop.id, "name": end_stop.name, "coords": [est_lon, est_lat]},
+        "bus_stops": [
+            {"id": start_stop.id, "name": start_stop.name},
+            {"id": end_stop.id, "name": end_stop.name},
+        ],
+        "note": "Intermediate stops require route line data; currently showing nearest boarding and alighting stops only.",
+    }
 
-        # Find bus stops along the bus leg (approximate: within 100m of route, ordered)
-        try:
-            geojson_str = json.dumps(geom)
-            sql = db.text(
-                """
-                WITH route AS (
-                    SELECT ST_SetSRID(ST_GeomFromGeoJSON(:g), 4326) AS g
-                )
-                SELECT p.id, p.name,
-                       ST_X(ST_Transform(p.geom, 4326)) AS lon,
-                       ST_Y(ST_Transform(p.geom, 4326)) AS lat,
-                       ST_LineLocatePoint(r.g, p.geom) AS loc
-                FROM places p, route r
-                WHERE p.place_type = 'bus_stop'
-                      AND ST_DWithin(p.geom::geography, r.g::geography, :tol)
-                ORDER BY loc
-                """
-            )
-            rows = db.session.execute(sql, {"g": geojson_str, "tol": 100}).fetchall()
-            intermediate = [
-                {"id": r[0], "name": r[1], "coords": [float(r[2]), float(r[3])]}
-                for r in rows
+    # The four OSRM legs are independent, so dispatch them together and
+    # overlap the intermediate-stop query with the walk/car legs still in flight.
+    t_total = time.perf_counter()
+    calls = {
+        "bus": ("leg", "car", sst_lon, sst_lat, est_lon, est_lat),
+        "car_full": ("leg", "car", slon, slat, elon, elat),
+    }
+    if not start_access:
+        calls["walk1"] = ("leg", "foot", slon, slat, sst_lon, sst_lat)
+    if not end_access:
+        calls["walk2"] = ("leg", "foot", est_lon, est_lat, elon, elat)
+    yield StartCalls(calls)
+    timings = {}
+
+    # 2) Bus between stops (use car profile as proxy for path/length)
+    (bus_geom, bus_dist, bus_dur), timings["bus_ms"] = (yield WaitCalls(("bus",)))["bus"]
+
+    # Find bus stops along the bus leg (approximate: within 100m of route, ordered)
+    t0 = time.perf_counter()
+    try:
+        geojson_str = json.dumps(bus_geom)
+        rows = db.session.execute(
+            db.text(_INTERMEDIATE_STOPS_SQL), {"g": geojson_str, "tol": 100}
+        ).fetchall()
+        intermediate = [
+            {"id": r[0], "name": r[1], "coords": [float(r[2]), float(r[3])]}
+            for r in rows
+        ]
+        summary["intermediate_stops"] = intermediate
+    except Exception:
+        summary["intermediate_stops"] = []
+    timings["intermediate_stops_ms"] = (time.perf_counter() - t0) * 1000
+
+    # 1) Walk to start stop, 3) walk from end stop to destination
+    done = yield WaitCalls(tuple(n for n in ("walk1", "walk2", "car_full") if n in calls))
+    if start_access:
+        done["walk1"] = _precomputed_leg(slon, slat, sst_lon, sst_lat, start_access[0][1], start_access[0][2])
+    if end_access:
+        # Foot routing is direction-independent, so the place -> stop entry serves stop -> place too
+        done["walk2"] = _precomputed_leg(est_lon, est_lat, elon, elat, end_access[0][1], end_access[0][2])
+    (walk1_geom, walk1_dist, walk1_dur), timings["walk_to_stop_ms"] = done["walk1"]
+    (walk2_geom, walk2_dist, walk2_dur), timings["walk_from_stop_ms"] = done["walk2"]
+    summary["precomputed_walk"] = {"to_stop": bool(start_access), "from_stop": bool(end_access)}
+    (_, car_dist_m, _), timings["car_full_ms"] = done["car_full"]
+    timings["total_ms"] = (time.perf_counter() - t_total) * 1000
+    summary["timings_ms"] = {k: round(v, 1) for k, v in timings.items()}
+
+    features = [
+        {
+            "type": "Feature",
+            "geometry": walk1_geom,
+            "properties": {
+                "segment": "walk-to-stop",
+                "mode": "foot",
+                "distance_m": _round_or_none(walk1_dist),
+                "duration_s": _round_or_none(walk1_dur),
+                "to_stop": start_stop.name,
+            },
+        },
+        {
+            "type": "Feature",
+            "geometry": bus_geom,
+            "properties": {
+                "segment": "bus",
+                "mode": "bus",
+                "distance_m": _round_or_none(bus_dist),
+                "duration_s": _round_or_none(bus_dur),
+                "from_stop": start_stop.name,
+                "to_stop": end_stop.name,
+            },
+        },
+        {
+            "type": "Feature",
+            "geometry": walk2_geom,
+            "properties": {
+                "segment": "walk-from-stop",
+                "mode": "foot",
+                "distance_m": _round_or_none(walk2_dist),
+                "duration_s": _round_or_none(walk2_dur),
+                "from_stop": end_stop.name,
+            },
+        },
+    ]
+
+    # Calculate times based on fixed speeds: walk 5km/h, bus 20km/h, car 30km/h
+    try:
+        w1 = float(walk1_dist or 0.0)
+        b = float(bus_dist or 0.0)
+        w2 = float(walk2_dist or 0.0)
+        walk1_s = round(w1 / WALK_MPS) if w1 > 0 else 0
+        bus_s = round(b / BUS_MPS) if b > 0 else 0
+        walk2_s = round(w2 / WALK_MPS) if w2 > 0 else 0
+        total_s = walk1_s + bus_s + walk2_s
+
+        # Car-only alternative over the whole start→end
+        car_only_s = round(float(car_dist_m or 0.0) / CAR_MPS) if car_dist_m else 0
+
+        summary["times"] = {
+            "speeds_kmh": {"walk": 5, "bus": 20, "car": 30},
+            "distances_m": {
+                "walk_to_stop": round(w1, 1),
+                "bus": round(b, 1),
+                "walk_from_stop": round(w2, 1),
+            },
+            "segments": {
+                "walk_to_stop_s": walk1_s,
+                "bus_s": bus_s,
+                "walk_from_stop_s": walk2_s,
+            },
+            "total_time_s": total_s,
+            "car_only": {
+                "distance_m": round(float(car_dist_m or 0.0), 1),
+                "duration_s": car_only_s,
+            },
+        }
+    except Exception:
+        # If anything fails, don't block the response
+        pass
+
+    return {"type": "FeatureCollection", "features": features, "summary": summary}
+
+
+def _route_bus_plan(slon: float, slat: float, elon: float, elat: float):
+    _ensure_bus_stops()
+    return (yield from _bus_plan(slon, slat, elon, elat))
+
+
+@routing_bp.route("/route_bus")
+def route_bus():
+    try:
+        return jsonify(_run_plan(_route_bus_plan(*_parse_endpoints(request.args))))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def _parse_waypoints(payload: dict):
+    """(mode, [(lon, lat), ...]) from a /route_multi body; ValueError on bad input."""
+    mode = (payload.get("mode") or "car").lower()
+    waypoints = [(float(w[0]), float(w[1])) for w in payload.get("waypoints") or []]
+    if len(waypoints) < 2:
+        raise ValueError("at least two waypoints are required as [lon, lat]")
+    if len(waypoints) > MAX_MULTI_WAYPOINTS:
+        raise ValueError(f"at most {MAX_MULTI_WAYPOINTS} waypoints are supported")
+    return mode, waypoints
+
+
+def _route_multi_plan(mode: str, waypoints):
+    """Planner for /route_multi.
+
+    Car/foot use a single multi-waypoint OSRM call; bus legs are planned in parallel.
+    """
+    pairs = list(zip(waypoints, waypoints[1:]))
+    features = []
+    legs = []
+    if mode == "bus":
+        _ensure_bus_stops()
+        calls = {i: ("bus_route", *a, *b) for i, (a, b) in enumerate(pairs)}
+        yield StartCalls(calls)
+        planned = yield WaitCalls(tuple(calls))
+        for i in range(len(pairs)):
+            fc, _ = planned[i]
+            summary = fc.get("summary") or {}
+            times = summary.get("times") or {}
+            dist = sum(f["properties"].get("distance_m") or 0.0 for f in fc["features"])
+            dur = times.get("total_time_s")
+            if dur is None:
+                dur = sum(f["properties"].get("duration_s") or 0.0 for f in fc["features"])
+            for f in fc["features"]:
+                f["properties"]["leg"] = i
+                features.append(f)
+            legs.append({"leg": i, "distance_m": round(dist, 1), "duration_s": round(dur, 1), "summary": summary})
+    else:
+        leg_mode = mode
+        routed = yield from _call("multi", "multi", mode, waypoints)
+        if routed is None and mode == "foot":
+            routed = yield from _call("multi", "multi", "car", waypoints)
+            leg_mode = "foot-fallback-car"
+        if routed is None:
+            leg_mode = "straight-line"
+            routed = [
+                (_line([a, b]), haversine(a[0], a[1], b[0], b[1]), None)
+                for a, b in pairs
             ]
-            summary["intermediate_stops"] = intermediate
-        except Exception:
-            summary["intermediate_stops"] = []
-
-        # 3) Walk from end stop to destination
-        walk2 = _osrm_route("foot", est_lon, est_lat, elon, elat)
-        walk2_dist = None
-        if walk2:
-            geom, dist_m, dur_s = walk2
-            walk2_dist = dist_m
+        for i, (geom, dist_m, dur_s) in enumerate(routed):
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": geom,
+                    "properties": {
+                        "leg": i,
+                        "mode": leg_mode,
+                        "distance_m": _round_or_none(dist_m),
+                        "duration_s": _round_or_none(dur_s),
+                    },
+                }
+            )
+            legs.append({"leg": i, "distance_m": _round_or_none(dist_m), "duration_s": _round_or_none(dur_s)})
+
+    durations = [leg["duration_s"] for leg in legs]
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "legs": legs,
+        "summary": {
+            "mode": mode,
+            "total_distance_m": round(sum(leg["distance_m"] or 0.0 for leg in legs), 1),
+            "total_duration_s": round(sum(durations), 1) if None not in durations else None,
+        },
+    }
+
+
+@routing_bp.route("/route_multi", methods=["POST"])
+def route_multi():
+    """Route an ordered list of waypoints in one request.
+
+    Body: {"waypoints": [[lon, lat], ...], "mode": "car" | "foot" | "bus"}.
+    Car/foot use a single multi-waypoint OSRM call; bus legs are planned in parallel.
+    """
+    try:
+        mode, waypoints = _parse_waypoints(request.get_json(silent=True) or {})
+        return jsonify(_run_plan(_route_multi_plan(mode, waypoints)))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def _haversine_matrix(points, speed_mps: float):
+    """Straight-line (durations, distances) matrices, used when OSRM table is unavailable."""
+    dist = [[haversine(a[0], a[1], b[0], b[1]) for b in points] for a in points]
+    dur = [[d / speed_mps for d in row] for row in dist]
+    return dur, dist
+
+
+def _bus_estimate_matrix(points):
+    """Calls and finisher for a walk → bus → walk estimate between every pair of points, without geometry.
+
+    Uses the nearest stop of each point, one foot table (point → its stop) and
+    one car table (stop ↔ stop), timed with the same fixed speeds as /route_bus.
+    Returns (calls, finish) as for _mode_matrix_calls, or None when no bus stops are known.
+    """
+    stops = []
+    for lon, lat in points:
+        hit = bus_stop_index.nearest(lon, lat, k=1)
+        if not hit:
+            return None
+        stops.append((hit[0][1].lon, hit[0][1].lat))
+
+    n = len(points)
+    calls = {
+        "bus_walk": ("table", "foot", points + stops, list(range(n)), list(range(n, 2 * n))),
+        "bus_ride": ("table", "car", stops, None, None),
+    }
+
+    def finish(done):
+        source = "osrm"
+        walk_tbl, _ = done["bus_walk"]
+        bus_tbl, _ = done["bus_ride"]
+        if walk_tbl and walk_tbl[1]:
+            walk = [walk_tbl[1][i][i] for i in range(n)]
         else:
-            car_alt2 = _osrm_route("car", est_lon, est_lat, elon, elat)
-            if car_alt2:
-                geom, dist_m, dur_s = car_alt2
-                walk2_dist = dist_m
-            else:
-                line = LineString([(est_lon, est_lat), (elon, elat)])
-                geom = mapping(line)
-                dist_m = haversine(est_lon, est_lat, elon, elat)
-                dur_s = None
-                walk2_dist = dist_m
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": geom,
-                "properties": {
-                    "segment": "walk-from-stop",
-                    "mode": "foot",
-                    "distance_m": round(dist_m, 1) if dist_m is not None else None,
-                    "duration_s": round(dur_s, 1) if isinstance(dur_s, (int, float)) else None,
-                    "from_stop": end_stop.name,
-                },
-            }
-        )
+            walk = [None] * n
+        walk = [
+            w if w is not None else haversine(p[0], p[1], st[0], st[1])
+            for w, p, st in zip(walk, points, stops)
+        ]
+        if bus_tbl and bus_tbl[1]:
+            bus = bus_tbl[1]
+        else:
+            bus = _haversine_matrix(stops, BUS_MPS)[1]
+            source = "haversine"
 
-        # Calculate times based on fixed speeds: walk 5km/h, bus 20km/h, car 30km/h
-        try:
-            WALK_MPS = 5000.0 / 3600.0
-            BUS_MPS = 20000.0 / 3600.0
-            CAR_MPS = 30000.0 / 3600.0
-
-            w1 = float(walk1_dist or 0.0)
-            b = float(bus_dist or 0.0)
-            w2 = float(walk2_dist or 0.0)
-            walk1_s = round(w1 / WALK_MPS) if w1 > 0 else 0
-            bus_s = round(b / BUS_MPS) if b > 0 else 0
-            walk2_s = round(w2 / WALK_MPS) if w2 > 0 else 0
-            total_s = walk1_s + bus_s + walk2_s
-
-            # Car-only alternative over the whole start→end
-            car_full = _osrm_route("car", slon, slat, elon, elat)
-            if car_full:
-                _, car_dist_m, _ = car_full
-            else:
-                car_dist_m = haversine(slon, slat, elon, elat)
-            car_only_s = round(float(car_dist_m or 0.0) / CAR_MPS) if car_dist_m else 0
-
-            summary["times"] = {
-                "speeds_kmh": {"walk": 5, "bus": 20, "car": 30},
-                "distances_m": {
-                    "walk_to_stop": round(w1, 1),
-                    "bus": round(b, 1),
-                    "walk_from_stop": round(w2, 1),
-                },
-                "segments": {
-                    "walk_to_stop_s": walk1_s,
-                    "bus_s": bus_s,
-                    "walk_from_stop_s": walk2_s,
-                },
-                "total_time_s": total_s,
-                "car_only": {
-                    "distance_m": round(float(car_dist_m or 0.0), 1),
-                    "duration_s": car_only_s,
-                },
-            }
-        except Exception:
-            # If anything fails, don't block the response
-            pass
+        durations, distances = [], []
+        for i in range(n):
+            dur_row, dist_row = [], []
+            for j in range(n):
+                if i == j:
+                    dur_row.append(0.0)
+                    dist_row.append(0.0)
+                    continue
+                b = bus[i][j] if bus[i][j] is not None else haversine(*stops[i], *stops[j])
+                dur_row.append(round(walk[i] / WALK_MPS + b / BUS_MPS + walk[j] / WALK_MPS, 1))
+                dist_row.append(round(walk[i] + b + walk[j], 1))
+            durations.append(dur_row)
+            distances.append(dist_row)
+        return durations, distances, source
+
+    return calls, finish
+
+
+def _mode_matrix_calls(points, mode: str):
+    """(calls, finish) for one mode's matrix: the OSRM table calls it needs (names unique per mode)
+    and a function turning their results into (durations, distances, source)."""
+    if mode == "bus":
+        planned = _bus_estimate_matrix(points)
+        if planned is not None:
+            return planned
+
+        def haversine_only(done):
+            dur, dist = _haversine_matrix(points, BUS_MPS)
+            return dur, dist, "haversine"
+
+        return {}, haversine_only
+
+    def finish(done):
+        tbl, _ = done[mode]
+        if tbl and tbl[1] is not None:
+            return tbl[0], tbl[1], "osrm"
+        dur, dist = _haversine_matrix(points, CAR_MPS if mode == "car" else WALK_MPS)
+        return dur, dist, "haversine"
+
+    return {mode: ("table", mode, points, None, None)}, finish
+
+
+def _matrix_calls(points, modes):
+    """Planner running the table calls of every mode at once; returns {mode: (durations, distances, source)}."""
+    calls, finishers = {}, {}
+    for mode in modes:
+        mode_calls, finishers[mode] = _mode_matrix_calls(points, mode)
+        calls.update(mode_calls)
+    done = {}
+    if calls:
+        yield StartCalls(calls)
+        done = yield WaitCalls(tuple(calls))
+    return {mode: finish(done) for mode, finish in finishers.items()}
 
-        return jsonify({"type": "FeatureCollection", "features": features, "summary": summary})
+
+def _mode_matrix(points, mode: str):
+    """Planner for (durations, distances, source) between all points for car, foot or bus."""
+    return (yield from _matrix_calls(points, [mode]))[mode]
+
+
+def _matrix_plan(payload: dict):
+    """Planner for /matrix; validates the body (ValueError) before any call."""
+    points = [(float(p[0]), float(p[1])) for p in payload.get("points") or []]
+    modes = payload.get("modes") or ["car", "foot", "bus"]
+    if len(points) < 2:
+        raise ValueError("at least two points are required as [lon, lat]")
+    if len(points) > MAX_MATRIX_POINTS:
+        raise ValueError(f"at most {MAX_MATRIX_POINTS} points are supported")
+    for mode in modes:
+        if mode not in ("car", "foot", "bus"):
+            raise ValueError(f"unsupported mode: {mode}")
+
+    out = {"points": [list(p) for p in points]}
+    # Every mode's table calls go out together, so latency is the slowest mode, not the sum
+    matrices = yield from _matrix_calls(points, modes)
+    for mode in modes:
+        dur, dist, source = matrices[mode]
+        out[mode] = {"durations": dur, "distances": dist, "source": source}
+    return out
+
+
+@routing_bp.route("/matrix", methods=["POST"])
+def matrix():
+    """Duration/distance matrices between points for several modes in one call.
+
+    Body: {"points": [[lon, lat], ...], "modes": ["car", "foot", "bus"]}.
+    Car/foot use one OSRM table call each; bus is an estimate (see _bus_estimate_matrix).
+    """
+    try:
+        return jsonify(_run_plan(_matrix_plan(request.get_json(silent=True) or {})))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def _optimize_plan(payload: dict):
+    """Planner for /route_optimize; validates the body (ValueError) before any call."""
+    mode = (payload.get("mode") or "car").lower()
+    start = payload.get("start")
+    waypoints = [(float(w[0]), float(w[1])) for w in payload.get("waypoints") or []]
+    if not start or not waypoints:
+        raise ValueError("start and waypoints are required as [lon, lat]")
+    if len(waypoints) + 1 > MAX_MATRIX_POINTS:
+        raise ValueError(f"at most {MAX_MATRIX_POINTS - 1} waypoints are supported")
+    if mode not in ("car", "foot", "bus"):
+        raise ValueError(f"unsupported mode: {mode}")
+
+    points = [(float(start[0]), float(start[1]))] + waypoints
+    dur, _, source = yield from _mode_matrix(points, mode)
+    # Unreachable pairs (None) get a large cost so they are visited last if at all avoidable
+    big = 10 * max((d for row in dur for d in row if d is not None), default=1.0) + 1.0
+    cost = [[d if d is not None else big for d in row] for row in dur]
+
+    path = solve_open_path(cost, 0, list(range(1, len(points))), budget_s=OPTIMIZE_BUDGET_S)
+    order = [i - 1 for i in path[1:]]
+    return {
+        "mode": mode,
+        "source": source,
+        "order": order,
+        "waypoints": [list(waypoints[i]) for i in order],
+        "total_duration_s": round(path_cost(cost, path), 1),
+        "initial_duration_s": round(path_cost(cost, list(range(len(points)))), 1),
+    }
+
+
+@routing_bp.route("/route_optimize", methods=["POST"])
+def route_optimize():
+    """Reorder waypoints into a short tour starting at ``start``.
+
+    Body: {"start": [lon, lat], "waypoints": [[lon, lat], ...], "mode": "car" | "foot" | "bus"}.
+    Returns ``order`` (indices into waypoints) plus the reordered waypoints and total time.
+    """
+    try:
+        return jsonify(_run_plan(_optimize_plan(request.get_json(silent=True) or {})))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
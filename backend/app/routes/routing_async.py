@@ -0,0 +1,211 @@
+"""asyncio twin of the routing blueprint, served by the ASGI entry point (app/asgi.py).
+
+Same URL paths and response bodies as routes/routing.py, produced by the same
+planner generators. Only the driver differs: OSRM and Overpass calls are
+coroutines on httpx, so a request waiting on them holds no thread and one
+process can keep thousands of them in flight. Planner steps between calls
+(DB lookups, RAPTOR, the TSP solver) run on the loop's thread pool inside the
+Flask app context, because they use Flask-SQLAlchemy.
+"""
+import asyncio
+import time
+
+import httpx
+from quart import Blueprint, current_app, jsonify, request
+
+from ..osrm import async_osrm
+from ..route_cache import route_cache
+from .routing import (
+    BUS_ROUTES_OVERPASS_TIMEOUT,
+    MULTI_ROUTE_PARAMS,
+    OVERPASS_ENDPOINTS,
+    StartCalls,
+    _bus_plan,
+    _bus_routes_query,
+    _matrix_plan,
+    _multi_legs,
+    _optimize_plan,
+    _parse_bus_routes,
+    _parse_endpoints,
+    _parse_waypoints,
+    _plan_step,
+    _route_bus_plan,
+    _route_cache_key,
+    _route_multi_plan,
+    _simple_route_plan,
+    _store_bus_routes,
+    _straight_leg,
+    async_route_flight,
+)
+
+
+routing_async_bp = Blueprint("routing_async", __name__)
+
+
+async def _cached_route(key: str):
+    """route_cache.get without blocking the loop: the in-memory layer inline, SQLite on a thread."""
+    cached = route_cache.get_local(key)
+    if cached is None:
+        if route_cache.sqlite_path:
+            cached = await asyncio.to_thread(route_cache.get_shared, key)
+        else:
+            cached = route_cache.get_shared(key)
+    return cached
+
+
+async def _osrm_route(profile: str, slon: float, slat: float, elon: float, elat: float):
+    key = _route_cache_key(profile, slon, slat, elon, elat)
+    cached = await _cached_route(key)
+    if cached is not None:
+        return tuple(cached)
+    return await async_route_flight.do(key, _fetch_route, key, profile, slon, slat, elon, elat)
+
+
+async def _fetch_route(key: str, profile: str, slon: float, slat: float, elon: float, elat: float):
+    # A flight for this key may have finished between our cache miss and becoming leader
+    cached = route_cache.get_local(key)
+    if cached is not None:
+        return tuple(cached)
+    res = await async_osrm.route(profile, slon, slat, elon, elat)
+    if res:
+        value = list(res)
+        expires_at = route_cache.put_local(key, value)
+        if route_cache.sqlite_path:
+            # Write-through in the background; the caller does not wait on SQLite
+            asyncio.get_running_loop().run_in_executor(None, route_cache.put_shared, key, value, expires_at)
+    return res
+
+
+async def _route_or_fallback(profile: str, slon: float, slat: float, elon: float, elat: float):
+    res = await _osrm_route(profile, slon, slat, elon, elat)
+    if not res and profile == "foot":
+        res = await _osrm_route("car", slon, slat, elon, elat)
+    return res or _straight_leg(slon, slat, elon, elat)
+
+
+async def _osrm_route_multi(profile: str, coords):
+    return _multi_legs(await async_osrm.request(profile, "route", coords, MULTI_ROUTE_PARAMS))
+
+
+async def _bus_route(slon: float, slat: float, elon: float, elat: float):
+    return await _run_plan_async(_bus_plan(slon, slat, elon, elat))
+
+
+# Coroutine twins of routing._SYNC_CALLS
+_ASYNC_CALLS = {
+    "route": _osrm_route,
+    "leg": _route_or_fallback,
+    "multi": _osrm_route_multi,
+    "table": async_osrm.table,
+    "bus_route": _bus_route,
+}
+
+
+async def _timed(coro):
+    t0 = time.perf_counter()
+    res = await coro
+    return res, (time.perf_counter() - t0) * 1000
+
+
+async def _in_app(fn, *args):
+    """Run fn(*args) on a worker thread inside the Flask app context."""
+    flask_app = current_app.config["FLASK_APP"]
+
+    def call():
+        with flask_app.app_context():
+            return fn(*args)
+
+    return await asyncio.to_thread(call)
+
+
+async def _run_plan_async(plan):
+    """Async routing._run_plan: planner steps on threads, its calls as concurrent tasks."""
+    pending = {}
+    reply = None
+    try:
+        while True:
+            done, step = await _in_app(_plan_step, plan, reply)
+            if done:
+                return step
+            if isinstance(step, StartCalls):
+                for name, (kind, *args) in step.calls.items():
+                    pending[name] = asyncio.ensure_future(_timed(_ASYNC_CALLS[kind](*args)))
+                reply = None
+            else:
+                reply = {name: await pending.pop(name) for name in step.names}
+    finally:
+        # Planner failed midway: do not leave its calls running
+        for task in pending.values():
+            task.cancel()
+
+
+async def _overpass_fetch(q: str, timeout: int, parse):
+    """Async routing._overpass_fetch; parsing runs off the event loop."""
+    async with httpx.AsyncClient(timeout=timeout + 5) as client:
+        for endpoint in OVERPASS_ENDPOINTS:
+            try:
+                r = await client.post(endpoint, data={"data": q})
+                if r.status_code >= 400:
+                    r = await client.get(endpoint, params={"data": q})
+                r.raise_for_status()
+                out = await asyncio.to_thread(lambda: parse(r.json().get("elements", [])))
+                if out:
+                    return out
+            except Exception:
+                continue
+    return []
+
+
+@routing_async_bp.route("/route")
+async def simple_route():
+    try:
+        coords = _parse_endpoints(request.args)
+        mode = request.args.get("mode", "car")
+        return jsonify(await _run_plan_async(_simple_route_plan(*coords, mode)))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@routing_async_bp.route("/route_bus")
+async def route_bus():
+    try:
+        return jsonify(await _run_plan_async(_route_bus_plan(*_parse_endpoints(request.args))))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@routing_async_bp.route("/route_multi", methods=["POST"])
+async def route_multi():
+    try:
+        mode, waypoints = _parse_waypoints(await request.get_json(silent=True) or {})
+        return jsonify(await _run_plan_async(_route_multi_plan(mode, waypoints)))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@routing_async_bp.route("/matrix", methods=["POST"])
+async def matrix():
+    try:
+        return jsonify(await _run_plan_async(_matrix_plan(await request.get_json(silent=True) or {})))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@routing_async_bp.route("/route_optimize", methods=["POST"])
+async def route_optimize():
+    try:
+        return jsonify(await _run_plan_async(_optimize_plan(await request.get_json(silent=True) or {})))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@routing_async_bp.route("/import_bus_routes_overpass", methods=["POST", "GET"])  # optional bbox query param
+async def import_bus_routes_overpass():
+    try:
+        payload = await request.get_json(silent=True) or {}
+        bbox = request.args.get("bbox") or payload.get("bbox")
+        timeout = BUS_ROUTES_OVERPASS_TIMEOUT
+        routes = await _overpass_fetch(_bus_routes_query(bbox, timeout), timeout, _parse_bus_routes)
+        return jsonify(await _in_app(_store_bus_routes, bbox, routes))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
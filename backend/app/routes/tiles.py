@@ -0,0 +1,55 @@
+from flask import Blueprint, Response, jsonify, request
+from ..models import db
+from .places import _place_filters
+
+
+tiles_bp = Blueprint("tiles", __name__)
+
+# Tile attributes are thinned by zoom: zoomed-out tiles only carry what the
+# marker needs, names/images appear once individual places are readable.
+# Details (description, socials, gallery) always come from /places/<id>.
+_TILE_ATTRS = [
+    (0, ["p.id", "p.place_type AS type"]),
+    (12, ["p.name"]),
+    (15, ["p.image_url"]),
+]
+MAX_TILE_ZOOM = 22
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+
+def _tile_columns(z: int) -> list[str]:
+    cols = []
+    for min_zoom, attrs in _TILE_ATTRS:
+        if z >= min_zoom:
+            cols.extend(attrs)
+    return cols
+
+
+@tiles_bp.route("/tiles/places/<int:z>/<int:x>/<int:y>.pbf")
+def places_tile(z: int, x: int, y: int):
+    """Mapbox Vector Tile of places (layer "places"); supports type/types filters."""
+    if z > MAX_TILE_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        return jsonify({"error": "tile out of range"}), 400
+
+    where, params = _place_filters(request.args)
+    params.update(z=z, x=x, y=y, extent=TILE_EXTENT, buffer=TILE_BUFFER)
+    sql = db.text(
+        f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(:z, :x, :y) AS g3857,
+                   ST_Transform(ST_TileEnvelope(:z, :x, :y), 4326) AS g4326
+        ),
+        mvtgeom AS (
+            SELECT ST_AsMVTGeom(ST_Transform(p.geom, 3857), b.g3857, :extent, :buffer, true) AS geom,
+                   {", ".join(_tile_columns(z))}
+            FROM places p, bounds b
+            WHERE p.geom && b.g4326 AND {" AND ".join(where)}
+        )
+        SELECT ST_AsMVT(mvtgeom.*, 'places', :extent, 'geom') FROM mvtgeom
+        """
+    )
+    tile = db.session.execute(sql, params).scalar()
+    resp = Response(bytes(tile or b""), mimetype="application/vnd.mapbox-vector-tile")
+    resp.headers["Cache-Control"] = "public, max-age=300"
+    return resp
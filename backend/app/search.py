@@ -0,0 +1,50 @@
+"""Place name/description search backed by pg_trgm and a trigger-maintained tsvector.
+
+``places.search_tsv`` holds name (weight A) and description (weight B)
+tokens with the 'simple' configuration (no stemming: names are mostly
+Mongolian/English proper nouns). Name substring matches use a pg_trgm GIN
+index, so both ``ILIKE '%q%'`` and the ``%`` similarity operator avoid
+sequential scans. The column, trigger and indexes are created by migration
+0002_place_search.
+"""
+import re
+
+
+# Queries shorter than this only match name prefixes (trigram similarity is meaningless)
+MIN_FUZZY_LEN = 3
+
+
+def prefix_tsquery(q: str) -> str | None:
+    """Turn free text into a to_tsquery() string matching every word as a prefix."""
+    words = re.findall(r"\w+", q.lower())
+    if not words:
+        return None
+    return " & ".join(f"{w}:*" for w in words)
+
+
+def search_condition(q: str, params: dict) -> str:
+    """SQL condition matching ``q`` against places p; fills the bind params it uses."""
+    q = q.strip()
+    params["q"] = q
+    params["like"] = f"%{q}%"
+    params["prefix"] = f"{q}%"
+    tsq = prefix_tsquery(q)
+    if len(q) < MIN_FUZZY_LEN:
+        return "p.name ILIKE :prefix"
+    parts = ["p.name ILIKE :like", "p.name % :q"]
+    if tsq:
+        params["tsq"] = tsq
+        parts.append("p.search_tsv @@ to_tsquery('simple', :tsq)")
+    return "(" + " OR ".join(parts) + ")"
+
+
+def search_rank(params: dict) -> str:
+    """SQL score for ordering matches: prefix hits first, then trigram similarity + text rank.
+
+    Every term is non-NULL (an unnamed place scores 0 on name terms), so the
+    score never sorts first under ORDER BY score DESC.
+    """
+    rank = "(CASE WHEN p.name ILIKE :prefix THEN 1.0 ELSE 0.0 END) + COALESCE(similarity(p.name, :q), 0)"
+    if "tsq" in params:
+        rank += " + COALESCE(ts_rank(p.search_tsv, to_tsquery('simple', :tsq)), 0)"
+    return rank
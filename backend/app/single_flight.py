@@ -0,0 +1,99 @@
+"""Request coalescing: concurrent calls with the same key share one computation.
+
+The first caller for a key runs the function; callers arriving while it is
+still running wait for it and get the same result (or exception) instead of
+repeating the work. Nothing is kept once the call finishes, so this only
+collapses bursts; the caches in route_cache.py / http_cache.py handle reuse
+after that.
+"""
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Counters:
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+
+    def _stats(self, in_flight: int) -> dict:
+        calls = self.executed + self.coalesced
+        return {
+            "calls": calls,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / calls, 3) if calls else None,
+            "in_flight": in_flight,
+        }
+
+
+class SingleFlight(_Counters):
+    """Thread-based single-flight for the WSGI workers."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args):
+        """Return fn(*args), sharing the call with any concurrent caller using the same key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return self._stats(len(self._calls))
+
+
+class AsyncSingleFlight(_Counters):
+    """asyncio single-flight for the ASGI routing service (one event loop per process)."""
+
+    def __init__(self):
+        super().__init__()
+        self._tasks = {}
+
+    async def do(self, key, fn, *args):
+        """Await fn(*args), sharing the task with any concurrent caller using the same key."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._tasks.pop(key, None) if self._tasks.get(key) is t else None)
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        # A cancelled waiter must not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return self._stats(len(self._tasks))
@@ -0,0 +1,343 @@
+"""Bus network built from imported OSM route relations, with a RAPTOR router.
+
+The network is loaded from ``transit_routes``/``transit_route_stops`` into
+flat arrays: stop coordinates, a CSR layout of each route's stop sequence
+with cumulative ride times, per-stop lists of (route, position) and walking
+transfers between nearby stops. OSM carries no timetables, so routing is
+frequency based: boarding a route costs half its headway, riding costs the
+cumulative hop time, and RAPTOR rounds bound the number of vehicles used.
+"""
+import math
+import os
+import threading
+import time
+from array import array
+from typing import NamedTuple
+
+from flask import current_app
+from geoalchemy2.shape import from_shape
+from shapely.geometry import Point
+from sqlalchemy import func
+
+from .bus_stops import BusStop, BusStopIndex, haversine
+from .models import db, TransitRoute, TransitRouteStop
+
+
+WALK_MPS = 5000.0 / 3600.0
+BUS_MPS = 20000.0 / 3600.0
+# Straight-line distances are stretched by this factor to approximate street paths
+DETOUR = 1.3
+DWELL_S = 20.0
+DEFAULT_HEADWAY_S = 600
+TRANSFER_RADIUS_M = 250.0
+MAX_ROUNDS = int(os.getenv("TRANSIT_MAX_ROUNDS", "4"))
+NETWORK_TTL_S = float(os.getenv("TRANSIT_NETWORK_TTL", "600"))
+INF = math.inf
+
+
+class Leg(NamedTuple):
+    kind: str  # "access", "ride", "transfer", "egress"
+    from_stop: int | None
+    to_stop: int | None
+    route: int | None
+    board_pos: int | None
+    alight_pos: int | None
+    seconds: float
+
+
+class TransitNetwork:
+    def __init__(self):
+        self.stop_lon = array("d")
+        self.stop_lat = array("d")
+        self.stop_name = []
+        self.route_ref = []
+        self.route_name = []
+        self.route_headway = array("d")
+        self.route_offsets = array("i", [0])  # CSR offsets into route_stops/route_cum_s
+        self.route_stops = array("i")
+        self.route_cum_s = array("d")  # cumulative ride seconds from the first stop
+        self.stop_routes = []  # per stop: [(route, position), ...]
+        self.transfers = []  # per stop: [(other_stop, seconds), ...]
+        self.index = BusStopIndex(loader=self._index_stops, db_fallback=False)
+
+    @property
+    def n_stops(self) -> int:
+        return len(self.stop_lon)
+
+    @property
+    def n_routes(self) -> int:
+        return len(self.route_offsets) - 1
+
+    def _index_stops(self) -> list[BusStop]:
+        return [BusStop(i, self.stop_name[i], self.stop_lon[i], self.stop_lat[i]) for i in range(self.n_stops)]
+
+    def route_stop_seq(self, r: int):
+        return self.route_stops[self.route_offsets[r]:self.route_offsets[r + 1]]
+
+    def ride_seconds(self, r: int, board_pos: int, alight_pos: int) -> float:
+        base = self.route_offsets[r]
+        return self.route_cum_s[base + alight_pos] - self.route_cum_s[base + board_pos]
+
+    @classmethod
+    def from_rows(cls, routes):
+        """Build from ``[(ref, name, headway_s, [(node_key, name, lon, lat), ...]), ...]``.
+
+        ``node_key`` merges stops shared between routes (OSM node id, or rounded coords).
+        """
+        net = cls()
+        stop_ids = {}
+        for ref, name, headway_s, stops in routes:
+            seq = []
+            for key, sname, lon, lat in stops:
+                sid = stop_ids.get(key)
+                if sid is None:
+                    sid = stop_ids[key] = net.n_stops
+                    net.stop_lon.append(lon)
+                    net.stop_lat.append(lat)
+                    net.stop_name.append(sname)
+                    net.stop_routes.append([])
+                if not seq or seq[-1] != sid:
+                    seq.append(sid)
+            if len(seq) < 2:
+                continue
+            r = net.n_routes
+            net.route_ref.append(ref)
+            net.route_name.append(name)
+            net.route_headway.append(float(headway_s or DEFAULT_HEADWAY_S))
+            cum = 0.0
+            for pos, sid in enumerate(seq):
+                if pos:
+                    prev = seq[pos - 1]
+                    hop_m = haversine(net.stop_lon[prev], net.stop_lat[prev], net.stop_lon[sid], net.stop_lat[sid])
+                    cum += hop_m * DETOUR / BUS_MPS + DWELL_S
+                net.route_stops.append(sid)
+                net.route_cum_s.append(cum)
+                net.stop_routes[sid].append((r, pos))
+            net.route_offsets.append(len(net.route_stops))
+
+        net.index.load()
+        net.transfers = [[] for _ in range(net.n_stops)]
+        for s in range(net.n_stops):
+            for dist, other in net.index.nearest(net.stop_lon[s], net.stop_lat[s], k=16):
+                if other.id != s and dist <= TRANSFER_RADIUS_M:
+                    net.transfers[s].append((other.id, dist * DETOUR / WALK_MPS))
+        return net
+
+    @classmethod
+    def from_db(cls):
+        routes = []
+        rows = (
+            db.session.query(
+                TransitRouteStop.route_id,
+                TransitRouteStop.osm_node_id,
+                TransitRouteStop.name,
+                func.ST_X(TransitRouteStop.geom),
+                func.ST_Y(TransitRouteStop.geom),
+            )
+            .order_by(TransitRouteStop.route_id, TransitRouteStop.seq)
+            .all()
+        )
+        by_route = {}
+        for route_id, node_id, name, lon, lat in rows:
+            key = node_id if node_id is not None else (round(lon, 6), round(lat, 6))
+            by_route.setdefault(route_id, []).append((key, name, float(lon), float(lat)))
+        for r in db.session.query(TransitRoute).order_by(TransitRoute.id).all():
+            if r.id in by_route:
+                routes.append((r.ref, r.name, r.headway_s, by_route[r.id]))
+        return cls.from_rows(routes)
+
+    def access_stops(self, lon: float, lat: float, k: int, max_walk_m: float):
+        """Up to k nearby stops as {stop: walk_seconds}, using straight-line distance × DETOUR."""
+        out = {}
+        for dist, st in self.index.nearest(lon, lat, k=k):
+            if dist <= max_walk_m:
+                out[st.id] = dist * DETOUR / WALK_MPS
+        return out
+
+    def raptor(self, sources: dict, targets: dict, max_rounds: int = MAX_ROUNDS):
+        """Earliest arrival from ``sources`` {stop: access_s} to ``targets`` {stop: egress_s}.
+
+        Returns (total_seconds, [Leg, ...]) or None if no target is reachable.
+        """
+        n = self.n_stops
+        tau = [[INF] * n]
+        parent = [[None] * n]
+        best = [INF] * n
+        marked = set()
+        for s, t in sources.items():
+            tau[0][s] = best[s] = t
+            parent[0][s] = Leg("access", None, s, None, None, None, t)
+            marked.add(s)
+
+        def relax_transfers(k, from_stops):
+            new = set()
+            for p in from_stops:
+                for q, walk_s in self.transfers[p]:
+                    t = tau[k][p] + walk_s
+                    if t < best[q] and t < tau[k][q]:
+                        tau[k][q] = best[q] = t
+                        parent[k][q] = Leg("transfer", p, q, None, None, None, walk_s)
+                        new.add(q)
+            return new
+
+        marked |= relax_transfers(0, list(marked))
+
+        for k in range(1, max_rounds + 1):
+            tau.append(list(tau[k - 1]))
+            parent.append([None] * n)
+            # Earliest marked position per route
+            queue = {}
+            for p in marked:
+                for r, pos in self.stop_routes[p]:
+                    if pos < queue.get(r, INF):
+                        queue[r] = pos
+            marked = set()
+            for r, start_pos in queue.items():
+                seq = self.route_stop_seq(r)
+                wait = self.route_headway[r] / 2.0
+                board_pos = None
+                board_time = INF
+                for pos in range(start_pos, len(seq)):
+                    p = seq[pos]
+                    if board_pos is not None:
+                        t = board_time + self.ride_seconds(r, board_pos, pos)
+                        if t < best[p]:
+                            tau[k][p] = best[p] = t
+                            parent[k][p] = Leg("ride", seq[board_pos], p, r, board_pos, pos, t - tau[k - 1][seq[board_pos]])
+                            marked.add(p)
+                    # (Re)board here if waiting at p beats staying on the current vehicle
+                    dep = tau[k - 1][p] + wait
+                    if dep < INF and (board_pos is None or dep < board_time + self.ride_seconds(r, board_pos, pos)):
+                        board_pos, board_time = pos, dep
+            marked |= relax_transfers(k, list(marked))
+            if not marked:
+                break
+
+        # Best (round, target) by arrival + egress
+        best_total, best_k, best_t = INF, None, None
+        for k in range(len(tau)):
+            for t, egress_s in targets.items():
+                total = tau[k][t] + egress_s
+                if total < best_total:
+                    best_total, best_k, best_t = total, k, t
+        if best_k is None or best_total == INF:
+            return None
+
+        legs = [Leg("egress", best_t, None, None, None, None, targets[best_t])]
+        k, stop = best_k, best_t
+        while True:
+            # Stops not improved in round k inherit the label from an earlier round
+            while k > 0 and parent[k][stop] is None:
+                k -= 1
+            leg = parent[k][stop]
+            legs.append(leg)
+            if leg.kind == "access":
+                break
+            stop = leg.from_stop
+            if leg.kind == "ride":
+                k -= 1
+        legs.reverse()
+        return best_total, legs
+
+
+class TransitNetworkHolder:
+    """Network shared by all requests in the process, rebuilt off the request path.
+
+    Only the very first ``get()`` builds the network inline. Once it is older
+    than NETWORK_TTL_S (or after ``invalidate()``), requests keep using it
+    while a background thread builds the replacement and swaps it in.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._net = None
+        self._loaded_at = 0.0
+        self._reloading = False
+
+    @staticmethod
+    def _load() -> TransitNetwork:
+        try:
+            return TransitNetwork.from_db()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def get(self) -> TransitNetwork | None:
+        """Return the current network (None if no routes imported). Requires an app context."""
+        net = self._net
+        if net is None:
+            with self._lock:
+                if self._net is None:
+                    try:
+                        self._net = self._load()
+                    except Exception:
+                        self._net = TransitNetwork()
+                    self._loaded_at = time.monotonic()
+                net = self._net
+        elif time.monotonic() - self._loaded_at > NETWORK_TTL_S:
+            self._reload_in_background(current_app._get_current_object())
+        return net if net.n_routes else None
+
+    def _reload_in_background(self, app):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, args=(app,), name="transit-network", daemon=True).start()
+
+    def _reload(self, app):
+        with app.app_context():
+            try:
+                net = self._load()
+            except Exception:
+                # Keep serving the old network; the next get() after the TTL retries
+                app.logger.exception("transit network reload failed")
+                net = None
+            finally:
+                db.session.remove()
+        with self._lock:
+            if net is not None:
+                self._net = net
+            self._loaded_at = time.monotonic()
+            self._reloading = False
+
+    def invalidate(self):
+        """Mark the network stale: the next get() rebuilds it in the background."""
+        with self._lock:
+            self._loaded_at = float("-inf")
+
+
+transit_network = TransitNetworkHolder()
+
+
+def store_routes(routes: list[dict]) -> tuple[int, int]:
+    """Upsert fetched routes (by OSM relation id). Returns (stored, skipped)."""
+    stored, skipped = 0, 0
+    for rt in routes:
+        stops = rt.get("stops") or []
+        if len(stops) < 2:
+            skipped += 1
+            continue
+        if rt.get("osm_id") is not None:
+            TransitRoute.query.filter_by(osm_id=rt["osm_id"]).delete()
+        route = TransitRoute(
+            osm_id=rt.get("osm_id"),
+            ref=rt.get("ref"),
+            name=rt.get("name"),
+            headway_s=rt.get("headway_s") or DEFAULT_HEADWAY_S,
+        )
+        for seq, st in enumerate(stops):
+            route.stops.append(
+                TransitRouteStop(
+                    seq=seq,
+                    osm_node_id=st.get("osm_id"),
+                    name=st.get("name"),
+                    geom=from_shape(Point(st["lon"], st["lat"]), srid=4326),
+                )
+            )
+        db.session.add(route)
+        stored += 1
+    if stored:
+        db.session.commit()
+        transit_network.invalidate()
+    return stored, skipped
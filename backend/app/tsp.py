@@ -0,0 +1,89 @@
+"""Visiting-order heuristics for the bucket-list tour (open path from a fixed start).
+
+``solve_open_path`` enumerates all orders for small lists; otherwise it
+builds a nearest-neighbour tour and improves it with 2-opt and Or-opt moves
+until no move helps or the time budget runs out. The
+matrix is asymmetric-safe: every move is evaluated with full path cost
+deltas in the travel direction, so one-way streets in OSRM durations are
+respected.
+"""
+import itertools
+import time
+
+# Up to this many stops the exact order is found by enumerating permutations (7! = 5040)
+EXACT_MAX_NODES = 7
+
+
+def path_cost(matrix, path) -> float:
+    return sum(matrix[a][b] for a, b in zip(path, path[1:]))
+
+
+def _nearest_neighbour(matrix, start: int, nodes: list[int]) -> list[int]:
+    path = [start]
+    remaining = set(nodes)
+    while remaining:
+        last = path[-1]
+        nxt = min(remaining, key=lambda j: matrix[last][j])
+        path.append(nxt)
+        remaining.remove(nxt)
+    return path
+
+
+def _two_opt(matrix, path, deadline) -> bool:
+    """Reverse path[i..j] when it shortens the tour. Returns True if improved."""
+    n = len(path)
+    improved = False
+    for i in range(1, n - 1):
+        if time.perf_counter() > deadline:
+            break
+        for j in range(i + 1, n):
+            candidate = path[:i] + path[i:j + 1][::-1] + path[j + 1:]
+            # Reversal changes the direction of every inner edge, so compare the affected span in full
+            lo, hi = i - 1, min(j + 2, n)
+            if path_cost(matrix, candidate[lo:hi]) + 1e-9 < path_cost(matrix, path[lo:hi]):
+                path[:] = candidate
+                improved = True
+    return improved
+
+
+def _or_opt(matrix, path, deadline) -> bool:
+    """Move segments of 1-3 stops to a better position. Returns True if improved."""
+    n = len(path)
+    improved = False
+    for seg_len in (1, 2, 3):
+        for i in range(1, n - seg_len + 1):
+            if time.perf_counter() > deadline:
+                return improved
+            seg = path[i:i + seg_len]
+            rest = path[:i] + path[i + seg_len:]
+            base = path_cost(matrix, path)
+            best, best_pos = base, None
+            for pos in range(1, len(rest) + 1):
+                cand = rest[:pos] + seg + rest[pos:]
+                c = path_cost(matrix, cand)
+                if c + 1e-9 < best:
+                    best, best_pos = c, pos
+            if best_pos is not None:
+                path[:] = rest[:best_pos] + seg + rest[best_pos:]
+                improved = True
+    return improved
+
+
+def solve_open_path(matrix, start: int, nodes: list[int], budget_s: float = 0.3) -> list[int]:
+    """Return a visiting order ``[start, ...nodes]`` minimising the summed matrix cost.
+
+    ``matrix[a][b]`` is the cost from a to b; None entries must be replaced
+    by the caller. The path does not return to ``start``.
+    """
+    if len(nodes) <= EXACT_MAX_NODES:
+        best = min(itertools.permutations(nodes), key=lambda perm: path_cost(matrix, (start,) + perm))
+        return [start, *best]
+
+    deadline = time.perf_counter() + budget_s
+    path = _nearest_neighbour(matrix, start, nodes)
+    while time.perf_counter() < deadline:
+        changed = _two_opt(matrix, path, deadline)
+        changed = _or_opt(matrix, path, deadline) or changed
+        if not changed:
+            break
+    return path
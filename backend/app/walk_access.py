@@ -0,0 +1,290 @@
+"""Precomputed walking access from places to their nearest bus stops.
+
+For every place that is not itself a bus stop, the WALK_ACCESS_K nearest
+stops (straight line, from the bus stop index) are sent to the OSRM foot
+``table`` service and the walking distance/duration is stored in
+``place_stop_access``. /route_bus looks its endpoints up here by
+coordinates, so trips from or to a saved place need no live foot routing.
+
+A single background worker keeps the table fresh: changed places are queued
+by id, and a change to the stop set requeues every place. Places are sent to
+OSRM in batches whose sources + destinations fit OSRM's default
+``--max-table-size`` of 100.
+
+Each worker queues a backfill of places without rows when it starts
+(WALK_ACCESS_ON_START=0 turns this off). Backfills hold an advisory lock,
+so the workers of one deploy take turns and the later ones find the rows
+already written. ``flask --app app.main refresh-walk-access`` runs the same
+pass synchronously.
+"""
+import os
+import queue
+import threading
+import time
+
+import click
+
+from .bus_stops import BusStop, bus_stop_index
+from .models import db
+from .osrm import osrm
+
+
+WALK_ACCESS_K = int(os.getenv("WALK_ACCESS_K", "5"))
+WALK_ACCESS_MAX_M = float(os.getenv("WALK_ACCESS_MAX_M", "1500"))
+WALK_ACCESS_TABLE_MAX = int(os.getenv("WALK_ACCESS_TABLE_MAX", "100"))
+WALK_ACCESS_TTL_S = float(os.getenv("WALK_ACCESS_TTL", "300"))
+# Lookup key precision; 5 decimals (~1 m) matches the route cache
+KEY_PRECISION = 5
+
+_ALL = "all"
+
+
+def _key(lon: float, lat: float):
+    return round(lon, KEY_PRECISION), round(lat, KEY_PRECISION)
+
+
+def _batches(places, stops_for, max_coords: int):
+    """Group places so len(places) + len(union of their stops) stays within max_coords."""
+    batch, batch_stops = [], set()
+    for p in places:
+        ids = {s.id for s in stops_for[p[0]]}
+        if batch and len(batch) + 1 + len(batch_stops | ids) > max_coords:
+            yield batch
+            batch, batch_stops = [], set()
+        batch.append(p)
+        batch_stops |= ids
+    if batch:
+        yield batch
+
+
+class WalkAccess:
+    def __init__(self):
+        self._app = None
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._lookup = None
+        self._loaded_at = 0.0
+        self.refreshed_places = 0
+        self.last_refresh_s = None
+
+    def init_app(self, app):
+        self._app = app
+        app.cli.add_command(_refresh_command)
+        if os.getenv("WALK_ACCESS_ON_START", "1") == "1":
+            self._enqueue(None)
+
+    # --- change notifications (call after the change is committed) ---
+
+    def places_changed(self, place_ids):
+        """Drop and requeue rows for these places (their position or type may have changed).
+
+        ``None`` means places were added in bulk: queue every place without rows.
+        """
+        if place_ids is None:
+            self._enqueue(None)
+            return
+        ids = [int(i) for i in place_ids if i is not None]
+        if not ids:
+            return
+        db.session.execute(db.text("DELETE FROM place_stop_access WHERE place_id = ANY(:ids)"), {"ids": ids})
+        db.session.commit()
+        self.invalidate()
+        self._enqueue(ids)
+
+    def stops_changed(self):
+        """The bus stop set changed: recompute every place."""
+        self._enqueue(_ALL)
+
+    def _enqueue(self, item):
+        """Queue a list of place ids, ``_ALL``, or None (places without rows yet)."""
+        if self._app is None:
+            return
+        self._queue.put(item)
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="walk-access", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            # Coalesce whatever piled up meanwhile into one pass
+            items = [item]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _ALL in items:
+                target = _ALL
+            elif any(i is None for i in items):
+                target = None
+            else:
+                target = sorted({pid for i in items for pid in i})
+            with self._app.app_context():
+                try:
+                    self.refresh(target)
+                except Exception:
+                    db.session.rollback()
+                    self._app.logger.exception("walk access refresh failed")
+
+    # --- computation ---
+
+    def refresh(self, place_ids=None) -> int:
+        """Recompute rows for ``place_ids`` (list), every place (``"all"``) or places without rows (None).
+
+        Requires an app context. Returns the number of places written.
+        """
+        if place_ids is not None:
+            return self._refresh(place_ids)
+        # Every worker backfills at boot: one at a time, so only the first calls OSRM
+        with db.engine.connect() as lock_conn:
+            lock_conn.execute(db.text("SET statement_timeout = 0"))
+            lock_conn.execute(db.text("SELECT pg_advisory_lock(hashtext('walk_access_backfill'))"))
+            lock_conn.commit()
+            try:
+                return self._refresh(None)
+            finally:
+                lock_conn.execute(db.text("SELECT pg_advisory_unlock(hashtext('walk_access_backfill'))"))
+                lock_conn.execute(db.text("RESET statement_timeout"))
+                lock_conn.commit()
+
+    def _refresh(self, place_ids) -> int:
+        where = "p.place_type IS DISTINCT FROM 'bus_stop' AND p.geom IS NOT NULL AND p.deleted_at IS NULL"
+        params = {}
+        if place_ids == _ALL:
+            pass
+        elif place_ids is None:
+            where += " AND NOT EXISTS (SELECT 1 FROM place_stop_access a WHERE a.place_id = p.id)"
+        else:
+            where += " AND p.id = ANY(:ids)"
+            params["ids"] = list(place_ids)
+        rows = db.session.execute(
+            db.text(f"SELECT p.id, ST_X(p.geom), ST_Y(p.geom) FROM places p WHERE {where}"), params
+        ).fetchall()
+
+        t0 = time.perf_counter()
+        stops_for = {}
+        places = []
+        for pid, lon, lat in rows:
+            hits = [
+                st for dist, st in bus_stop_index.nearest(float(lon), float(lat), k=WALK_ACCESS_K)
+                if st.id is not None and dist <= WALK_ACCESS_MAX_M
+            ]
+            if hits:
+                stops_for[pid] = hits
+                places.append((pid, float(lon), float(lat)))
+        # Neighbouring places share stops, so spatial order packs more of them per table call
+        places.sort(key=lambda p: (round(p[2], 2), round(p[1], 2)))
+
+        written = 0
+        for batch in _batches(places, stops_for, WALK_ACCESS_TABLE_MAX):
+            stops = list({s.id: s for p in batch for s in stops_for[p[0]]}.values())
+            col = {s.id: len(batch) + j for j, s in enumerate(stops)}
+            coords = [(lon, lat) for _, lon, lat in batch] + [(s.lon, s.lat) for s in stops]
+            res = osrm.table(
+                "foot", coords,
+                sources=range(len(batch)),
+                destinations=range(len(batch), len(coords)),
+            )
+            if res is None:
+                # OSRM unavailable: keep the existing rows and let a later pass retry
+                continue
+            durations, distances = res
+            out = []
+            for i, (pid, _, _) in enumerate(batch):
+                for s in stops_for[pid]:
+                    j = col[s.id] - len(batch)
+                    dur = durations[i][j]
+                    dist = distances[i][j] if distances else None
+                    if dur is None:
+                        continue
+                    out.append({"place_id": pid, "stop_id": s.id, "distance_m": dist, "duration_s": dur})
+            # Every gunicorn worker runs this refresher; serialize their writes
+            db.session.execute(db.text("SELECT pg_advisory_xact_lock(hashtext('place_stop_access'))"))
+            db.session.execute(
+                db.text("DELETE FROM place_stop_access WHERE place_id = ANY(:ids)"),
+                {"ids": [pid for pid, _, _ in batch]},
+            )
+            if out:
+                db.session.execute(
+                    db.text(
+                        "INSERT INTO place_stop_access (place_id, stop_id, distance_m, duration_s) "
+                        "VALUES (:place_id, :stop_id, :distance_m, :duration_s)"
+                    ),
+                    out,
+                )
+            db.session.commit()
+            written += len(batch)
+
+        if written:
+            self.invalidate()
+        self.refreshed_places += written
+        self.last_refresh_s = round(time.perf_counter() - t0, 3)
+        return written
+
+    # --- lookup ---
+
+    def invalidate(self):
+        with self._lock:
+            self._lookup = None
+
+    def _load(self):
+        rows = db.session.execute(
+            db.text(
+                """
+                SELECT ST_X(p.geom), ST_Y(p.geom), s.id, s.name, ST_X(s.geom), ST_Y(s.geom),
+                       a.distance_m, a.duration_s
+                FROM place_stop_access a
+                JOIN places p ON p.id = a.place_id AND p.deleted_at IS NULL
+                JOIN places s ON s.id = a.stop_id AND s.place_type = 'bus_stop' AND s.deleted_at IS NULL
+                ORDER BY a.place_id, a.duration_s
+                """
+            )
+        ).fetchall()
+        lookup = {}
+        for plon, plat, sid, sname, slon, slat, dist, dur in rows:
+            stop = BusStop(sid, sname or "Bus Stop", float(slon), float(slat))
+            lookup.setdefault(_key(float(plon), float(plat)), []).append((stop, dist, dur))
+        return lookup
+
+    def lookup(self, lon: float, lat: float):
+        """Return [(BusStop, distance_m, duration_s), ...] by walking time if (lon, lat) is a known place.
+
+        Returns None for unknown points. Requires an app context.
+        """
+        with self._lock:
+            lookup = self._lookup
+            fresh = lookup is not None and time.monotonic() - self._loaded_at <= WALK_ACCESS_TTL_S
+        if not fresh:
+            try:
+                lookup = self._load()
+            except Exception:
+                db.session.rollback()
+                return None
+            with self._lock:
+                self._lookup = lookup
+                self._loaded_at = time.monotonic()
+        return lookup.get(_key(lon, lat))
+
+    def stats(self) -> dict:
+        with self._lock:
+            places = len(self._lookup) if self._lookup is not None else None
+        return {
+            "places_loaded": places,
+            "pending_jobs": self._queue.qsize(),
+            "refreshed_places": self.refreshed_places,
+            "last_refresh_s": self.last_refresh_s,
+        }
+
+
+walk_access = WalkAccess()
+
+
+@click.command("refresh-walk-access")
+@click.option("--all", "everything", is_flag=True, help="Recompute every place, not only places without rows.")
+def _refresh_command(everything):
+    """Precompute place -> bus stop walking access synchronously."""
+    n = walk_access.refresh(_ALL if everything else None)
+    click.echo(f"walk access rows written for {n} places")
@@ -0,0 +1,36 @@
+"""Gunicorn settings for the production backend (``gunicorn -c gunicorn.conf.py``).
+
+Every setting comes from the environment so docker-compose can size the
+server per host. The default ``gthread`` worker lets slow OSRM/Overpass-bound
+requests wait on I/O in their own thread while /places reads keep being
+served. Keep DB_POOL_SIZE + DB_MAX_OVERFLOW at least GUNICORN_THREADS per
+worker, plus a few for the background jobs.
+
+GUNICORN_APP=app.asgi:app with GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+serves the routing endpoints on asyncio instead (see app/asgi.py); there the
+pool needs ASGI_WSGI_THREADS + ASGI_PLAN_THREADS connections per worker.
+"""
+import multiprocessing
+import os
+
+
+wsgi_app = os.getenv("GUNICORN_APP", "app.main:app")
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv("GUNICORN_WORKERS") or os.getenv("WEB_CONCURRENCY") or min(multiprocessing.cpu_count() * 2 + 1, 8))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# Bus route imports and large route_optimize calls can take tens of seconds
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Recycle workers now and then so slow leaks in long-lived caches cannot build up
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+reload = os.getenv("GUNICORN_RELOAD", "0") == "1"
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+# The app is created after fork: each worker opens its own DB pool and starts its own background threads
+preload_app = False
@@ -1,75 +1,4 @@
-
+-- Runs once, when the postgis container creates an empty data directory.
+-- Tables, indexes and triggers are owned by the versioned migrations in
+-- app/migrations, applied by the "migrate" service (python -m app.migrations).
 CREATE EXTENSION IF NOT EXISTS postgis;
-
-CREATE TABLE IF NOT EXISTS places (
-    id SERIAL PRIMARY KEY,
-    name VARCHAR(100),
-    place_type VARCHAR(50),
-    description TEXT,
-    image_url TEXT,
-    geom geometry(POINT, 4326)
-);
-
-DO $$
-BEGIN
-    IF NOT EXISTS (
-        SELECT 1 FROM pg_indexes WHERE schemaname = 'public' AND indexname = 'idx_places_geom'
-    ) THEN
-        CREATE INDEX idx_places_geom ON places USING GIST (geom);
-    END IF;
-END $$;
-
-
-
-DO $$
-BEGIN
-    IF NOT EXISTS (
-        SELECT 1 FROM information_schema.columns
-        WHERE table_name='places' AND column_name='image_url'
-    ) THEN
-        ALTER TABLE places ADD COLUMN IF NOT EXISTS image_url TEXT;
-    END IF;
-END $$;
-
-CREATE TABLE IF NOT EXISTS place_images (
-    id SERIAL PRIMARY KEY,
-    place_id INTEGER NOT NULL REFERENCES places(id) ON DELETE CASCADE,
-    image_url TEXT NOT NULL,
-    display_order INTEGER DEFAULT 0,
-    uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
-
-CREATE INDEX IF NOT EXISTS idx_place_images_place_id ON place_images(place_id);
-
-CREATE INDEX IF NOT EXISTS idx_place_images_order ON place_images(place_id, display_order);
-
-DO $$
-BEGIN
-    IF NOT EXISTS (
-        SELECT 1 FROM information_schema.columns
-        WHERE table_name='places' AND column_name='facebook_url'
-    ) THEN
-        ALTER TABLE places ADD COLUMN facebook_url TEXT;
-    END IF;
-    
-    IF NOT EXISTS (
-        SELECT 1 FROM information_schema.columns
-        WHERE table_name='places' AND column_name='instagram_url'
-    ) THEN
-        ALTER TABLE places ADD COLUMN instagram_url TEXT;
-    END IF;
-    
-    IF NOT EXISTS (
-        SELECT 1 FROM information_schema.columns
-        WHERE table_name='places' AND column_name='website_url'
-    ) THEN
-        ALTER TABLE places ADD COLUMN website_url TEXT;
-    END IF;
-    
-    IF NOT EXISTS (
-        SELECT 1 FROM information_schema.columns
-        WHERE table_name='places' AND column_name='phone'
-    ) THEN
-        ALTER TABLE places ADD COLUMN phone VARCHAR(20);
-    END IF;
-END $$;
@@ -0,0 +1,85 @@
+"""Measure worker boot time: `import app.main` (create_app included) in fresh interpreters.
+
+Each run is a new subprocess, so nothing is cached between runs except the
+OS page cache and .pyc files. create_app() must not need the database; point
+DATABASE_URL at an unreachable host to check that boot never waits on it:
+
+    DATABASE_URL=postgresql://x@127.0.0.1:1/x python scripts/bench_startup.py --runs 10 --importtime 15
+
+Measured that way, boot takes about 0.85 s (median of 7), nearly all of it
+imports: flask_sqlalchemy ~0.3 s and geoalchemy2 ~0.27 s, the latter
+including shapely and numpy.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Background startup jobs would only add noise to the measurement
+QUIET_ENV = {"WALK_ACCESS_ON_START": "0"}
+
+BOOT_SNIPPET = (
+    "import time; t0 = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - t0)"
+)
+
+
+def boot_once(env) -> tuple[float, float]:
+    """(seconds to import app.main, wall seconds for the whole interpreter)."""
+    t0 = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", BOOT_SNIPPET], cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        sys.exit(f"import app.main failed:\n{out.stderr}")
+    return float(out.stdout.strip().splitlines()[-1]), time.perf_counter() - t0
+
+
+def import_profile(env, top: int):
+    """The slowest packages to import (cumulative, first import of each), from `python -X importtime`."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <two spaces per nesting level><module>"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        name = name.strip()
+        if "." not in name:
+            rows.append((int(cumulative_us), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--importtime", type=int, default=0, metavar="N",
+                    help="Also list the N slowest top-level imports.")
+    args = ap.parse_args()
+
+    env = {**os.environ, **QUIET_ENV}
+    boot_once(env)  # warm .pyc files and the page cache
+    samples = [boot_once(env) for _ in range(args.runs)]
+    imports = [s[0] for s in samples]
+    walls = [s[1] for s in samples]
+    print(f"runs={args.runs}")
+    print(f"import app.main  median={statistics.median(imports) * 1000:.0f}ms  "
+          f"min={min(imports) * 1000:.0f}ms  max={max(imports) * 1000:.0f}ms")
+    print(f"process wall     median={statistics.median(walls) * 1000:.0f}ms")
+
+    if args.importtime:
+        print("\nslowest packages to import (cumulative, includes their dependencies):")
+        for us, name in import_profile(env, args.importtime):
+            print(f"  {us / 1000:8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare /tiles/places vector tiles against /places?bbox= GeoJSON.
+
+For each viewport the script fetches every tile covering the bbox at the
+given zoom and the equivalent /places request, then prints bytes and
+wall-clock latency for both. Run against a live backend:
+
+    python scripts/bench_tiles.py --base http://localhost:5001 --types restaurant,hotel,bus_stop
+"""
+import argparse
+import math
+import time
+
+import requests
+
+
+# (label, zoom, minx, miny, maxx, maxy) around Ulaanbaatar
+VIEWPORTS = [
+    ("city", 12, 106.76, 47.84, 107.20, 47.99),
+    ("district", 14, 106.88, 47.90, 106.96, 47.93),
+    ("street", 16, 106.910, 47.914, 106.925, 47.922),
+]
+
+
+def lonlat_to_tile(lon, lat, z):
+    n = 2 ** z
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_r = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_r)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_for_bbox(z, minx, miny, maxx, maxy):
+    x0, y0 = lonlat_to_tile(minx, maxy, z)
+    x1, y1 = lonlat_to_tile(maxx, miny, z)
+    return [(z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def timed_get(session, url, params=None):
+    t0 = time.perf_counter()
+    r = session.get(url, params=params, timeout=60)
+    r.raise_for_status()
+    return len(r.content), time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--base", default="http://localhost:5001")
+    ap.add_argument("--types", default="")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    s = requests.Session()
+    extra = {"types": args.types} if args.types else {}
+    print(f"{'viewport':<10} {'tiles':>5} {'mvt_bytes':>10} {'mvt_ms':>8} {'geojson_bytes':>14} {'geojson_ms':>10}")
+    for label, z, minx, miny, maxx, maxy in VIEWPORTS:
+        tiles = tiles_for_bbox(z, minx, miny, maxx, maxy)
+        mvt_bytes = geo_bytes = 0
+        mvt_t = geo_t = 0.0
+        for _ in range(args.repeat):
+            mvt_bytes = 0
+            for tz, tx, ty in tiles:
+                n, dt = timed_get(s, f"{args.base}/tiles/places/{tz}/{tx}/{ty}.pbf", extra)
+                mvt_bytes += n
+                mvt_t += dt
+            geo_bytes, dt = timed_get(
+                s, f"{args.base}/places", {"bbox": f"{minx},{miny},{maxx},{maxy}", **extra}
+            )
+            geo_t += dt
+        print(
+            f"{label:<10} {len(tiles):>5} {mvt_bytes:>10} {mvt_t / args.repeat * 1000:>8.1f} "
+            f"{geo_bytes:>14} {geo_t / args.repeat * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Closed-loop load test of the read and routing endpoints.
+
+CONCURRENCY client threads send a mix of /places, /search and /route
+requests for DURATION seconds, then the script prints throughput, latency
+percentiles and errors. Run it against a running backend:
+
+    python scripts/load_test.py --base http://localhost:5001 --concurrency 64
+
+To see how throughput scales with the worker count, let the script start
+gunicorn itself once per worker count (run from backend/, DATABASE_URL and
+OSRM_*_URL pointing at live services):
+
+    python scripts/load_test.py --workers 1,2,4,8 --threads 8 --concurrency 64
+
+The started server honours GUNICORN_APP / GUNICORN_WORKER_CLASS, so the async
+routing service can be measured the same way:
+
+    GUNICORN_APP=app.asgi:app GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \
+        python scripts/load_test.py --workers 1,2,4 --mix route --concurrency 256
+"""
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+
+# Sample viewports, search terms and route endpoints around Ulaanbaatar
+BBOXES = [
+    "106.76,47.84,107.20,47.99",
+    "106.88,47.90,106.96,47.93",
+    "106.910,47.914,106.925,47.922",
+]
+QUERIES = ["sukhbaatar", "zaisan", "state department store", "nomin", "bus"]
+POINTS = [
+    (106.9176, 47.9189),
+    (106.9057, 47.9210),
+    (106.9330, 47.9135),
+    (106.8840, 47.9170),
+    (106.9590, 47.9030),
+]
+
+
+def _places():
+    return "/places", {"bbox": random.choice(BBOXES), "view": "summary"}
+
+
+def _search():
+    return "/search", {"q": random.choice(QUERIES), "limit": 10}
+
+
+def _route():
+    a, b = random.sample(POINTS, 2)
+    return "/route", {"start": f"{a[0]},{a[1]}", "end": f"{b[0]},{b[1]}", "mode": random.choice(["car", "foot"])}
+
+
+MIXES = {
+    "read": [(_places, 6), (_search, 4)],
+    "route": [(_route, 1)],
+    "mixed": [(_places, 5), (_search, 3), (_route, 2)],
+}
+
+
+def _pick(mix):
+    makers, weights = zip(*MIXES[mix])
+    return random.choices(makers, weights)[0]()
+
+
+def run_load(base: str, mix: str, concurrency: int, duration: float) -> dict:
+    deadline = time.monotonic() + duration
+    latencies = {}
+    errors = {}
+    lock = threading.Lock()
+
+    def client():
+        s = requests.Session()
+        while time.monotonic() < deadline:
+            path, params = _pick(mix)
+            t0 = time.perf_counter()
+            try:
+                r = s.get(base + path, params=params, timeout=60)
+                ok = r.status_code < 500
+            except requests.RequestException:
+                ok = False
+            dt = time.perf_counter() - t0
+            with lock:
+                if ok:
+                    latencies.setdefault(path, []).append(dt)
+                else:
+                    errors[path] = errors.get(path, 0) + 1
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    t0 = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - t0
+
+    all_lat = sorted(dt for v in latencies.values() for dt in v)
+    return {
+        "requests": len(all_lat),
+        "errors": sum(errors.values()),
+        "rps": len(all_lat) / elapsed if elapsed else 0.0,
+        "p50_ms": _pct(all_lat, 50),
+        "p95_ms": _pct(all_lat, 95),
+        "p99_ms": _pct(all_lat, 99),
+        "per_path": {p: (len(v), _pct(sorted(v), 50)) for p, v in latencies.items()},
+    }
+
+
+def _pct(sorted_lat, p):
+    if not sorted_lat:
+        return 0.0
+    i = min(len(sorted_lat) - 1, int(len(sorted_lat) * p / 100))
+    return sorted_lat[i] * 1000
+
+
+def _wait_ready(base: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base + "/osrm_status", timeout=2).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"backend at {base} did not come up within {timeout}s")
+
+
+def _start_gunicorn(workers: int, threads: int, port: int):
+    env = {
+        **os.environ,
+        "GUNICORN_WORKERS": str(workers),
+        "GUNICORN_THREADS": str(threads),
+        "PORT": str(port),
+        "GUNICORN_ACCESS_LOG": "/dev/null",
+        # Keep the background walk-access refresh out of the measurement
+        "WALK_ACCESS_ON_START": "0",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+        env=env, start_new_session=True,
+    )
+
+
+def _print_row(label, res):
+    print(
+        f"{label:<12} {res['requests']:>8} {res['errors']:>6} {res['rps']:>9.1f} "
+        f"{res['p50_ms']:>8.1f} {res['p95_ms']:>8.1f} {res['p99_ms']:>8.1f}"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--base", default="http://localhost:5001")
+    ap.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=20)
+    ap.add_argument("--warmup", type=float, default=3)
+    ap.add_argument("--workers", help="comma-separated worker counts; starts gunicorn for each")
+    ap.add_argument("--threads", type=int, default=8, help="threads per worker when starting gunicorn")
+    ap.add_argument("--port", type=int, default=5091, help="port for the gunicorn started by --workers")
+    args = ap.parse_args()
+
+    print(f"mix={args.mix} concurrency={args.concurrency} duration={args.duration}s")
+    print(f"{'setup':<12} {'requests':>8} {'errors':>6} {'req/s':>9} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8}")
+
+    if not args.workers:
+        _wait_ready(args.base)
+        run_load(args.base, args.mix, args.concurrency, args.warmup)
+        res = run_load(args.base, args.mix, args.concurrency, args.duration)
+        _print_row("existing", res)
+        for path, (n, p50) in sorted(res["per_path"].items()):
+            print(f"  {path:<10} {n:>8} requests, p50 {p50:.1f} ms")
+        return
+
+    base = f"http://127.0.0.1:{args.port}"
+    for workers in (int(w) for w in args.workers.split(",")):
+        proc = _start_gunicorn(workers, args.threads, args.port)
+        try:
+            _wait_ready(base)
+            run_load(base, args.mix, args.concurrency, args.warmup)
+            _print_row(f"{workers}x{args.threads}", run_load(base, args.mix, args.concurrency, args.duration))
+        finally:
+            os.killpg(proc.pid, signal.SIGTERM)
+            proc.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""The staged bus stop import drops same-named stops within 20 m, in the batch and against places."""
+from sqlalchemy import text
+
+from app.routes.routing import _insert_bus_stops_dedup
+
+
+def test_dedup_within_batch_and_against_live_stops(db):
+    db.session.execute(text(
+        "INSERT INTO places (name, place_type, geom) "
+        "VALUES ('Sukhbaatar Square', 'bus_stop', ST_SetSRID(ST_MakePoint(106.9170, 47.9190), 4326))"
+    ))
+    db.session.commit()
+
+    inserted, skipped = _insert_bus_stops_dedup([
+        # ~5 m from the existing stop, same name after normalization
+        {"name": "  sukhbaatar   square ", "lon": 106.91705, "lat": 47.91903},
+        {"name": "State Department Store", "lon": 106.9050, "lat": 47.9170},
+        # ~7 m from the previous row of this batch
+        {"name": "State Department Store", "lon": 106.90505, "lat": 47.91705},
+        # Same name, ~750 m away: a different stop
+        {"name": "State Department Store", "lon": 106.9150, "lat": 47.9170},
+        {"name": "No coordinates"},
+    ])
+
+    assert (inserted, skipped) == (2, 3)
+    names = db.session.execute(text(
+        "SELECT name FROM places WHERE place_type = 'bus_stop' ORDER BY id"
+    )).scalars().all()
+    assert names == ["Sukhbaatar Square", "State Department Store", "State Department Store"]
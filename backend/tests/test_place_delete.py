@@ -0,0 +1,24 @@
+"""Soft-deleting a place leaves tombstones for the place and its gallery."""
+from sqlalchemy import text
+
+
+def test_delete_place_tombstones_its_images(db, client, monkeypatch):
+    monkeypatch.setenv("ADMIN_SECRET", "s3cret")
+    db.session.execute(text(
+        "INSERT INTO places (name, place_type, geom) VALUES ('cafe', 'cafe', ST_SetSRID(ST_MakePoint(106.9, 47.9), 4326))"
+    ))
+    db.session.execute(text(
+        "INSERT INTO place_images (place_id, image_url, display_order) VALUES (1, 'a', 1), (1, 'b', 2)"
+    ))
+    db.session.commit()
+    since = db.session.execute(text("SELECT version FROM data_version WHERE id = 1")).scalar()
+
+    resp = client.delete("/places/1", headers={"X-Admin-Secret": "s3cret"})
+    assert resp.status_code == 200
+
+    live_images = db.session.execute(
+        text("SELECT count(*) FROM place_images WHERE place_id = 1 AND deleted_at IS NULL")
+    ).scalar()
+    assert live_images == 0
+    changes = client.get(f"/places/changes?since={since}").get_json()
+    assert changes["deleted"] == [1]
@@ -0,0 +1,72 @@
+"""GET /places and GET /places/<id> issue a fixed number of SQL statements, however many rows they return."""
+import pytest
+from sqlalchemy import text
+
+
+IMAGES_PER_PLACE = 3
+
+
+def _seed(db, n: int):
+    db.session.execute(
+        text(
+            """
+            INSERT INTO places (name, place_type, description, geom)
+            SELECT 'place ' || i, CASE WHEN i % 2 = 1 THEN 'cafe' ELSE 'hotel' END, 'seeded',
+                   ST_SetSRID(ST_MakePoint(106.90 + i * 0.0001, 47.91), 4326)
+            FROM generate_series(1, :n) AS i
+            """
+        ),
+        {"n": n},
+    )
+    db.session.execute(
+        text(
+            """
+            INSERT INTO place_images (place_id, image_url, display_order)
+            SELECT p.id, 'https://img.example/' || p.id || '/' || k, k
+            FROM places p, generate_series(1, :k) AS k
+            """
+        ),
+        {"k": IMAGES_PER_PLACE},
+    )
+    db.session.commit()
+
+
+def _statements_for(client, count_statements, url: str, expected_features: int) -> int:
+    with count_statements() as statements:
+        resp = client.get(url)
+    assert resp.status_code == 200
+    features = resp.get_json()["features"]
+    assert len(features) == expected_features
+    assert all(len(f["properties"]["gallery"]) == IMAGES_PER_PLACE for f in features)
+    return len(statements)
+
+
+@pytest.mark.parametrize("query", ["", "?type=cafe", "?bbox=106.8,47.8,107.0,48.0", "?limit=1000"])
+def test_place_list_statement_count_is_independent_of_result_size(db, client, count_statements, query):
+    _seed(db, 1)
+    one = _statements_for(client, count_statements, "/places" + query, 1)
+
+    db.session.execute(text("TRUNCATE places, place_images RESTART IDENTITY CASCADE"))
+    db.session.commit()
+    _seed(db, 50)
+    many = _statements_for(client, count_statements, "/places" + query, 25 if "cafe" in query else 50)
+
+    assert one == many
+
+
+def test_single_place_statement_count_is_independent_of_gallery_size(db, client, count_statements):
+    _seed(db, 1)
+    baseline = _statements_for_place(client, count_statements, 1)
+    db.session.execute(
+        text("INSERT INTO place_images (place_id, image_url, display_order) "
+             "SELECT 1, 'https://img.example/extra/' || k, 100 + k FROM generate_series(1, 20) AS k")
+    )
+    db.session.commit()
+    assert _statements_for_place(client, count_statements, 1) == baseline
+
+
+def _statements_for_place(client, count_statements, place_id: int) -> int:
+    with count_statements() as statements:
+        resp = client.get(f"/places/{place_id}")
+    assert resp.status_code == 200
+    return len(statements)
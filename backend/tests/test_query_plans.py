@@ -0,0 +1,123 @@
+"""No hot place query plans a sequential scan of places on a large, production-shaped dataset.
+
+The dataset (PLAN_CHECK_PLACES rows around Ulaanbaatar, 5% bus stops, 1%
+soft-deleted) is seeded into a scratch schema, clustered with the
+db-cluster maintenance step, vacuumed and analyzed. The queries are the
+app's own SQL where it lives in a module constant or helper; the ORM
+queries are restated with the same predicates.
+"""
+import json
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.migrations import cluster_places
+from app.routes.places import _CATEGORIES_SQL, _place_filters
+from app.routes.routing import _INTERMEDIATE_STOPS_SQL
+from app.search import search_rank
+
+
+PLAN_CHECK_PLACES = int(os.getenv("PLAN_CHECK_PLACES", "200000"))
+CHECKED_TABLES = {"places"}
+
+# Bus stops every 20th row, the rest spread over 37 other types
+_SEED_SQL = """
+    INSERT INTO places (name, place_type, description, geom)
+    SELECT CASE WHEN i % 20 = 0 THEN 'stop ' ELSE 'place ' END || i,
+           CASE WHEN i % 20 = 0 THEN 'bus_stop' ELSE 'type_' || (i % 37) END,
+           'seeded row ' || i,
+           ST_SetSRID(ST_MakePoint(106.70 + random() * 0.50, 47.85 + random() * 0.15), 4326)
+    FROM generate_series(1, :n) AS i
+"""
+
+# A bus leg across the centre, as /route_bus passes it to the intermediate stops query
+_BUS_LEG = {"type": "LineString", "coordinates": [[106.86, 47.91], [106.92, 47.918], [106.98, 47.92]]}
+
+_DISTRICT_BBOX = "106.88,47.90,106.96,47.93"
+
+
+def _filtered(args: dict) -> tuple[str, dict]:
+    """SELECT over places with the /places WHERE clauses for these query args."""
+    where, params = _place_filters(args)
+    return f"SELECT p.id FROM places p WHERE {' AND '.join(where)} ORDER BY p.id", params
+
+
+def _search(q: str) -> tuple[str, dict]:
+    where, params = _place_filters({"q": q})
+    params["limit"] = 10
+    sql = f"""
+        SELECT p.id, {search_rank(params)} AS score
+        FROM places p
+        WHERE {" AND ".join(where)}
+        ORDER BY score DESC, length(p.name), p.id
+        LIMIT :limit
+    """
+    return sql, params
+
+
+HOT_QUERIES = {
+    # routes/routing.py bus_stop_count / _ensure_bus_stops
+    "bus_stop_count": (
+        "SELECT count(*) FROM places p WHERE p.place_type = 'bus_stop' AND p.deleted_at IS NULL", {}
+    ),
+    # bus_stops._nearest_from_db
+    "nearest_bus_stop": (
+        """
+        SELECT p.id, p.name, ST_X(p.geom), ST_Y(p.geom) FROM places p
+        WHERE p.place_type = 'bus_stop' AND p.deleted_at IS NULL
+        ORDER BY p.geom <-> ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)
+        LIMIT 3
+        """,
+        {"lon": 106.917, "lat": 47.918},
+    ),
+    "route_bus_intermediate_stops": (_INTERMEDIATE_STOPS_SQL, {"g": json.dumps(_BUS_LEG), "tol": 100}),
+    "categories": (_CATEGORIES_SQL, {}),
+    "places_type": _filtered({"type": "type_7"}),
+    "places_types": _filtered({"types": "type_3,type_11"}),
+    "places_bbox": _filtered({"bbox": _DISTRICT_BBOX}),
+    "places_bbox_types": _filtered({"bbox": _DISTRICT_BBOX, "types": "bus_stop,type_5"}),
+    # routes/places.py place_changes, one page
+    "places_changes": (
+        """
+        SELECT p.id FROM places p
+        WHERE (p.version, p.id) > (:start_version, :start_id)
+        ORDER BY p.version, p.id
+        LIMIT 1001
+        """,
+        {"start_version": 0, "start_id": 2 ** 31 - 1},
+    ),
+    "search": _search("stop 123"),
+}
+
+
+def _scans(plan: dict):
+    """Yield (node type, relation) of every scan node in an EXPLAIN (FORMAT JSON) plan."""
+    if "Relation Name" in plan:
+        yield plan["Node Type"], plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _scans(child)
+
+
+@pytest.fixture(scope="module")
+def seeded_engine(scratch_schema):
+    with scratch_schema("test_plans") as url:
+        engine = create_engine(url)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT setseed(0.25)"))
+            conn.execute(text(_SEED_SQL), {"n": PLAN_CHECK_PLACES})
+            conn.execute(text("UPDATE places SET deleted_at = now() WHERE id % 100 = 1"))
+            conn.commit()
+        cluster_places(engine)
+        yield engine
+        engine.dispose()
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_does_not_seq_scan_places(seeded_engine, name):
+    sql, params = HOT_QUERIES[name]
+    with seeded_engine.connect() as conn:
+        plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql), params).scalar()
+    plan = (plan if isinstance(plan, list) else json.loads(plan))[0]["Plan"]
+    seq = [rel for node, rel in _scans(plan) if node == "Seq Scan" and rel in CHECKED_TABLES]
+    assert not seq, f"{name} plans a Seq Scan on {', '.join(seq)}:\n{json.dumps(plan, indent=1)}"
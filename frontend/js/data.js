@@ -4,8 +4,30 @@ import { allPlaces, setAllPlaces } from './state.js';
 
 export const selectedCategories = new Set();
 
+// /places хүсэлтийн bbox-ийн тор (градус)
+const BBOX_SNAP = 0.005;
+
+function makeClusterMarker(p, latlng) {
+  const count = Number(p.count) || 0;
+  const size = count < 10 ? 32 : count < 100 ? 38 : 46;
+  const clusterIcon = L.divIcon({
+    className: 'place-cluster-marker',
+    html: `<div style="background-color: #0ea5e9; width: ${size}px; height: ${size}px; border-radius: 50%; border: 3px solid white; box-shadow: 0 2px 6px rgba(0,0,0,0.3); display: flex; align-items: center; justify-content: center; font-size: 13px; font-weight: 700; color: white;">${count}</div>`,
+    iconSize: [size, size],
+    iconAnchor: [size / 2, size / 2],
+  });
+  const title = Object.entries(p.types || {})
+    .map(([t, n]) => `${t}: ${n}`)
+    .join(', ');
+  const marker = L.marker(latlng, { icon: clusterIcon, title });
+  // Кластер дээр дарахад томруулж доторх газруудыг харуулна
+  marker.on('click', () => map.setView(latlng, map.getZoom() + 2));
+  return marker;
+}
+
 function makePlaceMarker(feature, latlng) {
   const p = feature.properties || {};
+  if (p.cluster) return makeClusterMarker(p, latlng);
   if (p.type === 'bus_stop') {
     const busIcon = L.divIcon({
       className: 'bus-stop-marker',
@@ -98,19 +120,24 @@ export async function loadPlaces() {
   }
 
   const bounds = map.getBounds();
+  // Ойролцоо харагдацууд серверийн кэшийг хуваалцахаар хүрээг BBOX_SNAP тор руу гадагш тэлнэ
   const bbox = [
-    bounds.getWest(),
-    bounds.getSouth(),
-    bounds.getEast(),
-    bounds.getNorth(),
-  ].join(',');
+    Math.floor(bounds.getWest() / BBOX_SNAP) * BBOX_SNAP,
+    Math.floor(bounds.getSouth() / BBOX_SNAP) * BBOX_SNAP,
+    Math.ceil(bounds.getEast() / BBOX_SNAP) * BBOX_SNAP,
+    Math.ceil(bounds.getNorth() / BBOX_SNAP) * BBOX_SNAP,
+  ].map(v => v.toFixed(3)).join(',');
   const url = new URL(`${API_BASE}/places`);
   url.searchParams.set('bbox', bbox);
   url.searchParams.set('types', Array.from(selectedCategories).join(','));
+  url.searchParams.set('zoom', String(map.getZoom()));
+  // Газрын зурагт зөвхөн id/нэр/төрөл хэрэгтэй; дэлгэрэнгүйг /places/<id>-аас авна
+  url.searchParams.set('view', 'summary');
 
   const res = await fetch(url);
   const geojson = await res.json();
-  setAllPlaces(geojson.features || []);
+  // Кластер биш, жинхэнэ газруудыг л хадгална
+  setAllPlaces((geojson.features || []).filter(f => !f.properties?.cluster));
   placesLayer.clearLayers();
   placesLayer.addData(geojson);
 }
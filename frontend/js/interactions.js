@@ -9,6 +9,7 @@ import {
 import { updateBucketUI } from './ui.js';
 import {
   showBucketRoute,
+  optimizeBucketOrder,
   clearRoute,
   showDirectRouteToPlace,
   updateModeDurations,
@@ -160,6 +161,10 @@ export function setupInteractions() {
     .getElementById('showBucketRouteBtn')
     .addEventListener('click', showBucketRoute);
 
+  document
+    .getElementById('optimizeBucketBtn')
+    ?.addEventListener('click', optimizeBucketOrder);
+
   document
     .getElementById('clearRouteBtn')
     .addEventListener('click', clearRoute);
@@ -292,18 +297,15 @@ export async function checkPassword() {
 // Search place by name from backend (search all places, not just visible ones)
 async function searchPlaceByName(query) {
   try {
-    const url = new URL(`${API_BASE}/places`);
+    // Server ranks matches and excludes bus stops; only the best one is needed
+    const url = new URL(`${API_BASE}/search`);
     url.searchParams.set('q', query);
+    url.searchParams.set('limit', '1');
+    url.searchParams.set('exclude_types', 'bus_stop');
 
     const response = await fetch(url);
     const geojson = await response.json();
-    const features = geojson.features || [];
-
-    // Find first non-bus_stop match
-    const found = features.find(place => {
-      const type = place.properties?.type || '';
-      return type !== 'bus_stop';
-    });
+    const found = (geojson.features || [])[0];
 
     if (found) {
       const coords = found.geometry.coordinates;
@@ -1,3 +1,4 @@
+import { API_BASE } from './config.js';
 import { placesLayer, loadPlaces } from './data.js';
 import { map } from './map.js';
 import { allPlaces, bucketList, userLocation } from './state.js';
@@ -21,7 +22,6 @@ function bindPopupHandlers(feature, layer) {
   const popupContent = `
     <b>${p.name || 'Place'}</b><br>
     ${p.type || ''}<br>
-    ${p.description || ''}<br>
     <div style="display:flex; gap:4px; margin-top:8px; flex-wrap:wrap;">
       <button class="detail-btn" data-id="${
         p.id
@@ -70,10 +70,18 @@ placesLayer.options.onEachFeature = bindPopupHandlers;
 // -----------------------------
 // Дэлгэрэнгүй мэдээлэл харуулах
 // -----------------------------
-export function showDetail(placeId) {
+export async function showDetail(placeId) {
   if (!placeId) return;
 
-  const feature = allPlaces.find(f => f?.properties?.id === placeId);
+  // Газрын зургийн давхарга хураангуй өгөгдөлтэй тул бүрэн мэдээллийг серверээс авна
+  let feature = null;
+  try {
+    const res = await fetch(`${API_BASE}/places/${placeId}`);
+    if (res.ok) feature = await res.json();
+  } catch (error) {
+    console.error('Place detail error:', error);
+  }
+  if (!feature) feature = allPlaces.find(f => f?.properties?.id === placeId);
   if (!feature || !feature.properties || !feature.geometry) return;
 
   const p = feature.properties;
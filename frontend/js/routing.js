@@ -8,8 +8,9 @@ import {
   lastDirectDestination,
   setCurrentRouteType,
   currentRouteType,
+  setBucketOrder,
 } from './state.js';
-import { createNumberedIcon } from './ui.js';
+import { createNumberedIcon, updateBucketUI } from './ui.js';
 
 export const routeLayer = L.geoJSON([], {
   style: feature => {
@@ -225,6 +226,21 @@ export async function showDirectRouteToPlace(coords) {
             seconds: t.segments?.walk_from_stop_s || 0,
           },
         ];
+        // Импортолсон автобусны шугамаар төлөвлөсөн үед хүлээлт, шилжилт нэмэгдэнэ
+        if (t.segments?.wait_s) {
+          busSegments.splice(1, 0, {
+            icon: '⏳',
+            title: 'Автобус хүлээх',
+            seconds: t.segments.wait_s,
+          });
+        }
+        if (t.segments?.walk_transfer_s) {
+          busSegments.splice(busSegments.length - 1, 0, {
+            icon: '🔁',
+            title: 'Шилжих',
+            seconds: t.segments.walk_transfer_s,
+          });
+        }
         const carSegments = [
           {
             icon: '🚗',
@@ -283,6 +299,21 @@ async function safeFetch(url) {
   }
 }
 
+async function postRouteMulti(waypoints, mode) {
+  try {
+    const res = await fetch(`${API_BASE}/route_multi`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ waypoints, mode }),
+    });
+    if (!res.ok) throw new Error(res.status);
+    return await res.json();
+  } catch (err) {
+    console.warn('⚠️ Route API error:', err.message);
+    return { type: 'FeatureCollection', features: [], legs: [] };
+  }
+}
+
 function minutesText(seconds) {
   if (seconds == null || isNaN(seconds)) return '—';
   return `${Math.max(1, Math.round(seconds / 60))} мин`;
@@ -295,36 +326,19 @@ function setModeBadge(mode, seconds) {
   if (el) el.textContent = minutesText(seconds);
 }
 
-function extractDurationFromRoute(fc, fallbackSpeedKmh) {
+async function fetchDurationMatrix(points) {
   try {
-    const f = (fc?.features || [])[0];
-    const p = f?.properties || {};
-    if (typeof p.duration_s === 'number') return p.duration_s;
-    if (typeof p.distance_m === 'number' && fallbackSpeedKmh) {
-      return (p.distance_m / (fallbackSpeedKmh * 1000)) * 3600;
-    }
-  } catch {}
-  return null;
-}
-
-async function fetchLegDuration(mode, start, end) {
-  const url = new URL(`${API_BASE}/route`);
-  url.searchParams.set('start', `${start[0]},${start[1]}`);
-  url.searchParams.set('end', `${end[0]},${end[1]}`);
-  url.searchParams.set('mode', mode);
-  const fc = await safeFetch(url);
-  const speed = mode === 'car' ? 30 : 5; // km/h fallback
-  return extractDurationFromRoute(fc, speed) || 0;
-}
-
-async function fetchBusLegDuration(start, end) {
-  const url = new URL(`${API_BASE}/route_bus`);
-  url.searchParams.set('start', `${start[0]},${start[1]}`);
-  url.searchParams.set('end', `${end[0]},${end[1]}`);
-  const fc = await safeFetch(url);
-  const total = fc?.summary?.times?.total_time_s;
-  if (typeof total === 'number') return total;
-  return fetchLegDuration('car', start, end); // fallback
+    const res = await fetch(`${API_BASE}/matrix`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ points, modes: ['car', 'bus', 'foot'] }),
+    });
+    if (!res.ok) throw new Error(res.status);
+    return await res.json();
+  } catch (err) {
+    console.warn('⚠️ Matrix API error:', err.message);
+    return null;
+  }
 }
 
 export async function updateModeDurations() {
@@ -362,16 +376,21 @@ export async function updateModeDurations() {
 
     if (legs.length === 0) return;
 
-    const sumDur = async fn => {
-      const arr = await Promise.all(legs.map(([a, b]) => fn(a, b)));
-      return arr.reduce((s, v) => s + (Number(v) || 0), 0);
+    // Хэсгүүд дараалсан тул цэгүүдийн гинж болгоод нэг /matrix дуудлагаар авна
+    const points = [legs[0][0], ...legs.map(([, b]) => b)];
+    const m = await fetchDurationMatrix(points);
+    if (!m) return;
+    const sumChain = mode => {
+      const d = m[mode]?.durations || [];
+      let total = 0;
+      for (let i = 0; i < points.length - 1; i++) {
+        total += Number(d[i]?.[i + 1]) || 0;
+      }
+      return total;
     };
-
-    const [carS, busS, footS] = await Promise.all([
-      sumDur((a, b) => fetchLegDuration('car', a, b)),
-      sumDur((a, b) => fetchBusLegDuration(a, b)),
-      sumDur((a, b) => fetchLegDuration('foot', a, b)),
-    ]);
+    const carS = sumChain('car');
+    const busS = sumChain('bus');
+    const footS = sumChain('foot');
 
     setModeBadge('car', carS);
     setModeBadge('bus', busS);
@@ -467,26 +486,27 @@ export async function showBucketRoute() {
 
   const elSummary = document.getElementById('busSummary');
   if (elSummary) elSummary.innerHTML = '';
-  let start = [userLocation.lng, userLocation.lat];
-  let end = validList[0].coords;
-  const firstUrl = new URL(`${API_BASE}${busMode ? '/route_bus' : '/route'}`);
-  firstUrl.searchParams.set('start', `${start[0]},${start[1]}`);
-  firstUrl.searchParams.set('end', `${end[0]},${end[1]}`);
-  if (!busMode) firstUrl.searchParams.set('mode', mode);
-  const firstGeo = await safeFetch(firstUrl);
-  routeLayer.addData(firstGeo);
-
-  const legSummaries = [];
-  if (busMode && firstGeo.summary) legSummaries.push(firstGeo.summary);
-
-  legSteps.push({
-    idx: 0,
-    fromLabel: 'Миний байршил',
-    toLabel: validList[0].name,
-    from: [start[0], start[1]],
-    to: [end[0], end[1]],
-    mode,
-  });
+  // Бүх хэсгийг нэг хүсэлтээр /route_multi-ээс авна
+  const start = [userLocation.lng, userLocation.lat];
+  const waypoints = [start, ...validList.map(item => item.coords)];
+  const multiGeo = await postRouteMulti(waypoints, mode);
+  routeLayer.addData(multiGeo);
+
+  const legSummaries = busMode
+    ? (multiGeo.legs || []).map(l => l.summary).filter(Boolean)
+    : [];
+
+  const labels = ['Миний байршил', ...validList.map(item => item.name)];
+  for (let i = 0; i < waypoints.length - 1; i++) {
+    legSteps.push({
+      idx: i,
+      fromLabel: labels[i],
+      toLabel: labels[i + 1],
+      from: [waypoints[i][0], waypoints[i][1]],
+      to: [waypoints[i + 1][0], waypoints[i + 1][1]],
+      mode,
+    });
+  }
 
   routeMarkersLayer.addLayer(
     L.marker([userLocation.lat, userLocation.lng], {
@@ -501,27 +521,6 @@ export async function showBucketRoute() {
       .addTo(routeMarkersLayer);
   });
 
-  for (let i = 0; i < validList.length - 1; i++) {
-    const start = validList[i].coords;
-    const end = validList[i + 1].coords;
-    const u = new URL(`${API_BASE}${busMode ? '/route_bus' : '/route'}`);
-    u.searchParams.set('start', `${start[0]},${start[1]}`);
-    u.searchParams.set('end', `${end[0]},${end[1]}`);
-    if (!busMode) u.searchParams.set('mode', mode);
-    const legGeo = await safeFetch(u);
-    routeLayer.addData(legGeo);
-    if (busMode && legGeo.summary) legSummaries.push(legGeo.summary);
-
-    legSteps.push({
-      idx: i + 1,
-      fromLabel: validList[i].name,
-      toLabel: validList[i + 1].name,
-      from: [start[0], start[1]],
-      to: [end[0], end[1]],
-      mode,
-    });
-  }
-
   // 🗺️ Fit map
   const allPoints = [
     [userLocation.lat, userLocation.lng],
@@ -617,6 +616,43 @@ export async function showBucketRoute() {
   } catch {}
 }
 
+export async function optimizeBucketOrder() {
+  if (!Array.isArray(bucketList) || bucketList.length < 2) {
+    alert('Дараалал оновчлохын тулд 2-оос дээш газар нэм');
+    return;
+  }
+  if (!userLocation) {
+    alert('Эхлээд "Миний байршил" товчийг дарж байршлаа тогтооно уу');
+    return;
+  }
+  const validList = bucketList.filter(
+    item => item && Array.isArray(item.coords) && item.coords.length === 2
+  );
+  const mode = document.getElementById('routeModeSelect').value;
+  try {
+    const res = await fetch(`${API_BASE}/route_optimize`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        start: [userLocation.lng, userLocation.lat],
+        waypoints: validList.map(item => item.coords),
+        mode,
+      }),
+    });
+    if (!res.ok) throw new Error(res.status);
+    const data = await res.json();
+    if (!Array.isArray(data.order)) return;
+    // Places without coordinates cannot be routed; keep them, in their original order, after the route
+    const withoutCoords = bucketList.filter(item => !validList.includes(item));
+    setBucketOrder([...data.order.map(i => validList[i]), ...withoutCoords]);
+    updateBucketUI();
+    await showBucketRoute();
+  } catch (err) {
+    console.warn('⚠️ Optimize API error:', err.message);
+    alert('Дараалал оновчлоход алдаа гарлаа');
+  }
+}
+
 export function clearRoute() {
   routeLayer.clearLayers();
   routeMarkersLayer.clearLayers();
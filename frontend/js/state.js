@@ -23,6 +23,11 @@ export function removeFromBucketState(id) {
   return bucketList.length !== before;
 }
 
+export function setBucketOrder(items) {
+  bucketList = items;
+  localStorage.setItem(BUCKET_KEY, JSON.stringify(bucketList));
+}
+
 // User location
 export let userLocation = null;
 export let userLocationMarker = null;